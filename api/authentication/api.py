@@ -27,6 +27,7 @@ from authentication.serializers import (
 from authentication.utils import AuthCommands
 from authentication.verification import (
     send_verification_email, check_verification_token,)
+from boards.cache import BoardSnapshotCache
 from users.exceptions import DuplicateEmail, DuplicateSuperUser
 from utils import parse_request_metadata
 from utils.exceptions import RequestError
@@ -284,6 +285,7 @@ class VerifyEmailAPI(APIView):
 
             user.email_is_verified = True
             user.save()
+            BoardSnapshotCache.bump_member_boards(user)
             user.email_verification_tokens.all().delete()
 
             return Response(None, status=status.HTTP_204_NO_CONTENT)
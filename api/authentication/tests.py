@@ -15,11 +15,16 @@ from rest_framework.test import APITestCase
 from authentication.invalid_login import InvalidLoginCache
 from authentication.models import EmailVerificationToken, PasswordRecoveryToken
 from authentication.utils import AuthCommands
+from boards.cache import BoardSnapshotCache
 from custom_db_logger.models import StatusLog
 from custom_db_logger.utils import LogLevels
-from utils.testing import test_user_1, test_user_2, create_user, log_msg_regex
+from utils.testing import (
+    test_user_1, test_user_2, create_board, create_user, log_digests,
+    log_msg_regex, send_log_digests, synchronous_db_logs,)
 
 
+@log_digests()
+@synchronous_db_logs()
 class AuthenticationTest(APITestCase):
     databases = '__all__'
 
@@ -278,6 +283,7 @@ class AuthenticationTest(APITestCase):
         # print(StatusLogSerializer(log).data)
         self.assertRegex(log.msg, log_msg_regex('Client was throttled.', LogLevels.ERROR))
         self.assertEqual(log.command, AuthCommands.LOGIN)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Client was throttled.')
@@ -401,6 +407,8 @@ class AuthenticationTest(APITestCase):
 
         # POST verification token
         self.assertFalse(user.email_is_verified)
+        board = create_board(create_user(), user)
+        version = BoardSnapshotCache.version(board.board_slug)
         post_1 = self.client.post(reverse('verify_email'), data={
             'token': email_token_2,
         })
@@ -408,6 +416,8 @@ class AuthenticationTest(APITestCase):
         self.assertEqual(EmailVerificationToken.objects.count(), 0)
         user.refresh_from_db()
         self.assertTrue(user.email_is_verified)
+        # Boards serialized with the user's old verification are stale
+        self.assertGreater(BoardSnapshotCache.version(board.board_slug), version)
         freezer.stop()
     
     def test_forgot_password(self):
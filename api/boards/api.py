@@ -8,7 +8,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_201_CREATED
 
+from boards.cache import BoardSnapshotCache
 from boards.exceptions import BoardMaximumReached
+from boards.fast_serializers import serialize_board
 from boards.serializers import (
     BoardSerializer, ListBoardSerializer, DemoSerializer,)
 from boards.utils import BoardCommands, BoardRoles
@@ -137,3 +139,10 @@ class RetrieveBoardView(RetrieveAPIView):
 
     def get_queryset(self):
         return self.request.user.boards.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        data = BoardSnapshotCache.get(
+            instance.board_slug,
+            lambda: serialize_board(instance.board_slug),)
+        return Response(data)
@@ -0,0 +1,120 @@
+import logging
+import time
+
+from django.core.cache import cache
+from redis.exceptions import LockError
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TIMEOUT = 60 * 60
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_LOCK_WAIT = 5
+
+
+class BoardSnapshotCache(object):
+    '''
+    Serialized board payloads shared by websocket connects, the REST retrieve
+    and any broadcast that needs the whole board.
+
+    Each snapshot is tagged with the board version it was built from, and
+    every mutation bumps the version, so a snapshot is only served while
+    nothing has changed since it was built. Concurrent misses for the same
+    board wait on a lock so that a single rebuild serves all of them.
+    '''
+
+    @staticmethod
+    def _key(board_slug):
+        return f'board_snapshot_{board_slug}'
+
+    @staticmethod
+    def _version_key(board_slug):
+        return f'board_version_{board_slug}'
+
+    @staticmethod
+    def _lock_key(board_slug):
+        return f'board_snapshot_lock_{board_slug}'
+
+    @staticmethod
+    def _initial_version():
+        # Seeded from the clock so a version never repeats, even if the
+        # version key is evicted while older snapshots are still cached.
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def version(board_slug):
+        key = BoardSnapshotCache._version_key(board_slug)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, BoardSnapshotCache._initial_version(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def bump(board_slug):
+        try:
+            key = BoardSnapshotCache._version_key(board_slug)
+            cache.add(key, BoardSnapshotCache._initial_version(), timeout=None)
+            return cache.incr(key)
+        except Exception as e:
+            logger.exception('Error bumping board version', exc_info=e)
+
+    @staticmethod
+    def bump_member_boards(user):
+        '''Bump every board `user` is a member of, after the user changed.'''
+        for board_slug in user.memberships.values_list(
+            'board__board_slug', flat=True,
+        ).iterator():
+            BoardSnapshotCache.bump(board_slug)
+
+    @staticmethod
+    def _cached(board_slug, version):
+        snapshot = cache.get(BoardSnapshotCache._key(board_slug))
+        if snapshot and snapshot['version'] == version:
+            return snapshot
+        return None
+
+    @staticmethod
+    def get(board_slug, build):
+        '''
+        Return the serialized board for its current version, calling `build`
+        to rebuild it when the snapshot is missing or stale.
+        '''
+        try:
+            version = BoardSnapshotCache.version(board_slug)
+            snapshot = BoardSnapshotCache._cached(board_slug, version)
+            if snapshot:
+                return snapshot['data']
+            lock = cache.lock(
+                BoardSnapshotCache._lock_key(board_slug),
+                timeout=REBUILD_LOCK_TIMEOUT,
+                blocking_timeout=REBUILD_LOCK_WAIT,)
+            acquired = lock.acquire()
+        except Exception as e:
+            logger.exception('Error getting board snapshot', exc_info=e)
+            return build()
+
+        try:
+            if acquired:
+                # Another caller may have rebuilt it while we were waiting
+                version = BoardSnapshotCache.version(board_slug)
+                snapshot = BoardSnapshotCache._cached(board_slug, version)
+                if snapshot:
+                    return snapshot['data']
+
+            data = build()
+            try:
+                cache.set(
+                    BoardSnapshotCache._key(board_slug),
+                    dict(version=version, data=data),
+                    timeout=SNAPSHOT_TIMEOUT,)
+            except Exception as e:
+                logger.exception('Error setting board snapshot', exc_info=e)
+            return data
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except LockError:
+                    # Lock expired while rebuilding
+                    pass
@@ -2,12 +2,14 @@ import logging
 
 from datetime import datetime
 
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
-from boards.channels.exceptions import ClientError, DuplicateDisplayName
+from boards.cache import BoardSnapshotCache
+from boards.channels.exceptions import (
+    BatchFailed, ClientError, DuplicateDisplayName,)
+from boards.fast_serializers import serialize_board
 from boards.models import Board, BoardMessage, BoardMembership
 from boards.serializers import (
-    BoardSerializer,
     BoardMessageSerializer,
     BoardMembershipSerializer,
     ColumnSerializer,
@@ -18,12 +20,16 @@ from columns.models import Column
 from invitations.models import Invitation
 from tasks.models import Task
 from utils import parse_request_metadata
+from utils.metrics import phase
+
+
+MSGS_PAGE_SIZE = 50
 
 
 def _read_board(board, user):
     try:
-        context = dict(request=dict(board=board, user=user))
-        return BoardSerializer(board, context=context).data
+        return BoardSnapshotCache.get(
+            board.board_slug, lambda: serialize_board(board.board_slug),)
     except Exception as e:
         raise ClientError(
             e,
@@ -31,13 +37,74 @@ def _read_board(board, user):
             command=BoardCommands.READ_BOARD,
         )
 
+def _read_tasks(board, user):
+    try:
+        tasks = Task.objects.number(list(Task.objects.filter(board=board)))
+        return _serialize(TaskSerializer, tasks, board, user, many=True)
+    except Exception as e:
+        raise ClientError(
+            e,
+            message='Could not read tasks',
+            command=BoardCommands.READ_BOARD,
+        )
+
+def _read_columns(board, user):
+    try:
+        columns = Column.objects.number(
+            list(Column.objects.filter(board=board)))
+        return _serialize(ColumnSerializer, columns, board, user, many=True)
+    except Exception as e:
+        raise ClientError(
+            e,
+            message='Could not read columns',
+            command=BoardCommands.READ_BOARD,
+        )
+
+def _read_memberships(board, user):
+    try:
+        context = dict(request=dict(board=board, user=user))
+        memberships = BoardMembership.objects.filter(
+            board=board).select_related('user').order_by('created_at')
+        return BoardMembershipSerializer(
+            memberships, many=True, context=context).data
+    except Exception as e:
+        raise ClientError(
+            e,
+            message='Could not read members',
+            command=BoardCommands.READ_BOARD,
+        )
+
+def _read_messages_page(board, user, before=None, limit=MSGS_PAGE_SIZE):
+    '''
+    Up to `limit` messages sent before message `before` (or the latest ones
+    if `before` is None), oldest first, and whether any older ones remain.
+    '''
+    try:
+        context = dict(request=dict(board=board, user=user))
+        messages = BoardMessage.objects.filter(
+            board=board).select_related('sender').order_by('-msg_id')
+        if before is not None:
+            messages = messages.filter(msg_id__lt=before)
+        page = list(messages[:limit + 1])
+        return {
+            'messages': BoardMessageSerializer(
+                reversed(page[:limit]), many=True, context=context).data,
+            'has_more': len(page) > limit,
+        }
+    except Exception as e:
+        raise ClientError(
+            e,
+            message='Could not read messages',
+            command=BoardCommands.READ_MSGS,
+        )
+
 def _update_board_title(board, user, board_title):
     try:
         instance = Board.objects.get(board_slug=board.board_slug)
         instance.board_title = board_title
         instance.save(update_fields=['board_title', 'updated_at'])
-        context = dict(request=dict(board=board, user=user))
-        return BoardSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return serialize_board(board.board_slug)
     except Exception as e:
         raise ClientError(
             e,
@@ -49,8 +116,8 @@ def _create_msg(board, user, message):
     try:
         instance = BoardMessage.objects.create(
             board=board, sender=user, message=message,)
-        context = dict(request=dict(board=board, user=user))
-        return BoardMessageSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(BoardMessageSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -63,8 +130,8 @@ def _update_msg(board, user, msg_id, message):
         instance = BoardMessage.objects.get(msg_id=msg_id)
         instance.message = message
         instance.save(update_fields=['message', 'updated_at'])
-        context = dict(request=dict(board=board, user=user))
-        return BoardMessageSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(BoardMessageSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -75,8 +142,8 @@ def _update_msg(board, user, msg_id, message):
 def _create_column(board, user, **data):
     try:
         instance = Column.objects.create(board=board, **data)
-        context = dict(request=dict(board=board, user=user))
-        return ColumnSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(ColumnSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -91,8 +158,8 @@ def _update_column(board, user, column_id, **data):
         instance.wip_limit_on = data.get('wip_limit_on', instance.wip_limit_on)
         instance.wip_limit = data.get('wip_limit', instance.wip_limit)
         instance.save()
-        context = dict(request=dict(board=board, user=user))
-        return ColumnSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(ColumnSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -102,10 +169,23 @@ def _update_column(board, user, column_id, **data):
 
 def _move_column(board, user, column_id, column_index):
     try:
-        column = Column.objects.get(column_id=column_id)
-        instance = Column.objects.move(column, column_index)
-        context = dict(request=dict(board=board, user=user))
-        return ColumnSerializer(instance, context=context).data
+        # Positions are read and the ranges built under the board's lock, so
+        # concurrent moves cannot interleave with them
+        with transaction.atomic():
+            Column.objects.lock_board(board.board_slug)
+            column = Column.objects.get(board=board, column_id=column_id)
+            old_index = column.column_index
+            instance = Column.objects.move(column, column_index)
+            ranges = [_column_range(
+                board,
+                min(old_index, instance.column_index),
+                max(old_index, instance.column_index),
+            )]
+        _bump_on_commit(board.board_slug)
+        return {
+            'column': _serialize(ColumnSerializer, instance, board, user),
+            'ranges': ranges,
+        }
     except Exception as e:
         raise ClientError(
             e,
@@ -117,8 +197,8 @@ def _create_task(board, user, column_id, text):
     try:
         column = Column.objects.get(column_id=column_id)
         instance = Task.objects.create(board=board, column=column, text=text)
-        context = dict(request=dict(board=board, user=user))
-        return TaskSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(TaskSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -131,8 +211,8 @@ def _update_task(board, user, task_id, text):
         instance = Task.objects.get(task_id=task_id)
         instance.text = text
         instance.save(update_fields=['text', 'updated_at'])
-        context = dict(request=dict(board=board, user=user))
-        return TaskSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(TaskSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -142,10 +222,30 @@ def _update_task(board, user, task_id, text):
 
 def _move_task(board, user, task_id, column_id, task_index):
     try:
-        task = Task.objects.get(task_id=task_id)
-        instance = Task.objects.move(task, column_id, task_index)
-        context = dict(request=dict(board=board, user=user))
-        return TaskSerializer(instance, context=context).data
+        # Positions are read and the ranges built under the locks of both
+        # columns, so concurrent moves cannot interleave with them
+        with transaction.atomic():
+            task = Task.objects.lock_task(task_id, column_id, board=board)
+            old_column_id, old_index = task.column_id, task.task_index
+            instance = Task.objects.move(task, column_id, task_index)
+
+            if instance.column_id == old_column_id:
+                ranges = [_task_range(
+                    old_column_id,
+                    min(old_index, instance.task_index),
+                    max(old_index, instance.task_index),
+                )]
+            else:
+                ranges = [
+                    _task_range(old_column_id, old_index),
+                    _task_range(instance.column_id, instance.task_index),
+                ]
+        _bump_on_commit(board.board_slug)
+
+        return {
+            'task': _serialize(TaskSerializer, instance, board, user),
+            'ranges': ranges,
+        }
     except Exception as e:
         raise ClientError(
             e,
@@ -157,8 +257,8 @@ def _update_member_role(board, user, role):
         instance = BoardMembership.objects.get(board=board, user=user)
         instance.role = role
         instance.save(update_fields=['role', 'updated_at'])
-        context = dict(request=dict(board=board, user=user))
-        return BoardMembershipSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(BoardMembershipSerializer, instance, board, user)
     except Exception as e:
         raise ClientError(
             e,
@@ -171,8 +271,8 @@ def _update_member_display_name(board, user, display_name):
         instance = BoardMembership.objects.get(board=board, user=user)
         instance.display_name = display_name
         instance.save(update_fields=['display_name', 'updated_at'])
-        context = dict(request=dict(board=board, user=user))
-        return BoardMembershipSerializer(instance, context=context).data
+        _bump_on_commit(board.board_slug)
+        return _serialize(BoardMembershipSerializer, instance, board, user)
     except IntegrityError as e:
         raise DuplicateDisplayName(e)
     except Exception as e:
@@ -187,6 +287,7 @@ def _remove_member(board, user, command=BoardCommands.REMOVE):
         deleted = BoardMembership.objects.get(board=board, user=user).delete()
         if deleted != (1, { 'boards.BoardMembership': 1 }):
             raise
+        _bump_on_commit(board.board_slug)
     except Exception as e:
         raise ClientError(
             e,
@@ -199,6 +300,7 @@ def _delete_board(board_slug):
         num, obj = Board.objects.get(board_slug=board_slug).delete()
         if num < 1 or obj.get('boards.Board', 0) != 1:
             raise
+        _bump_on_commit(board_slug)
     except Exception as e:
         raise ClientError(
             e,
@@ -208,10 +310,22 @@ def _delete_board(board_slug):
 
 def _delete_column(column_id):
     try:
-        instance = Column.objects.get(column_id=column_id)
-        num, obj = Column.objects.delete(instance)
-        if num < 1 or obj.get('columns.Column') != 1:
-            raise
+        board = Column.objects.get(column_id=column_id).board
+        # The column is locked too, so no task is moved onto it mid-delete
+        with transaction.atomic():
+            Column.objects.lock_board(board.board_slug)
+            Task.objects.lock_columns(column_id)
+            instance = Column.objects.get(column_id=column_id)
+            old_index = instance.column_index
+            num, obj = Column.objects.delete(instance)
+            if num < 1 or obj.get('columns.Column') != 1:
+                raise
+            ranges = [_column_range(board, old_index)]
+        _bump_on_commit(board.board_slug)
+        return {
+            'column_id': column_id,
+            'ranges': ranges,
+        }
     except Exception as e:
         raise ClientError(
             e,
@@ -221,10 +335,18 @@ def _delete_column(column_id):
 
 def _delete_task(task_id):
     try:
-        instance = Task.objects.get(task_id=task_id)
-        deleted = Task.objects.delete(instance)
-        if deleted != (1, { 'tasks.Task': 1 }):
-            raise
+        with transaction.atomic():
+            instance = Task.objects.lock_task(task_id)
+            column_id, old_index = instance.column_id, instance.task_index
+            deleted = Task.objects.delete(instance)
+            if deleted != (1, { 'tasks.Task': 1 }):
+                raise
+            ranges = [_task_range(column_id, old_index)]
+        _bump_on_commit(instance.board_id)
+        return {
+            'task_id': task_id,
+            'ranges': ranges,
+        }
     except Exception as e:
         raise ClientError(
             e,
@@ -252,12 +374,65 @@ def _delete_invitation(board, user, invitation, client_ip=None, context=None):
             }),
         })
 
+def _apply_batch(steps):
+    '''
+    Apply the actions of a batch of commands in order, in a single
+    transaction, so either all of them are applied or none are.
+    '''
+    commands = [command for command, *_ in steps]
+    results = []
+    try:
+        with transaction.atomic():
+            for _, action, args, kwargs in steps:
+                results.append(action(*args, **kwargs))
+    except ClientError as e:
+        raise BatchFailed(e, commands, len(results))
+    return results
+
+def _serialize(serializer_class, instance, board, user, **kwargs):
+    '''Serialize for a member of the board, timed as serialization.'''
+    with phase('serialization'):
+        context = dict(request=dict(board=board, user=user))
+        return serializer_class(instance, context=context, **kwargs).data
+
+def _bump_on_commit(board_slug):
+    '''
+    Bump a board's snapshot version once the current transaction commits,
+    so no snapshot is rebuilt from rows that may yet be rolled back.
+    '''
+    transaction.on_commit(lambda: BoardSnapshotCache.bump(board_slug))
+
 def _get_member_role(board, user):
     try:
         return BoardMembership.objects.get(board=board, user=user).role
     except Exception as e:
         raise ClientError(e, message='Could not get member role')
 
+def _column_range(board, start, stop=None):
+    '''
+    Ids of the columns now occupying indexes `start` to `stop` (inclusive,
+    or through the last column if `stop` is None), in index order.
+    '''
+    columns = Column.objects.filter(board=board).order_by(
+        'column_rank').values_list('column_id', flat=True)
+    return {
+        'start': start,
+        'column_ids': list(columns[start:None if stop is None else stop + 1]),
+    }
+
+def _task_range(column_id, start, stop=None):
+    '''
+    Ids of the tasks now occupying indexes `start` to `stop` (inclusive,
+    or through the last task if `stop` is None) of a column, in index order.
+    '''
+    tasks = Task.objects.filter(column_id=column_id).order_by(
+        'task_rank').values_list('task_id', flat=True)
+    return {
+        'column': column_id,
+        'start': start,
+        'task_ids': list(tasks[start:None if stop is None else stop + 1]),
+    }
+
 def _log_exception(name, msg, exc_info=False, extra=None):
     logger = logging.getLogger(name)
     logger.exception(msg, exc_info=exc_info, extra=extra)
\ No newline at end of file
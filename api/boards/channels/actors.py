@@ -0,0 +1,100 @@
+import asyncio
+
+
+# Seconds without commands after which an actor stops
+ACTOR_IDLE_TIMEOUT = 60
+
+
+class BoardActor(object):
+    '''
+    Applies the commands of a board's clients connected to this process one
+    at a time, in the order they were received.
+
+    Clients of a hot board queue here rather than holding database
+    connections while they wait on each other's row locks. The actor holds
+    no copy of the board and owns it only within this process: each command
+    still reads and writes the database as it would without one, and the
+    commands of clients connected to other processes are put in order by
+    the row locks alone.
+
+    An actor stops once it has been idle for ACTOR_IDLE_TIMEOUT, and the
+    board's next command starts another.
+    '''
+
+    # Per event loop and board, the running actor
+    actors = {}
+
+    def __init__(self, key):
+        self.key = key
+        self.queue = asyncio.Queue()
+        self.stopped = False
+        self.task = asyncio.ensure_future(self.run())
+
+    @classmethod
+    async def for_board(cls, board_slug):
+        '''The actor of a board in this process, started if need be.'''
+        loop = asyncio.get_running_loop()
+        key = (loop, board_slug)
+
+        while True:
+            actor = cls.actors.get(key)
+            if actor is None:
+                # Forget actors of event loops that have since closed
+                for closed in [k for k in cls.actors if k[0].is_closed()]:
+                    del cls.actors[closed]
+                actor = cls.actors[key] = cls(key)
+                return actor
+            if not actor.stopped:
+                return actor
+            # The next actor starts once the commands queued before this
+            # one stopped have run
+            await asyncio.wait([actor.task])
+
+    async def apply(self, handler, *args):
+        '''
+        Run `handler(*args)` once every command queued before it has run,
+        returning its result or raising its exception.
+        '''
+        if self.stopped:
+            actor = await self.for_board(self.key[1])
+            return await actor.apply(handler, *args)
+
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((handler, args, future))
+        return await future
+
+    async def run(self):
+        try:
+            while not self.stopped:
+                try:
+                    command = await asyncio.wait_for(
+                        self.queue.get(), ACTOR_IDLE_TIMEOUT,)
+                except asyncio.TimeoutError:
+                    # Set before any await, so no command is queued to an
+                    # actor that will not run it
+                    self.stopped = True
+                else:
+                    await self._run(*command)
+        finally:
+            self.stopped = True
+            # Commands queued before the actor stopped still run
+            while not self.queue.empty():
+                await self._run(*self.queue.get_nowait())
+            self.evict()
+
+    async def _run(self, handler, args, future):
+        try:
+            result = await handler(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+        else:
+            if not future.cancelled():
+                future.set_result(result)
+
+    def evict(self):
+        if self.actors.get(self.key) is self:
+            del self.actors[self.key]
@@ -2,24 +2,29 @@ import logging
 import re
 
 from asgiref.sync import sync_to_async
-from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from boards.cache import BoardSnapshotCache
 from boards.channels import actions
+from boards.channels.actors import BoardActor
 from boards.channels.exceptions import (
     BoardFailed, ClientError, ClientThrottled,
     DuplicateDisplayName, InviteNotSent,
     JoinFailed, MissingCommand, UserFailed,)
-from boards.channels.mixins import ConsumerCommandsMixin
+from boards.channels.mixins import COMMANDS, ConsumerCommandsMixin
 from boards.channels.utils import ChannelCodes
 from boards.models import Board, BoardMembership
 from boards.utils import BoardRoles, BoardCommands
 from utils import parse_request_metadata
-from utils.throttling import throttle_command
+from utils.metrics import phase
+from utils.throttling import athrottle_command
 
 
 STAFF_ROLES = [BoardRoles.ADMIN, BoardRoles.MODERATOR]
+# Commands that change no board state, kept out of the board's actor queue
+DIRECT_COMMANDS = [BoardCommands.READ_MSGS, BoardCommands.INVITE]
 
 
 class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
@@ -38,13 +43,13 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                     self.invitation = self.scope['invitation']
 
                 # Authenticate user and get board
-                self.user = await self.get_user_or_error(
-                    self.scope['user'].user_slug,)
-                self.board = await self.get_board_or_error()
+                self.user = await self.on_board_thread(
+                    self.get_user_or_error)(self.scope['user'].user_slug)
+                self.board = await self.on_board_thread(
+                    self.get_board_or_error)()
 
-                serialized_board = await database_sync_to_async(
-                    actions._read_board,
-                )(self.board, self.user)
+                serialized_board = await self.run_action(
+                    actions._read_board, self.board, self.user,)
 
                 # Send serialized board to client, then add to channel layer
                 await self.send_json({
@@ -55,13 +60,17 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                     self.board.group_name,
                     self.channel_name,
                 )
+                # Role events sent before joining the group were missed, so
+                # the role is looked up again when first needed
+                self.role = None
 
                 '''
                 If successfully logged in from board invitation,
                 update all other board members
                 '''
                 if self.invitation == 'success':
-                    memberships = serialized_board['memberships']
+                    memberships = await self.run_action(
+                        actions._read_memberships, self.board, self.user,)
 
                     await self.group_update(ChannelCodes.MEMBERS_SAVED, memberships)
 
@@ -71,7 +80,7 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
             except (BoardFailed, UserFailed) as e:
                 await self.send_json(e.ws_error())
             except ClientError as e:
-                await database_sync_to_async(actions._log_exception)(
+                await self.on_board_thread(actions._log_exception)(
                     __name__, e.message, e.exception,
                     {
                         'board': self.scope['url_route']['kwargs']['board_slug'],
@@ -83,7 +92,7 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                 await self.send_json(e.ws_error())
             except Exception as e:
                 error =  ClientError(e, code=ChannelCodes.SERVER)
-                await database_sync_to_async(actions._log_exception)(
+                await self.on_board_thread(actions._log_exception)(
                     __name__, error.message, e,
                     {
                         'board': self.scope['url_route']['kwargs']['board_slug'],
@@ -109,12 +118,13 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
         })
 
     async def group_update(self, code, data=None):
-        await self.channel_layer.group_send(self.board.group_name, {
-            'type': 'send.update',
-            'code': code,
-            'data': data,
-            'user': self.user.user_slug,
-        })
+        with phase('fanout'):
+            await self.channel_layer.group_send(self.board.group_name, {
+                'type': 'send.update',
+                'code': code,
+                'data': data,
+                'user': self.user.user_slug,
+            })
 
     async def receive_json(self, content):
         try:
@@ -125,8 +135,9 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                 command = BoardCommands.NO_COMMAND
                 missing = MissingCommand(e)
 
-            if await database_sync_to_async(throttle_command)(
-                command,
+            spec = COMMANDS.get(command)
+            if await athrottle_command(
+                spec.throttle or command if spec else command,
                 self.client_ip,
                 self.scope,
                 board=self.board.board_slug,
@@ -137,46 +148,17 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
             if missing:
                 raise missing
 
-            if command == BoardCommands.CREATE_MSG:
-                await self.create_message(content, command)
-            elif command == BoardCommands.TITLE:
-                await self.update_board_title(content, command)
-            elif command == BoardCommands.CREATE_TASK:
-                await self.create_task(content, command)
-            elif command == BoardCommands.UPDATE_TASK:
-                await self.update_task(content, command)
-            elif command == BoardCommands.MOVE_TASK:
-                await self.move_task(content, command)
-            elif command == BoardCommands.DELETE_TASK:
-                await self.delete_task(content, command)
-            elif command == BoardCommands.CREATE_COLUMN:
-                await self.create_column(content, command)
-            elif command == BoardCommands.UPDATE_COLUMN:
-                await self.update_column(content, command)
-            elif command == BoardCommands.MOVE_COLUMN:
-                await self.move_column(content, command)
-            elif command == BoardCommands.DELETE_COLUMN:
-                await self.delete_column(content, command)
-            elif command == BoardCommands.DISPLAY_NAME:
-                await self.update_member_display_name(content, command)
-            elif command == BoardCommands.ROLE:
-                await self.update_member_role(content, command)
-            elif command == BoardCommands.LEAVE:
-                await self.leave_board(command)
-            elif command == BoardCommands.REMOVE:
-                await self.remove_member(content, command)
-            elif command == BoardCommands.DELETE_BOARD:
-                await self.delete_board(command)
-            elif command == BoardCommands.INVITE:
-                await self.invite_member(content, command)
+            if settings.BOARD_ACTORS and command not in DIRECT_COMMANDS:
+                actor = await BoardActor.for_board(self.board.board_slug)
+                await actor.apply(self.apply_command, content, command)
             else:
-                raise ClientError(message='Invalid command', command=command)
+                await self.apply_command(content, command)
         except (ClientThrottled, InviteNotSent, DuplicateDisplayName) as e:
             e.user = self.user.user_slug
             await self.send_json(e.ws_error())
         except ClientError as e:
             e.user = self.user.user_slug
-            await database_sync_to_async(actions._log_exception)(
+            await self.on_board_thread(actions._log_exception)(
                 __name__, e.message, e.exception,
                 {
                     'board': self.board.board_slug,
@@ -187,10 +169,17 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                 },
             )
             await self.send_json(e.ws_error())
+            try:
+                await self.resync(e.command)
+            except ClientError as resync_error:
+                await self.on_board_thread(actions._log_exception)(
+                    __name__, resync_error.message, resync_error.exception,
+                    { 'board': self.board.board_slug, 'user': e.user },
+                )
         except Exception as e:
             error = ClientError(
                 e, code=ChannelCodes.SERVER, user=self.user.user_slug,)
-            await database_sync_to_async(actions._log_exception)(
+            await self.on_board_thread(actions._log_exception)(
                 __name__, error.message, e,
                 {
                     'board': self.board.board_slug,
@@ -201,15 +190,12 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
             )
             await self.send_json(error.ws_error())
 
-
-    @database_sync_to_async
     def get_user_or_error(self, user_slug):
         try:
             return get_user_model().objects.get(user_slug=user_slug)
         except Exception as e:
             raise UserFailed(e)
 
-    @database_sync_to_async
     def get_board_or_error(self):
         try:
             board = Board.objects.get(
@@ -248,9 +234,10 @@ class BoardConsumer(AsyncJsonWebsocketConsumer, ConsumerCommandsMixin):
                     },
                 )
 
+            BoardSnapshotCache.bump(board.board_slug)
             board.refresh_from_db()
             self.invitation = 'success'
 
-        if self.user not in board.users.all():
+        if not board.memberships.filter(user=self.user).exists():
             raise BoardFailed(message='Board access denied')
         return board
\ No newline at end of file
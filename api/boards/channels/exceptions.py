@@ -55,6 +55,27 @@ class ClientError(Exception):
         }
 
 
+class BatchFailed(ClientError):
+    '''
+    A batch of commands of which none were applied, carrying the error of
+    the command at `index` among the results of every command.
+    '''
+    def __init__(self, error, commands, index, **kwargs):
+        kwargs['command'] = kwargs.get('command', BoardCommands.BATCH)
+        kwargs['message'] = kwargs.get('message', 'Batch not applied')
+        super().__init__(error.exception, **kwargs)
+        self.detail = error.message
+        self.data = {
+            'results': [
+                {
+                    'command': command,
+                    'error': error.ws_error()['error'] if i == index else None,
+                }
+                for i, command in enumerate(commands)
+            ],
+        }
+
+
 class BoardFailed(ClientError):
     def __init__(self, exception=False, **kwargs):
         kwargs['code'] = kwargs.get('code', ChannelCodes.BOARD_FAILED)
@@ -0,0 +1,86 @@
+import threading
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+
+class BoardExecutor(object):
+    '''
+    Runs the database work of board commands on a bounded pool of threads,
+    instead of the single thread Channels runs thread-sensitive calls on.
+
+    Each board is pinned to one thread, so its work runs in the order it
+    was submitted while other boards' work runs alongside it. Each thread
+    keeps its own database connections, which `database_sync_to_async`
+    closes before and after each call once older than CONN_MAX_AGE.
+    '''
+
+    def __init__(self, workers):
+        self.workers = [
+            ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'board-db-{i}',)
+            for i in range(workers)
+        ]
+
+    def for_board(self, board_slug):
+        index = zlib.crc32(board_slug.encode()) % len(self.workers)
+        return self.workers[index]
+
+    def shutdown(self, wait=True):
+        for worker in self.workers:
+            worker.shutdown(wait=wait)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_board_executor():
+    '''The process's board executor, or None if BOARD_DB_WORKERS is 0.'''
+    global _executor
+
+    if not settings.BOARD_DB_WORKERS:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoardExecutor(settings.BOARD_DB_WORKERS)
+    return _executor
+
+
+def board_sync_to_async(board_slug, func):
+    '''
+    `func` made awaitable, run on the thread of board `board_slug`, or on
+    Channels' thread-sensitive thread if no board executor is configured.
+    '''
+    executor = get_board_executor()
+
+    if executor is None:
+        return database_sync_to_async(func)
+    return database_sync_to_async(
+        func, thread_sensitive=False, executor=executor.for_board(board_slug),)
+
+
+_mail_executor = None
+
+
+def mail_sync_to_async(func):
+    '''
+    `func` made awaitable, run on a pool of MAIL_WORKERS threads kept for
+    sending email, so a slow SMTP server holds neither a board's database
+    thread nor Channels' thread-sensitive one.
+    '''
+    global _mail_executor
+
+    if _mail_executor is None:
+        with _executor_lock:
+            if _mail_executor is None:
+                _mail_executor = ThreadPoolExecutor(
+                    max_workers=settings.MAIL_WORKERS,
+                    thread_name_prefix='mail',)
+    return sync_to_async(
+        func, thread_sensitive=False, executor=_mail_executor,)
@@ -1,54 +1,398 @@
 import re
 
-from channels.db import database_sync_to_async
 from datetime import timedelta
 from django.conf import settings
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
+from typing import NamedTuple, Optional
 from urllib import parse
 
 from boards.channels import actions
+from boards.channels.executor import board_sync_to_async, mail_sync_to_async
 from boards.channels.exceptions import (
-    ClientError, InvalidContent, InviteFailed, InviteNotSent, NotAllowed,)
+    BatchFailed, ClientError, ClientThrottled, InvalidContent, InviteFailed,
+    InviteNotSent, NotAllowed,)
 from boards.channels.utils import ChannelCodes
-from boards.utils import BoardRoles
+from boards.utils import BoardRoles, BoardCommands
 from invitations.models import InviteToken
 from utils import email_regex
+from utils.metrics import phase, timed_command
+from utils.throttling import athrottle_command
 
 
 ADMIN_ONLY_ROLES = [BoardRoles.ADMIN]
 STAFF_ROLES = [BoardRoles.ADMIN, BoardRoles.MODERATOR]
 NON_ADMIN_ROLES = [BoardRoles.MODERATOR, BoardRoles.MEMBER]
+TASK_COMMANDS = [
+    BoardCommands.CREATE_TASK, BoardCommands.UPDATE_TASK,
+    BoardCommands.MOVE_TASK, BoardCommands.DELETE_TASK,]
+COLUMN_COMMANDS = [
+    BoardCommands.CREATE_COLUMN, BoardCommands.UPDATE_COLUMN,
+    BoardCommands.MOVE_COLUMN, BoardCommands.DELETE_COLUMN,]
+
+
+class CommandSpec(NamedTuple):
+    '''
+    How the board consumer applies a command: the roles allowed to send it
+    (any member if None), the method parsing its content into the handler's
+    arguments (none if None), the handler method itself, and the throttle
+    scope it counts against (the command itself if None).
+    '''
+    handler: str
+    roles: Optional[list] = None
+    parse: Optional[str] = None
+    throttle: Optional[str] = None
+
+
+COMMANDS = {
+    BoardCommands.CREATE_MSG: CommandSpec(
+        'create_message', parse='parse_create_message'),
+    BoardCommands.READ_MSGS: CommandSpec(
+        'read_messages', parse='parse_read_messages'),
+    BoardCommands.TITLE: CommandSpec(
+        'update_board_title', ADMIN_ONLY_ROLES, 'parse_update_board_title'),
+    BoardCommands.CREATE_TASK: CommandSpec(
+        'create_task', parse='parse_create_task'),
+    BoardCommands.UPDATE_TASK: CommandSpec(
+        'update_task', parse='parse_update_task'),
+    BoardCommands.MOVE_TASK: CommandSpec(
+        'move_task', parse='parse_move_task'),
+    BoardCommands.DELETE_TASK: CommandSpec(
+        'delete_task', parse='parse_delete_task'),
+    BoardCommands.CREATE_COLUMN: CommandSpec(
+        'create_column', STAFF_ROLES, 'parse_create_column'),
+    BoardCommands.UPDATE_COLUMN: CommandSpec(
+        'update_column', STAFF_ROLES, 'parse_update_column'),
+    BoardCommands.MOVE_COLUMN: CommandSpec(
+        'move_column', STAFF_ROLES, 'parse_move_column'),
+    BoardCommands.DELETE_COLUMN: CommandSpec(
+        'delete_column', STAFF_ROLES, 'parse_delete_column'),
+    BoardCommands.DISPLAY_NAME: CommandSpec(
+        'update_member_display_name',
+        parse='parse_update_member_display_name'),
+    BoardCommands.ROLE: CommandSpec(
+        'update_member_role', ADMIN_ONLY_ROLES, 'parse_update_member_role'),
+    BoardCommands.LEAVE: CommandSpec('leave_board', NON_ADMIN_ROLES),
+    BoardCommands.REMOVE: CommandSpec(
+        'remove_member', ADMIN_ONLY_ROLES, 'parse_remove_member'),
+    BoardCommands.DELETE_BOARD: CommandSpec('delete_board', ADMIN_ONLY_ROLES),
+    BoardCommands.INVITE: CommandSpec(
+        'invite_member', STAFF_ROLES, 'parse_invite_member'),
+    # Roles depend on the commands batched, so they are checked by the handler
+    BoardCommands.BATCH: CommandSpec('apply_batch', parse='parse_batch'),
+}
+
+BATCH_MAX_SIZE = 50
+# Commands allowed in a batch: their action and the code of its result
+BATCH_COMMANDS = {
+    BoardCommands.CREATE_TASK: (
+        actions._create_task, ChannelCodes.TASK_CREATED),
+    BoardCommands.UPDATE_TASK: (
+        actions._update_task, ChannelCodes.TASK_UPDATED),
+    BoardCommands.MOVE_TASK: (actions._move_task, ChannelCodes.TASK_MOVED),
+    BoardCommands.DELETE_TASK: (
+        actions._delete_task, ChannelCodes.TASK_DELETED),
+    BoardCommands.CREATE_COLUMN: (
+        actions._create_column, ChannelCodes.COLUMN_CREATED),
+    BoardCommands.UPDATE_COLUMN: (
+        actions._update_column, ChannelCodes.COLUMN_UPDATED),
+    BoardCommands.MOVE_COLUMN: (
+        actions._move_column, ChannelCodes.COLUMN_MOVED),
+    BoardCommands.DELETE_COLUMN: (
+        actions._delete_column, ChannelCodes.COLUMN_DELETED),
+}
 
 
 class ConsumerCommandsMixin:
+    # Role of the connection's user, or None until it is looked up again
+    role = None
+    # Bumped on every role event, so a lookup that raced one is not cached
+    role_version = 0
+
+    async def apply_command(self, content, command):
+        '''
+        Check the sender's role, parse the content and run the handler the
+        command is registered with in COMMANDS.
+        '''
+        try:
+            spec = COMMANDS[command]
+        except KeyError:
+            raise ClientError(message='Invalid command', command=command)
+
+        with timed_command(command):
+            with phase('validation'):
+                if spec.roles is not None:
+                    await self.check_role(self.user, spec.roles, command)
+                if spec.parse is not None:
+                    args, kwargs = getattr(self, spec.parse)(content, command)
+                else:
+                    args, kwargs = (), {}
+
+            await getattr(self, spec.handler)(command, *args, **kwargs)
+
+    def on_board_thread(self, func):
+        '''`func` made awaitable, run on the board's database thread.'''
+        return board_sync_to_async(
+            self.scope['url_route']['kwargs']['board_slug'], func)
+
+    async def run_action(self, action, *args, **kwargs):
+        '''Run one of the sync board actions on the board's database thread.'''
+        with phase('db'):
+            return await self.on_board_thread(action)(*args, **kwargs)
+
+    async def get_member_role(self, user):
+        '''
+        Role of `user` on the board. The role of the connection's own user
+        is cached, and kept current by `member.role` group events.
+        '''
+        if user != self.user:
+            return await self.run_action(
+                actions._get_member_role, self.board, user,)
+
+        if self.role is None:
+            version = self.role_version
+            role = await self.run_action(
+                actions._get_member_role, self.board, user,)
+
+            if version == self.role_version:
+                self.role = role
+            return role
+        return self.role
+
+    async def member_role(self, event):
+        if event['user_slug'] == self.user.user_slug:
+            self.role = event['role']
+            self.role_version += 1
+
+    async def group_member_role(self, user_slug, role=None):
+        '''
+        Tell every connection on the board, on any node, that a member's
+        role changed, or that they left the board if `role` is None.
+        '''
+        await self.channel_layer.group_send(self.board.group_name, {
+            'type': 'member.role',
+            'user_slug': user_slug,
+            'role': role,
+        })
+
+    async def check_role(self, user, roles, command=None):
+        role = await self.get_member_role(user)
+
+        if not role in roles:
+            raise NotAllowed(command=command)
+        return
+
     async def check_is_staff(self, user, command=None, admin_only=False):
         if admin_only:
             roles = ADMIN_ONLY_ROLES
         else:
             roles = STAFF_ROLES
 
-        role = await database_sync_to_async(
-            actions._get_member_role,
-        )(self.board, user)
+        await self.check_role(user, roles, command)
+
+    async def resync(self, command):
+        '''
+        After a failed command, send this client the current state of the
+        part of the board it touched so it can drop any optimistic update.
+        '''
+        readers = []
+        if command in TASK_COMMANDS or command == BoardCommands.BATCH:
+            readers.append((ChannelCodes.TASKS_SAVED, actions._read_tasks))
+        if command in COLUMN_COMMANDS or command == BoardCommands.BATCH:
+            readers.append((ChannelCodes.COLUMNS_SAVED, actions._read_columns))
+
+        for code, reader in readers:
+            data = await self.run_action(reader, self.board, self.user)
+            await self.send_json({ 'code': code, 'data': data, 'user': None })
+
+    async def read_messages(self, command, *args):
+        page = await self.run_action(actions._read_messages_page, *args)
+
+        with phase('fanout'):
+            await self.send_json({
+                'code': ChannelCodes.MSGS_LOADED,
+                'data': page,
+                'user': self.user.user_slug,
+            })
+
+    async def update_board_title(self, command, *args):
+        board = await self.run_action(actions._update_board_title, *args)
+        await self.group_update(ChannelCodes.BOARD_UPDATED, board)
 
-        if not role in roles:
-            raise NotAllowed(command=command)
-        return
+    async def create_message(self, command, *args):
+        msg = await self.run_action(actions._create_msg, *args)
+        await self.group_update(ChannelCodes.MSG_CREATED, msg)
 
-    async def check_is_not_admin(self, user, command=None):
-        role = await database_sync_to_async(
-            actions._get_member_role,
-        )(self.board, user)
+    async def create_task(self, command, *args):
+        task = await self.run_action(actions._create_task, *args)
+        await self.group_update(ChannelCodes.TASK_CREATED, task)
+
+    async def update_task(self, command, *args):
+        task = await self.run_action(actions._update_task, *args)
+        await self.group_update(ChannelCodes.TASK_UPDATED, task)
+
+    async def move_task(self, command, *args):
+        moved = await self.run_action(actions._move_task, *args)
+        await self.group_update(ChannelCodes.TASK_MOVED, moved)
+
+    async def delete_task(self, command, *args):
+        deleted = await self.run_action(actions._delete_task, *args)
+        await self.group_update(ChannelCodes.TASK_DELETED, deleted)
+
+    async def create_column(self, command, *args, **kwargs):
+        column = await self.run_action(actions._create_column, *args, **kwargs)
+        await self.group_update(ChannelCodes.COLUMN_CREATED, column)
+
+    async def update_column(self, command, *args, **kwargs):
+        column = await self.run_action(actions._update_column, *args, **kwargs)
+        await self.group_update(ChannelCodes.COLUMN_UPDATED, column)
+
+    async def move_column(self, command, *args):
+        moved = await self.run_action(actions._move_column, *args)
+        await self.group_update(ChannelCodes.COLUMN_MOVED, moved)
+
+    async def delete_column(self, command, *args):
+        deleted = await self.run_action(actions._delete_column, *args)
+        await self.group_update(ChannelCodes.COLUMN_DELETED, deleted)
+
+    async def apply_batch(self, command, names, steps):
+        '''
+        Apply an ordered list of task and column commands in a single
+        transaction, then broadcast every result in one message. If any
+        command fails, none are applied.
+        '''
+        # Each command counts against its own rates, as if sent alone
+        for name in names:
+            if await athrottle_command(
+                COMMANDS[name].throttle or name,
+                self.client_ip,
+                self.scope,
+                board=self.board.board_slug,
+                user=self.user.user_slug,
+            ):
+                raise ClientThrottled(command=command)
+
+        if any(name in COLUMN_COMMANDS for name in names):
+            with phase('validation'):
+                await self.check_is_staff(self.user, command)
+
+        data = await self.run_action(actions._apply_batch, steps)
+
+        await self.group_update(ChannelCodes.BATCH_APPLIED, {
+            'results': [
+                { 'command': name, 'code': BATCH_COMMANDS[name][1], 'data': d }
+                for name, d in zip(names, data)
+            ],
+        })
 
-        if role == BoardRoles.ADMIN:
-            raise NotAllowed(command=command)
-        return
+    async def update_member_role(self, command, user_slug, role):
+        member = await self.on_board_thread(self.get_user_or_error)(
+            user_slug)
+        membership = await self.run_action(
+            actions._update_member_role, self.board, member, role,)
+
+        await self.group_member_role(user_slug, role)
+        await self.group_update(ChannelCodes.MEMBER_UPDATED, membership)
+
+    async def update_member_display_name(self, command, *args):
+        membership = await self.run_action(
+            actions._update_member_display_name, *args,)
+        await self.group_update(ChannelCodes.MEMBER_UPDATED, membership)
+
+    async def leave_board(self, command):
+        await self.run_action(
+            actions._remove_member, self.board, self.user, command,)
+
+        await self.group_member_role(self.user.user_slug)
+        await self.group_update(ChannelCodes.MEMBER_REMOVED, {
+            'user_slug': self.user.user_slug,
+        })
+
+    async def remove_member(self, command, user_slug):
+        member = await self.on_board_thread(self.get_user_or_error)(
+            user_slug)
+        await self.run_action(
+            actions._remove_member, self.board, member, command,)
+
+        await self.group_member_role(user_slug)
+        await self.group_update(ChannelCodes.MEMBER_REMOVED, {
+            'user_slug': user_slug,
+        })
+
+    async def delete_board(self, command):
+        await self.run_action(actions._delete_board, self.board.board_slug)
+        await self.group_update(ChannelCodes.BOARD_DELETED, 'Project deleted')
 
-    async def update_board_title(self, content, command):
-        await self.check_is_staff(self.user, command, admin_only=True)
+    async def invite_member(self, command, email):
+        can_be_invited = await self.on_board_thread(
+            self.check_member_can_be_invited)(email)
+        if can_be_invited:
+            invitation = await self.run_action(
+                actions._create_invitation, self.board, email,)
 
+            subject = (
+                f'{self.user.name} has invited you to '
+                f'collaborate with SimpleKanban!')
+
+            link = await self.on_board_thread(self.get_invite_link)(invitation)
+
+            html_message = render_to_string(
+                'email_invite.html',
+                {
+                    'board_title': self.board.board_title,
+                    'invite_link': link,
+                },
+            )
+
+            plain_message = strip_tags(html_message)
+
+            try:
+                invite_sent = await mail_sync_to_async(self.send_invite)(
+                    subject, plain_message, email, html_message,)
+            except Exception as e:
+                await self.run_action(
+                    actions._delete_invitation,
+                    self.board,
+                    self.user,
+                    invitation,
+                    self.client_ip,
+                    self.scope,
+                )
+                raise InviteFailed(e)
+
+            if invite_sent:
+                message = f'Invitation sent to {email}'
+                await self.send_json({
+                    'code': ChannelCodes.INVITE_SENT,
+                    'message': message,
+                    'user': self.user.user_slug,
+                })
+            else:
+                await self.run_action(
+                    actions._delete_invitation,
+                    self.board,
+                    self.user,
+                    invitation,
+                    self.client_ip,
+                    self.scope,
+                )
+                raise InviteFailed()
+        else:
+            raise InviteFailed()
+
+    def parse_read_messages(self, content, command):
+        try:
+            before = content.get('msg_id')
+
+            if before is not None and not isinstance(before, int):
+                raise TypeError('msg_id')
+        except (AttributeError, TypeError) as e:
+            raise InvalidContent(e, command=command)
+
+        return (self.board, self.user, before), {}
+
+    def parse_update_board_title(self, content, command):
         try:
             board_title = content['board_title'].strip()
 
@@ -59,13 +403,9 @@ class ConsumerCommandsMixin:
         except (KeyError, AttributeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        board = await database_sync_to_async(
-            actions._update_board_title,
-        )(self.board, self.user, board_title)
-
-        await self.group_update(ChannelCodes.BOARD_UPDATED, board)
+        return (self.board, self.user, board_title), {}
 
-    async def create_message(self, content, command):
+    def parse_create_message(self, content, command):
         if not self.board.messages_allowed:
             raise NotAllowed(command=command)
 
@@ -79,13 +419,9 @@ class ConsumerCommandsMixin:
         except (KeyError, AttributeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        msg = await database_sync_to_async(
-            actions._create_msg,
-        )(self.board, self.user, board_msg)
+        return (self.board, self.user, board_msg), {}
 
-        await self.group_update(ChannelCodes.MSG_CREATED, msg)
-
-    async def create_task(self, content, command):
+    def parse_create_task(self, content, command):
         try:
             column_id = content['column_id']
             text = content['text'].strip()
@@ -101,19 +437,9 @@ class ConsumerCommandsMixin:
         except (KeyError, AttributeError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(
-            actions._create_task,
-        )(self.board, self.user, column_id, text)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
+        return (self.board, self.user, column_id, text), {}
 
-        tasks = serialized_board['tasks']
-
-        await self.group_update(ChannelCodes.TASKS_SAVED, tasks)
-
-    async def update_task(self, content, command):
+    def parse_update_task(self, content, command):
         try:
             task_id = content['task_id']
             text = content['text'].strip()
@@ -129,19 +455,9 @@ class ConsumerCommandsMixin:
         except (KeyError, AttributeError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(
-            actions._update_task,
-        )(self.board, self.user, task_id, text)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        tasks = serialized_board['tasks']
+        return (self.board, self.user, task_id, text), {}
 
-        await self.group_update(ChannelCodes.TASKS_SAVED, tasks)
-
-    async def move_task(self, content, command):
+    def parse_move_task(self, content, command):
         try:
             task_id = content['task_id']
             column_id = content['column_id']
@@ -160,19 +476,9 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(
-            actions._move_task,
-        )(self.board, self.user, task_id, column_id, task_index)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        tasks = serialized_board['tasks']
+        return (self.board, self.user, task_id, column_id, task_index), {}
 
-        await self.group_update(ChannelCodes.TASKS_SAVED, tasks)
-
-    async def delete_task(self, content, command):
+    def parse_delete_task(self, content, command):
         try:
             task_id = content['task_id']
 
@@ -183,23 +489,9 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(actions._delete_task)(task_id)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        tasks = serialized_board['tasks']
-
-        deleted_task = next((
-            task for task in tasks if task['task_id'] == task_id
-        ), None)
-
-        await self.group_update(ChannelCodes.TASKS_SAVED, tasks)
-
-    async def create_column(self, content, command):
-        await self.check_is_staff(self.user, command)
+        return (task_id,), {}
 
+    def parse_create_column(self, content, command):
         try:
             column_title = content['column_title'].strip()
             wip_limit_on = content['wip_limit_on']
@@ -218,27 +510,13 @@ class ConsumerCommandsMixin:
         except (KeyError, AttributeError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(
-            actions._create_column,
-        )(
-            self.board,
-            self.user,
+        return (self.board, self.user), dict(
             column_title=column_title,
             wip_limit_on=wip_limit_on,
             wip_limit=wip_limit,
         )
 
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        columns = serialized_board['columns']
-
-        await self.group_update(ChannelCodes.COLUMNS_SAVED, columns)
-
-    async def update_column(self, content, command):
-        await self.check_is_staff(self.user, command)
-
+    def parse_update_column(self, content, command):
         try:
             column_id = content['column_id']
             column_title = content.get('column_title')
@@ -261,21 +539,9 @@ class ConsumerCommandsMixin:
         if wip_limit and isinstance(wip_limit, int):
             kwargs['wip_limit'] = wip_limit
 
-        await database_sync_to_async(
-            actions._update_column,
-        )(self.board, self.user, column_id, **kwargs)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        columns = serialized_board['columns']
-
-        await self.group_update(ChannelCodes.COLUMNS_SAVED, columns)
-
-    async def move_column(self, content, command):
-        await self.check_is_staff(self.user, command)
+        return (self.board, self.user, column_id), kwargs
 
+    def parse_move_column(self, content, command):
         try:
             column_id = content['column_id']
             column_index = content['column_index']
@@ -289,21 +555,9 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(
-            actions._move_column,
-        )(self.board, self.user, column_id, column_index)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        columns = serialized_board['columns']
-
-        await self.group_update(ChannelCodes.COLUMNS_SAVED, columns)
-
-    async def delete_column(self, content, command):
-        await self.check_is_staff(self.user, command)
+        return (self.board, self.user, column_id, column_index), {}
 
+    def parse_delete_column(self, content, command):
         try:
             column_id = content['column_id']
 
@@ -314,19 +568,39 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        await database_sync_to_async(actions._delete_column)(column_id)
+        return (column_id,), {}
+
+    def parse_batch(self, content, command):
+        try:
+            frames = content['commands']
+
+            if not isinstance(frames, list):
+                raise TypeError('commands')
+            if not frames:
+                raise ValueError('commands cannot be empty')
+            if len(frames) > BATCH_MAX_SIZE:
+                raise ValueError(
+                    f'commands cannot be longer than {BATCH_MAX_SIZE}')
 
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
+            names = [frame['command'] for frame in frames]
 
-        columns = serialized_board['columns']
+            for name in names:
+                if name not in BATCH_COMMANDS:
+                    raise ValueError(f'command cannot be "{name}"')
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidContent(e, command=command)
 
-        await self.group_update(ChannelCodes.COLUMNS_SAVED, columns)
+        steps = []
+        for index, (name, frame) in enumerate(zip(names, frames)):
+            parse = getattr(self, COMMANDS[name].parse)
+            try:
+                steps.append((name, BATCH_COMMANDS[name][0], *parse(frame, name)))
+            except ClientError as e:
+                raise BatchFailed(e, names, index)
 
-    async def update_member_role(self, content, command):
-        await self.check_is_staff(self.user, command, admin_only=True)
+        return (names, steps), {}
 
+    def parse_update_member_role(self, content, command):
         try:
             user_slug = content['user_slug']
             role = content['role']
@@ -340,23 +614,9 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        member = await self.get_user_or_error(user_slug)
-        membership = await database_sync_to_async(
-            actions._update_member_role,
-        )(self.board, member, role)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        memberships = serialized_board['memberships']
-
-        await self.group_update(ChannelCodes.MEMBERS_SAVED, {
-            'updated_slugs': [user_slug],
-            'members': memberships,
-        })
+        return (user_slug, role), {}
 
-    async def update_member_display_name(self, content, command):
+    def parse_update_member_display_name(self, content, command):
         try:
             display_name = content['display_name']
 
@@ -365,36 +625,9 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        membership = await database_sync_to_async(
-            actions._update_member_display_name,
-        )(self.board, self.user, display_name)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        memberships = serialized_board['memberships']
-
-        await self.group_update(ChannelCodes.MEMBERS_SAVED, memberships)
-
-    async def leave_board(self, command):
-        await self.check_is_not_admin(self.user, command)
-
-        await database_sync_to_async(
-            actions._remove_member,
-        )(self.board, self.user, command)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        memberships = serialized_board['memberships']
-
-        await self.group_update(ChannelCodes.MEMBERS_SAVED, memberships)
-
-    async def remove_member(self, content, command):
-        await self.check_is_staff(self.user, command, admin_only=True)
+        return (self.board, self.user, display_name), {}
 
+    def parse_remove_member(self, content, command):
         try:
             user_slug = content['user_slug']
 
@@ -405,100 +638,22 @@ class ConsumerCommandsMixin:
         except (KeyError, TypeError, ValueError) as e:
             raise InvalidContent(e, command=command)
 
-        member = await self.get_user_or_error(user_slug)
-        await database_sync_to_async(
-            actions._remove_member,
-        )(self.board, member, command)
-
-        serialized_board = await database_sync_to_async(
-            actions._read_board,
-        )(self.board, self.user)
-
-        memberships = serialized_board['memberships']
-
-        await self.group_update(ChannelCodes.MEMBERS_SAVED, memberships)
-
-    async def delete_board(self, command):
-        await self.check_is_staff(self.user, command, admin_only=True)
-
-        await database_sync_to_async(
-            actions._delete_board,
-        )(self.board.board_slug)
+        return (user_slug,), {}
 
-        await self.group_update(ChannelCodes.BOARD_DELETED, 'Project deleted')
+    def parse_invite_member(self, content, command):
+        if not self.board.new_members_allowed:
+            raise NotAllowed(command=command)
 
-    async def invite_member(self, content, command):
-        await self.check_is_staff(self.user, command)
+        try:
+            email = content['invite_email'].strip().lower()
 
-        if self.board.new_members_allowed:
-            try:
-                email = content['invite_email'].strip().lower()
-
-                if not re.search(email_regex(), email):
-                    raise ValueError('invite_email')
-            except (KeyError, AttributeError, TypeError, ValueError) as e:
-                raise InvalidContent(e, command=command)
-
-            if await self.check_member_can_be_invited(email):
-                invitation = await database_sync_to_async(
-                    actions._create_invitation,
-                )(self.board, email)
-
-                subject = (
-                    f'{self.user.name} has invited you to '
-                    f'collaborate with SimpleKanban!')
-
-                link = await self.get_invite_link(invitation)
-
-                html_message = render_to_string(
-                    'email_invite.html',
-                    {
-                        'board_title': self.board.board_title,
-                        'invite_link': link,
-                    },
-                )
+            if not re.search(email_regex(), email):
+                raise ValueError('invite_email')
+        except (KeyError, AttributeError, TypeError, ValueError) as e:
+            raise InvalidContent(e, command=command)
 
-                plain_message = strip_tags(html_message)
-
-                try:
-                    invite_sent = await self.send_invite(
-                        subject, plain_message, email, html_message,)
-                except Exception as e:
-                    await database_sync_to_async(
-                        actions._delete_invitation,
-                    )(
-                        self.board,
-                        self.user,
-                        invitation,
-                        self.client_ip,
-                        self.scope,
-                    )
-                    raise InviteFailed(e)
-
-                if invite_sent:
-                    message = f'Invitation sent to {email}'
-                    await self.send_json({
-                        'code': ChannelCodes.INVITE_SENT,
-                        'message': message,
-                        'user': self.user.user_slug,
-                    })
-                else:
-                    await database_sync_to_async(
-                        actions._delete_invitation,
-                    )(
-                        self.board,
-                        self.user,
-                        invitation,
-                        self.client_ip,
-                        self.scope,
-                    )
-                    raise InviteFailed()
-            else:
-                raise InviteFailed()
-        else:
-            raise NotAllowed(command=command)
+        return (email,), {}
 
-    @database_sync_to_async
     def check_member_can_be_invited(self, email):
         current_members = self.board.users
         members_invited = self.board.invitations
@@ -520,7 +675,6 @@ class ConsumerCommandsMixin:
             raise InviteNotSent(message=message)
         return True
 
-    @database_sync_to_async
     def get_invite_link(self, invitation):
         try:
             token = InviteToken.objects.create(invitation, timedelta(days=7))
@@ -539,7 +693,6 @@ class ConsumerCommandsMixin:
             f'?board={board_slug}&token={invite_token}&email={invite_email}'
         )
 
-    @database_sync_to_async
     def send_invite(self, subject, message, recipient, html_message):
         return send_mail(
             subject,
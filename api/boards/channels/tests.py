@@ -1,20 +1,32 @@
+import asyncio
+import multiprocessing
 import re
+import threading
+import time
 
+from datetime import timedelta
 from pprint import pprint
+from unittest import mock
 from urllib import parse
 
 from channels.db import database_sync_to_async
 from channels.testing import WebsocketCommunicator
 from django.conf import settings
 from django.core import mail
-from django.test import TransactionTestCase, override_settings
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
 from django_redis import get_redis_connection
+from freezegun import freeze_time
 
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+from authentication.utils import AuthCommands
 from boards.channels import actions
+from boards.channels.actors import BoardActor
+from boards.channels.executor import (
+    BoardExecutor, board_sync_to_async, mail_sync_to_async,)
 from boards.channels.utils import ChannelCodes
 from boards.models import Board, BoardMembership
 from boards.serializers import BoardSerializer, BoardMembershipSerializer
@@ -24,8 +36,12 @@ from custom_db_logger.serializers import StatusLogSerializer
 from custom_db_logger.utils import LogLevels
 from simplekanban_api.websocket_router import application
 from users.serializers import ReadOnlyUserSerializer
+from utils.metrics import command_latency
+from utils.throttling import (
+    CustomRateThrottle, athrottle_command, local_leases, throttle_command,)
 from utils.testing import (
-    create_board, create_user, log_msg_regex, test_user_2, test_user_3,
+    create_board, create_user, log_digests, log_msg_regex, send_log_digests,
+    short_lived_db_connections, synchronous_db_logs, test_user_2, test_user_3,
     test_user_4,)
 
 
@@ -35,7 +51,366 @@ TEST_CHANNEL_LAYERS = {
     }
 }
 
+# Board commands throttled with GCRA
+GCRA_REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+        'create_msg': ['gcra:60/m'],
+        'default': ['gcra:120/m'],
+    },
+}
+
+
+class BoardActorTest(SimpleTestCase):
+    async def test_commands_run_one_at_a_time_in_order(self):
+        actor = await BoardActor.for_board('abcdefghij')
+        self.assertIs(await BoardActor.for_board('abcdefghij'), actor)
+        events = []
+
+        async def command(i):
+            events.append(('start', i))
+            await asyncio.sleep(0.01)
+            events.append(('end', i))
+            if i == 3:
+                raise ValueError(i)
+            return i
+
+        results = await asyncio.gather(
+            *[actor.apply(command, i) for i in range(5)],
+            return_exceptions=True,)
+
+        self.assertListEqual(results[:3] + results[4:], [0, 1, 2, 4])
+        self.assertIsInstance(results[3], ValueError)
+        self.assertListEqual(
+            events,
+            [(event, i) for i in range(5) for event in ('start', 'end')],)
+
+    @mock.patch('boards.channels.actors.ACTOR_IDLE_TIMEOUT', 0.1)
+    async def test_idle_actor_stops_and_is_evicted(self):
+        actor = await BoardActor.for_board('abcdefghij')
+        await asyncio.sleep(0.2)
+        self.assertTrue(actor.stopped)
+        self.assertNotIn(
+            (asyncio.get_running_loop(), 'abcdefghij'), BoardActor.actors)
+        self.assertIsNot(await BoardActor.for_board('abcdefghij'), actor)
+
+    async def test_commands_wait_for_a_stopped_actor_to_drain(self):
+        actor = await BoardActor.for_board('abcdefghij')
+        events = []
+
+        async def command(i):
+            events.append(('start', i))
+            await asyncio.sleep(0.02)
+            events.append(('end', i))
+            return i
+
+        queued = [
+            asyncio.ensure_future(actor.apply(command, i)) for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        # Stopped while running the first command, with two still queued
+        actor.task.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(actor.stopped)
+
+        self.assertEqual(await actor.apply(command, 3), 3)
+        results = await asyncio.gather(*queued, return_exceptions=True)
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertListEqual(results[1:], [1, 2])
+        self.assertListEqual(
+            events,
+            [('start', 0)] +
+            [(event, i) for i in range(1, 4) for event in ('start', 'end')],)
+        self.assertIsNot(await BoardActor.for_board('abcdefghij'), actor)
+
+
+class BoardExecutorTest(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.executor = BoardExecutor(4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def _run(self, board_slug, func):
+        return database_sync_to_async(
+            func,
+            thread_sensitive=False,
+            executor=self.executor.for_board(board_slug),)()
+
+    async def test_board_commands_run_in_order(self):
+        events = []
+
+        def command(i):
+            events.append(('start', i))
+            time.sleep(0.01)
+            events.append(('end', i))
+            return threading.current_thread().name
+
+        threads = await asyncio.gather(*[
+            self._run('abcdefghij', lambda i=i: command(i)) for i in range(5)
+        ])
+
+        self.assertEqual(len(set(threads)), 1)
+        self.assertListEqual(
+            events,
+            [(event, i) for i in range(5) for event in ('start', 'end')],)
+
+    async def test_boards_run_in_parallel(self):
+        slugs = {}
+        for i in range(100):
+            board_slug = f'board{i:05}'
+            slugs.setdefault(self.executor.for_board(board_slug), board_slug)
+        self.assertEqual(len(slugs), 4)
+
+        # Each command waits on the others, so would time out if run in turn
+        barrier = threading.Barrier(4, timeout=5)
+        await asyncio.gather(*[
+            self._run(board_slug, barrier.wait) for board_slug in slugs.values()
+        ])
+
+    async def test_board_threads_keep_their_connections(self):
+        def backend_pid():
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                return cursor.fetchone()[0]
+
+        try:
+            pid_1 = await self._run('abcdefghij', backend_pid)
+            pid_2 = await self._run('abcdefghij', backend_pid)
+        finally:
+            await self._run('abcdefghij', connections.close_all)
+        self.assertEqual(pid_1, pid_2)
+
+    @override_settings(BOARD_DB_WORKERS=0)
+    async def test_no_workers_runs_thread_sensitive(self):
+        thread_1 = await board_sync_to_async(
+            'abcdefghij', lambda: threading.current_thread(),)()
+        thread_2 = await board_sync_to_async(
+            'bcdefghijk', lambda: threading.current_thread(),)()
+        self.assertIs(thread_1, thread_2)
+        self.assertFalse(thread_1.name.startswith('board-db-'))
+
+    async def test_mail_is_sent_off_the_database_threads(self):
+        sent = threading.Event()
+
+        def send():
+            sent.wait(5)
+            return threading.current_thread().name
+
+        # Board work runs while an email is still being sent
+        sending = asyncio.ensure_future(mail_sync_to_async(send)())
+        await board_sync_to_async('abcdefghij', lambda: None)()
+        await database_sync_to_async(lambda: None)()
+        sent.set()
+        self.assertTrue((await sending).startswith('mail'))
+
+
+@synchronous_db_logs()
+class ThrottleTest(TransactionTestCase):
+    databases = '__all__'
 
+    def setUp(self):
+        local_leases.clear()
+
+    def tearDown(self):
+        local_leases.clear()
+        get_redis_connection('default').flushall()
+
+    async def test_async_throttle_shares_history(self):
+        # 'create_msg' allows 60 per minute
+        for i in range(30):
+            self.assertFalse(await database_sync_to_async(throttle_command)(
+                BoardCommands.CREATE_MSG, '127.0.0.1',))
+            self.assertFalse(await athrottle_command(
+                BoardCommands.CREATE_MSG, '127.0.0.1',))
+
+        self.assertTrue(await athrottle_command(
+            BoardCommands.CREATE_MSG, '127.0.0.1',))
+        self.assertTrue(await database_sync_to_async(throttle_command)(
+            BoardCommands.CREATE_MSG, '127.0.0.1',))
+        self.assertFalse(await athrottle_command(
+            BoardCommands.CREATE_MSG, '127.0.0.2',))
+
+        # Logged once per window, whichever throttle saw it first
+        count = await database_sync_to_async(
+            StatusLog.objects.using('logger').filter(
+                msg__contains='Client was throttled.',
+            ).count)()
+        self.assertEqual(count, 1)
+
+    def test_concurrent_requests_are_all_counted(self):
+        # 'create_msg' allows 60 per minute
+        results = []
+        barrier = threading.Barrier(20)
+
+        def send():
+            try:
+                barrier.wait()
+                for i in range(4):
+                    results.append(throttle_command(
+                        BoardCommands.CREATE_MSG, '127.0.0.1',))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=send) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(False), 60)
+        self.assertEqual(results.count(True), 20)
+        self.assertEqual(
+            StatusLog.objects.using('logger').filter(
+                msg__contains='Client was throttled.',
+            ).count(),
+            1,)
+
+    @override_settings(REST_FRAMEWORK=GCRA_REST_FRAMEWORK)
+    def test_gcra_throttle(self):
+        # 'create_msg' allows bursts of 60, then one a second
+        redis = get_redis_connection('default')
+        with freeze_time() as frozen:
+            for i in range(60):
+                self.assertFalse(throttle_command(
+                    BoardCommands.CREATE_MSG, '127.0.0.1',))
+            for i in range(2):
+                self.assertTrue(throttle_command(
+                    BoardCommands.CREATE_MSG, '127.0.0.1',))
+
+            frozen.tick(timedelta(seconds=1))
+            self.assertFalse(throttle_command(
+                BoardCommands.CREATE_MSG, '127.0.0.1',))
+            for i in range(2):
+                self.assertTrue(throttle_command(
+                    BoardCommands.CREATE_MSG, '127.0.0.1',))
+
+            throttle = CustomRateThrottle(
+                BoardCommands.CREATE_MSG, 'gcra:60/m', '127.0.0.1',)
+            self.assertFalse(throttle.allow_request())
+            self.assertAlmostEqual(throttle.wait(), 1, places=3)
+
+        # One key of a single timestamp, and throttling logged once each time
+        # requests were allowed again
+        keys = [
+            key for key in redis.keys('*throttle_gcra_create_msg_*')
+            if not key.endswith(b':logged')
+        ]
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(redis.type(keys[0]), b'string')
+        self.assertEqual(
+            StatusLog.objects.using('logger').filter(
+                msg__contains='Client was throttled.',
+            ).count(),
+            2,)
+
+    def test_leases_bound_requests_across_processes(self):
+        # 'default' allows 120 a minute, and each process reserves the 2 a
+        # second of it at once
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(4)
+        queue = context.Queue()
+
+        def send():
+            barrier.wait()
+            allowed = sum(
+                not throttle_command(BoardCommands.MOVE_TASK, '127.0.0.1')
+                for i in range(50)
+            )
+            connections.close_all()
+            queue.put(allowed)
+
+        connections.close_all()
+        processes = [context.Process(target=send) for i in range(4)]
+        for process in processes:
+            process.start()
+        allowed = sum(queue.get(timeout=30) for process in processes)
+        for process in processes:
+            process.join()
+
+        self.assertLessEqual(allowed, 120)
+        self.assertGreaterEqual(allowed, 120 - 4 * (2 - 1))
+
+    @override_settings(
+        REST_FRAMEWORK=GCRA_REST_FRAMEWORK, THROTTLE_LEASE_FRACTION=0.5,
+        THROTTLE_LEASE_SECONDS=30,)
+    def test_leased_requests_skip_redis(self):
+        redis = get_redis_connection('default')
+        throttle = CustomRateThrottle(
+            BoardCommands.MOVE_TASK, 'gcra:120/m', '127.0.0.1',)
+        throttle.prepare(0)
+
+        # One request reserves 60, so the next 59 leave the TAT untouched
+        self.assertFalse(throttle_command(BoardCommands.MOVE_TASK, '127.0.0.1'))
+        tat = redis.get(throttle.key)
+        for i in range(59):
+            self.assertFalse(throttle_command(
+                BoardCommands.MOVE_TASK, '127.0.0.1',))
+        self.assertEqual(redis.get(throttle.key), tat)
+
+        # Then the rest of the limit, and no more
+        self.assertFalse(throttle_command(BoardCommands.MOVE_TASK, '127.0.0.1'))
+        self.assertNotEqual(redis.get(throttle.key), tat)
+        for i in range(59):
+            self.assertFalse(throttle_command(
+                BoardCommands.MOVE_TASK, '127.0.0.1',))
+        self.assertTrue(throttle_command(BoardCommands.MOVE_TASK, '127.0.0.1'))
+
+    @override_settings(THROTTLE_LEASE_FRACTION=0.5, THROTTLE_LEASE_SECONDS=5)
+    def test_unused_leased_requests_are_handed_back(self):
+        redis = get_redis_connection('default')
+        window = CustomRateThrottle(
+            BoardCommands.MOVE_TASK, '120/m', '127.0.0.1',)
+        gcra = CustomRateThrottle(
+            BoardCommands.MOVE_TASK, 'gcra:120/m', '127.0.0.1',)
+        window.prepare(0)
+        gcra.prepare(0)
+        # Each reserves the 10 requests the rate allows in a lease
+        self.assertEqual(window.cost, 10)
+
+        # One request every 2 seconds spends 3 of each reservation, and
+        # the other 7 are handed back with the next one
+        with freeze_time() as frozen:
+            for i in range(90):
+                for rate in ('120/m', 'gcra:120/m'):
+                    throttle = CustomRateThrottle(
+                        BoardCommands.MOVE_TASK, rate, '127.0.0.1',)
+                    self.assertTrue(throttle.allow_request())
+                frozen.tick(timedelta(seconds=2))
+            now = time.time()
+
+            # The last minute's 30 requests, and those left of the lease
+            self.assertLessEqual(redis.zcard(window.key), 30 + 9)
+            self.assertLessEqual(
+                int(redis.get(gcra.key)) / 1000000 - now, 5)
+
+    def test_slow_rates_are_not_leased(self):
+        # Reservations are at most the requests allowed in a second
+        for rate in ('60/d', 'gcra:60/d', '50/m', '120/m'):
+            throttle = CustomRateThrottle(
+                AuthCommands.LOGIN, rate, '127.0.0.1',)
+            throttle.prepare(0)
+            self.assertEqual(throttle.cost, 2 if rate == '120/m' else 1)
+
+    def test_windows_expire_with_their_rate(self):
+        # 'login' allows 15 per minute and 60 per day
+        self.assertFalse(throttle_command(AuthCommands.LOGIN, '127.0.0.1'))
+        redis = get_redis_connection('default')
+        keys = sorted(redis.keys('*throttle_window_login_*'))
+        self.assertEqual(len(keys), 2)
+        self.assertTrue(keys[0].endswith(b'_15_m'))
+        self.assertAlmostEqual(redis.pttl(keys[0]), 60 * 1000, delta=1000)
+        self.assertTrue(keys[1].endswith(b'_60_d'))
+        self.assertAlmostEqual(
+            redis.pttl(keys[1]), 24 * 60 * 60 * 1000, delta=1000)
+
+
+@log_digests()
+@short_lived_db_connections()
+@synchronous_db_logs()
 class TestWebsockets(TransactionTestCase):
     databases = '__all__'
 
@@ -58,6 +433,7 @@ class TestWebsockets(TransactionTestCase):
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Missing command', LogLevels.ERROR))
         self.assertEqual(log_1['command'], BoardCommands.NO_COMMAND)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Missing command')
@@ -76,6 +452,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(log_2['command'], BoardCommands.NO_COMMAND)
         self.assertEqual(log_2['board'], board.board_slug)
         self.assertEqual(log_2['user'], user.user_slug)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 2)
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Client was throttled.')
@@ -100,6 +477,7 @@ class TestWebsockets(TransactionTestCase):
         log_3 = await self._get_status_log(latest=True)
         self.assertRegex(log_3['msg'], log_msg_regex('Invalid command', LogLevels.ERROR))
         self.assertEqual(log_3['command'], 'not_recognized')
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 3)
         self.assertEqual(mail.outbox[2].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid command')
@@ -119,6 +497,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(log_4['metadata']['invalid_command'], 'unrecognized')
         self.assertEqual(log_4['board'], board.board_slug)
         self.assertEqual(log_4['user'], user.user_slug)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 4)
         self.assertEqual(mail.outbox[3].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Client was throttled.')
@@ -168,6 +547,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_blank['error']['command'], BoardCommands.CREATE_MSG)
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -182,6 +562,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_missing['error']['command'], BoardCommands.CREATE_MSG)
         log_2 = await self._get_status_log(latest=True)
         self.assertRegex(log_2['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 2)
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -199,6 +580,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_nonstring['error']['command'], BoardCommands.CREATE_MSG)
         log_3 = await self._get_status_log(latest=True)
         self.assertRegex(log_3['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 3)
         self.assertEqual(mail.outbox[2].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -222,6 +604,73 @@ class TestWebsockets(TransactionTestCase):
         await communicator_1.disconnect()
         await communicator_2.disconnect()
 
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_user_can_read_msgs_page(self):
+        user = await database_sync_to_async(create_user)()
+        board = await database_sync_to_async(create_board)(user)
+        msgs = [
+            await database_sync_to_async(actions._create_msg)(
+                board, user, f'Message {i}',)
+            for i in range(3)
+        ]
+        communicator = await self._auth_connect(user, board.board_slug)
+        await communicator.receive_json_from()
+
+        # Test fail read page w/ non-integer msg_id
+        await communicator.send_json_to({
+            'command': BoardCommands.READ_MSGS,
+            'msg_id': 'abc',
+        })
+        res_invalid = await communicator.receive_json_from()
+        self.assertEqual(res_invalid['code'], ChannelCodes.ERROR)
+        self.assertEqual(res_invalid['error']['message'], 'Invalid content')
+        self.assertEqual(res_invalid['error']['command'], BoardCommands.READ_MSGS)
+        self.assertEqual(await self._get_status_log_count(), 1)
+
+        # Test read latest page
+        await communicator.send_json_to({ 'command': BoardCommands.READ_MSGS })
+        response_1 = await communicator.receive_json_from()
+        self.assertEqual(response_1['code'], ChannelCodes.MSGS_LOADED)
+        self.assertListEqual(response_1['data']['messages'], msgs)
+        self.assertFalse(response_1['data']['has_more'])
+        self.assertEqual(response_1['user'], user.user_slug)
+
+        # Test read page before a message
+        page = await database_sync_to_async(actions._read_messages_page)(
+            board, user, msgs[2]['msg_id'], 1,)
+        self.assertListEqual(page['messages'], [msgs[1]])
+        self.assertTrue(page['has_more'])
+        await communicator.send_json_to({
+            'command': BoardCommands.READ_MSGS,
+            'msg_id': msgs[1]['msg_id'],
+        })
+        response_2 = await communicator.receive_json_from()
+        self.assertListEqual(response_2['data']['messages'], [msgs[0]])
+        self.assertFalse(response_2['data']['has_more'])
+        self.assertEqual(await self._get_status_log_count(), 1)
+        await communicator.disconnect()
+
+    def test_scoped_readers_use_one_query(self):
+        user = create_user()
+        board = create_board(user, create_user(test_user_2))
+        actions._create_msg(board, user, 'Test message')
+        serialized_board = actions._read_board(board, user)
+
+        with self.assertNumQueries(1):
+            self.assertListEqual(
+                actions._read_tasks(board, user), serialized_board['tasks'])
+        with self.assertNumQueries(1):
+            self.assertListEqual(
+                actions._read_columns(board, user), serialized_board['columns'])
+        with self.assertNumQueries(1):
+            self.assertCountEqual(
+                actions._read_memberships(board, user),
+                serialized_board['memberships'],)
+        with self.assertNumQueries(1):
+            self.assertListEqual(
+                actions._read_messages_page(board, user)['messages'],
+                serialized_board['messages'],)
+
     @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
     async def test_admin_can_update_board_title(self):
         user_1 = await database_sync_to_async(create_user)()
@@ -244,6 +693,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_blank['error']['command'], BoardCommands.TITLE)
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -258,6 +708,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_missing['error']['command'], BoardCommands.TITLE)
         log_2 = await self._get_status_log(latest=True)
         self.assertRegex(log_2['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 2)
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -275,6 +726,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_fail_2['error']['command'], BoardCommands.TITLE)
         log_3 = await self._get_status_log(latest=True)
         self.assertRegex(log_3['msg'], log_msg_regex('Action not allowed', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 3)
         self.assertEqual(mail.outbox[2].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Action not allowed')
@@ -320,16 +772,15 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.TASKS_SAVED)
-        self.assertEqual(len(response_1['data']), len(board_tasks) + 1)
-        new_task = next((
-            task for task in response_1['data'] if (
-                task['text'] == 'Newest task' and task['column'] == column_id
-            )
-        ), None)
-        self.assertIsInstance(new_task, dict)
+        self.assertEqual(response_1['code'], ChannelCodes.TASK_CREATED)
+        new_task = response_1['data']
+        self.assertEqual(new_task['text'], 'Newest task')
+        self.assertEqual(new_task['column'], column_id)
         self.assertEqual(new_task['task_index'], len(column_tasks))
         self.assertEqual(response_1['user'], user_1.user_slug)
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        self.assertEqual(len(serialized_board['tasks']), len(board_tasks) + 1)
+        self.assertIn(new_task, serialized_board['tasks'])
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
@@ -361,16 +812,17 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.TASKS_SAVED)
-        moved_task = next((
-            task for task in response_1['data'] if (
-                task['task_id'] == task_to_move['task_id']
-            )
-        ), None)
-        self.assertIsInstance(moved_task, dict)
+        self.assertEqual(response_1['code'], ChannelCodes.TASK_MOVED)
+        moved_task = response_1['data']['task']
+        self.assertEqual(moved_task['task_id'], task_to_move['task_id'])
         self.assertEqual(moved_task['column'], destination_column['column_id'])
         self.assertEqual(moved_task['task_index'], 1)
         self.assertEqual(response_1['user'], user_2.user_slug)
+        source_range, destination_range = response_1['data']['ranges']
+        self.assertEqual(source_range['column'], task_to_move['column'])
+        self.assertEqual(source_range['start'], task_to_move['task_index'])
+        self.assertEqual(destination_range['column'], destination_column['column_id'])
+        self.assertEqual(destination_range['start'], 1)
 
         serialized_board = await self._get_board(board.board_slug, user_2)
         old_sister_tasks = [
@@ -392,10 +844,88 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(new_sister_tasks[1]['task_index'], 1)
         self.assertEqual(new_sister_tasks[2]['text'], 'Fix footer')
         self.assertEqual(new_sister_tasks[2]['task_index'], 2)
+        self.assertListEqual(
+            source_range['task_ids'],
+            [t['task_id'] for t in old_sister_tasks],
+        )
+        self.assertListEqual(
+            destination_range['task_ids'],
+            [t['task_id'] for t in new_sister_tasks[1:]],
+        )
+        self.assertEqual(await self._get_status_log_count(), 0)
+        await communicator_1.disconnect()
+        await communicator_2.disconnect()
+
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS, BOARD_ACTORS=True)
+    async def test_board_actor_applies_concurrent_moves(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        communicator_1 = await self._auth_connect(user_1, board.board_slug)
+        communicator_2 = await self._auth_connect(user_2, board.board_slug)
+        welcome = await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        column = welcome['data']['columns'][0]
+        tasks = [
+            t for t in welcome['data']['tasks'] if (
+                t['column'] == column['column_id']
+            )
+        ]
+
+        for communicator, task in zip((communicator_1, communicator_2), tasks):
+            await communicator.send_json_to({
+                'command': BoardCommands.MOVE_TASK,
+                'task_id': task['task_id'],
+                'column_id': column['column_id'],
+                'task_index': 1 - task['task_index'],
+            })
+
+        responses = [
+            await communicator_1.receive_json_from() for _ in range(2)]
+        self.assertListEqual(
+            responses,
+            [await communicator_2.receive_json_from() for _ in range(2)],)
+        self.assertListEqual(
+            [r['code'] for r in responses], [ChannelCodes.TASK_MOVED] * 2)
+        self.assertSetEqual(
+            {r['user'] for r in responses},
+            {user_1.user_slug, user_2.user_slug},)
+
+        actor = await BoardActor.for_board(board.board_slug)
+        self.assertIsNotNone(actor)
+        self.assertTrue(actor.queue.empty())
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
 
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_command_latency_is_recorded_by_phase(self):
+        command_latency.reset()
+        user = await database_sync_to_async(create_user)()
+        board = await database_sync_to_async(create_board)(user)
+        communicator = await self._auth_connect(user, board.board_slug)
+        welcome = await communicator.receive_json_from()
+        task = welcome['data']['tasks'][0]
+
+        await communicator.send_json_to({
+            'command': BoardCommands.MOVE_TASK,
+            'task_id': task['task_id'],
+            'column_id': task['column'],
+            'task_index': 1,
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['code'], ChannelCodes.TASK_MOVED)
+
+        phases = command_latency.snapshot()[BoardCommands.MOVE_TASK]
+        self.assertSetEqual(
+            set(phases),
+            {'validation', 'db', 'serialization', 'fanout', 'total'},)
+        for stats in phases.values():
+            self.assertEqual(stats['count'], 1)
+        self.assertLessEqual(
+            phases['db']['mean_ms'], phases['total']['mean_ms'])
+        await communicator.disconnect()
+
     @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
     async def test_user_can_update_task(self):
         user_1 = await database_sync_to_async(create_user)()
@@ -415,11 +945,9 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.TASKS_SAVED)
-        updated_task = next((
-            task for task in response_1['data'] if task['task_id'] == task_id
-        ), None)
-        self.assertIsInstance(updated_task, dict)
+        self.assertEqual(response_1['code'], ChannelCodes.TASK_UPDATED)
+        updated_task = response_1['data']
+        self.assertEqual(updated_task['task_id'], task_id)
         self.assertEqual(updated_task['text'], 'Task updated')
         self.assertEqual(response_1['user'], user_2.user_slug)
         self.assertEqual(await self._get_status_log_count(), 0)
@@ -460,16 +988,19 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.TASKS_SAVED)
-        deleted_task = next((
-            task for task in response_1['data'] if (
-                task['task_id'] == task_to_delete['task_id']
-            )
-        ), None)
-        self.assertIsNone(deleted_task)
+        self.assertEqual(response_1['code'], ChannelCodes.TASK_DELETED)
+        self.assertEqual(response_1['data']['task_id'], task_to_delete['task_id'])
+        self.assertListEqual(response_1['data']['ranges'], [{
+            'column': column['column_id'],
+            'start': 0,
+            'task_ids': [task_to_remain['task_id']],
+        }])
         self.assertEqual(response_1['user'], user_1.user_slug)
         serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['tasks'], response_1['data'])
+        self.assertNotIn(
+            task_to_delete['task_id'],
+            [t['task_id'] for t in serialized_board['tasks']],
+        )
         remaining_column_tasks = [
             t for t in serialized_board['tasks'] if (
                 t['column'] == column['column_id']
@@ -482,6 +1013,205 @@ class TestWebsockets(TransactionTestCase):
         await communicator_1.disconnect()
         await communicator_2.disconnect()
 
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_failed_task_command_resyncs_tasks(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        communicator_1 = await self._auth_connect(user_1, board.board_slug)
+        communicator_2 = await self._auth_connect(user_2, board.board_slug)
+        welcome_1 = await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+
+        await communicator_1.send_json_to({
+            'command': BoardCommands.MOVE_TASK,
+            'task_id': 9999,
+            'column_id': welcome_1['data']['columns'][0]['column_id'],
+            'task_index': 0,
+        })
+        response_1 = await communicator_1.receive_json_from()
+        self.assertEqual(response_1['code'], ChannelCodes.ERROR)
+        self.assertEqual(response_1['error']['message'], 'Task not moved')
+        self.assertEqual(response_1['error']['command'], BoardCommands.MOVE_TASK)
+        response_2 = await communicator_1.receive_json_from()
+        self.assertEqual(response_2['code'], ChannelCodes.TASKS_SAVED)
+        self.assertListEqual(response_2['data'], welcome_1['data']['tasks'])
+        self.assertIsNone(response_2['user'])
+        self.assertTrue(await communicator_2.receive_nothing())
+        self.assertEqual(await self._get_status_log_count(), 1)
+        await communicator_1.disconnect()
+        await communicator_2.disconnect()
+
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_user_can_apply_batch(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        communicator_1 = await self._auth_connect(user_1, board.board_slug)
+        communicator_2 = await self._auth_connect(user_2, board.board_slug)
+        welcome = await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        source, destination = welcome['data']['columns'][:2]
+        tasks = [
+            t for t in welcome['data']['tasks'] if (
+                t['column'] == source['column_id']
+            )
+        ]
+
+        await communicator_1.send_json_to({
+            'command': BoardCommands.BATCH,
+            'commands': [
+                {
+                    'command': BoardCommands.MOVE_TASK,
+                    'task_id': task['task_id'],
+                    'column_id': destination['column_id'],
+                    'task_index': 0,
+                }
+                for task in tasks
+            ] + [
+                {
+                    'command': BoardCommands.UPDATE_COLUMN,
+                    'column_id': destination['column_id'],
+                    'wip_limit_on': True,
+                    'wip_limit': 5,
+                },
+            ],
+        })
+        response_1 = await communicator_1.receive_json_from()
+        response_2 = await communicator_2.receive_json_from()
+        self.assertDictEqual(response_1, response_2)
+        self.assertEqual(response_1['code'], ChannelCodes.BATCH_APPLIED)
+        self.assertEqual(response_1['user'], user_1.user_slug)
+        results = response_1['data']['results']
+        self.assertListEqual(
+            [(r['command'], r['code']) for r in results],
+            [(BoardCommands.MOVE_TASK, ChannelCodes.TASK_MOVED)] * len(tasks) +
+            [(BoardCommands.UPDATE_COLUMN, ChannelCodes.COLUMN_UPDATED)],)
+        self.assertEqual(results[-1]['data']['wip_limit'], 5)
+        self.assertTrue(await communicator_1.receive_nothing())
+
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        moved = [
+            t['task_id'] for t in serialized_board['tasks'] if (
+                t['column'] == destination['column_id']
+            )
+        ]
+        # Each task was moved to the top in turn
+        self.assertListEqual(
+            moved[:len(tasks)], [t['task_id'] for t in reversed(tasks)],)
+        self.assertEqual(await self._get_status_log_count(), 0)
+        await communicator_1.disconnect()
+        await communicator_2.disconnect()
+
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_failed_batch_applies_nothing(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        communicator_1 = await self._auth_connect(user_1, board.board_slug)
+        communicator_2 = await self._auth_connect(user_2, board.board_slug)
+        welcome = await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        task = welcome['data']['tasks'][0]
+        column = welcome['data']['columns'][2]
+        commands = [
+            {
+                'command': BoardCommands.MOVE_TASK,
+                'task_id': task['task_id'],
+                'column_id': column['column_id'],
+                'task_index': 0,
+            },
+            { 'command': BoardCommands.DELETE_TASK, 'task_id': 9999 },
+            { 'command': BoardCommands.DELETE_TASK, 'task_id': task['task_id'] },
+        ]
+
+        await communicator_1.send_json_to({
+            'command': BoardCommands.BATCH,
+            'commands': commands,
+        })
+        response_1 = await communicator_1.receive_json_from()
+        self.assertEqual(response_1['code'], ChannelCodes.ERROR)
+        self.assertEqual(response_1['error']['message'], 'Batch not applied')
+        self.assertEqual(response_1['error']['command'], BoardCommands.BATCH)
+        self.assertEqual(response_1['error']['detail'], 'Task not deleted')
+        results = response_1['error']['data']['results']
+        self.assertListEqual(
+            [r['command'] for r in results], [c['command'] for c in commands])
+        self.assertIsNone(results[0]['error'])
+        self.assertEqual(results[1]['error']['message'], 'Task not deleted')
+        self.assertIsNone(results[2]['error'])
+        response_2 = await communicator_1.receive_json_from()
+        self.assertEqual(response_2['code'], ChannelCodes.TASKS_SAVED)
+        self.assertListEqual(response_2['data'], welcome['data']['tasks'])
+        response_3 = await communicator_1.receive_json_from()
+        self.assertEqual(response_3['code'], ChannelCodes.COLUMNS_SAVED)
+        self.assertListEqual(response_3['data'], welcome['data']['columns'])
+        self.assertTrue(await communicator_2.receive_nothing())
+
+        # Invalid content fails the batch before anything is run
+        commands[1] = { 'command': BoardCommands.DELETE_TASK, 'task_id': 'x' }
+        await communicator_1.send_json_to({
+            'command': BoardCommands.BATCH,
+            'commands': commands,
+        })
+        response_4 = await communicator_1.receive_json_from()
+        self.assertEqual(response_4['error']['message'], 'Batch not applied')
+        self.assertEqual(response_4['error']['detail'], 'Invalid content')
+        self.assertEqual(
+            response_4['error']['data']['results'][1]['error']['command'],
+            BoardCommands.DELETE_TASK,)
+        await communicator_1.receive_json_from()
+        await communicator_1.receive_json_from()
+
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        self.assertListEqual(serialized_board['tasks'], welcome['data']['tasks'])
+        self.assertEqual(await self._get_status_log_count(), 2)
+        await communicator_1.disconnect()
+        await communicator_2.disconnect()
+
+    @override_settings(
+        CHANNEL_LAYERS=TEST_CHANNEL_LAYERS,
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                BoardCommands.MOVE_TASK: ['3/m'],
+            },
+        },
+    )
+    async def test_batched_commands_are_throttled_by_their_own_rates(self):
+        user = await database_sync_to_async(create_user)()
+        board = await database_sync_to_async(create_board)(user)
+        communicator = await self._auth_connect(user, board.board_slug)
+        welcome = await communicator.receive_json_from()
+        task = welcome['data']['tasks'][0]
+
+        def move_tasks(count):
+            return {
+                'command': BoardCommands.BATCH,
+                'commands': [{
+                    'command': BoardCommands.MOVE_TASK,
+                    'task_id': task['task_id'],
+                    'column_id': task['column'],
+                    'task_index': 0,
+                }] * count,
+            }
+
+        await communicator.send_json_to(move_tasks(3))
+        response_1 = await communicator.receive_json_from()
+        self.assertEqual(response_1['code'], ChannelCodes.BATCH_APPLIED)
+
+        # Moves batched or not share the rate, which batching cannot exceed
+        await communicator.send_json_to(move_tasks(1))
+        response_2 = await communicator.receive_json_from()
+        self.assertEqual(response_2['error']['message'], 'Too many requests')
+        self.assertEqual(response_2['error']['command'], BoardCommands.BATCH)
+        await communicator.send_json_to(move_tasks(1)['commands'][0])
+        response_3 = await communicator.receive_json_from()
+        self.assertEqual(response_3['error']['message'], 'Too many requests')
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
     @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
     async def test_user_can_create_column(self):
         user_1 = await database_sync_to_async(create_user)()
@@ -502,14 +1232,15 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        new_column_index = len(response_1['data']) - 1
-        self.assertEqual(response_1['code'], ChannelCodes.COLUMNS_SAVED)
-        self.assertEqual(len(response_1['data']), len(columns) + 1)
-        self.assertEqual(response_1['data'][new_column_index]['column_index'], len(columns))
-        self.assertEqual(response_1['data'][new_column_index]['column_title'], 'New column')
-        self.assertTrue(response_1['data'][new_column_index]['wip_limit_on'])
-        self.assertEqual(response_1['data'][new_column_index]['wip_limit'], 10)
+        self.assertEqual(response_1['code'], ChannelCodes.COLUMN_CREATED)
+        self.assertEqual(response_1['data']['column_index'], len(columns))
+        self.assertEqual(response_1['data']['column_title'], 'New column')
+        self.assertTrue(response_1['data']['wip_limit_on'])
+        self.assertEqual(response_1['data']['wip_limit'], 10)
         self.assertEqual(response_1['user'], user_1.user_slug)
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        self.assertEqual(len(serialized_board['columns']), len(columns) + 1)
+        self.assertDictEqual(serialized_board['columns'][-1], response_1['data'])
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
@@ -535,10 +1266,11 @@ class TestWebsockets(TransactionTestCase):
         response_1a = await communicator_1.receive_json_from()
         response_2a = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1a, response_2a)
-        self.assertEqual(response_1a['code'], ChannelCodes.COLUMNS_SAVED)
-        self.assertEqual(response_1a['data'][0]['column_title'], 'New updated column')
-        self.assertTrue(response_1a['data'][0]['wip_limit_on'])
-        self.assertEqual(response_1a['data'][0]['wip_limit'], 5)
+        self.assertEqual(response_1a['code'], ChannelCodes.COLUMN_UPDATED)
+        self.assertEqual(response_1a['data']['column_id'], column_id)
+        self.assertEqual(response_1a['data']['column_title'], 'New updated column')
+        self.assertTrue(response_1a['data']['wip_limit_on'])
+        self.assertEqual(response_1a['data']['wip_limit'], 5)
         self.assertEqual(response_1a['user'], user_1.user_slug)
         self.assertEqual(await self._get_status_log_count(), 0)
 
@@ -552,10 +1284,11 @@ class TestWebsockets(TransactionTestCase):
         response_1b = await communicator_1.receive_json_from()
         response_2b = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1b, response_2b)
-        self.assertEqual(response_1b['code'], ChannelCodes.COLUMNS_SAVED)
-        self.assertEqual(response_1b['data'][0]['column_title'], 'New updated column')
-        self.assertTrue(response_1b['data'][0]['wip_limit_on'])
-        self.assertEqual(response_1b['data'][0]['wip_limit'], 2)
+        self.assertEqual(response_1b['code'], ChannelCodes.COLUMN_UPDATED)
+        self.assertEqual(response_1b['data']['column_id'], column_id)
+        self.assertEqual(response_1b['data']['column_title'], 'New updated column')
+        self.assertTrue(response_1b['data']['wip_limit_on'])
+        self.assertEqual(response_1b['data']['wip_limit'], 2)
         self.assertEqual(response_1b['user'], user_1.user_slug)
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_1.disconnect()
@@ -588,11 +1321,22 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.COLUMNS_SAVED)
-        column_1a = response_1['data'][0]
-        column_2a = response_1['data'][1]
-        column_3a = response_1['data'][2]
-        column_4a = response_1['data'][3]
+        self.assertEqual(response_1['code'], ChannelCodes.COLUMN_MOVED)
+        self.assertEqual(response_1['data']['column']['column_id'], column_1['column_id'])
+        self.assertEqual(response_1['data']['column']['column_index'], 2)
+        self.assertListEqual(response_1['data']['ranges'], [{
+            'start': 0,
+            'column_ids': [
+                column_2['column_id'],
+                column_3['column_id'],
+                column_1['column_id'],
+            ],
+        }])
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        column_1a = serialized_board['columns'][0]
+        column_2a = serialized_board['columns'][1]
+        column_3a = serialized_board['columns'][2]
+        column_4a = serialized_board['columns'][3]
         self.assertEqual(column_1a['column_id'], column_2['column_id'])
         self.assertEqual(column_1a['column_index'], 0)
         self.assertEqual(column_2a['column_id'], column_3['column_id'])
@@ -623,14 +1367,23 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.COLUMNS_SAVED)
-        self.assertNotIn(column_id, map(lambda c: c['column_id'], response_1['data']))
-        self.assertEqual(response_1['data'][0]['column_title'], 'In review')
-        self.assertEqual(response_1['data'][0]['column_index'], 0)
-        self.assertEqual(response_1['data'][1]['column_title'], 'Completed')
-        self.assertEqual(response_1['data'][1]['column_index'], 1)
-        self.assertEqual(response_1['data'][2]['column_title'], 'In production')
-        self.assertEqual(response_1['data'][2]['column_index'], 2)
+        self.assertEqual(response_1['code'], ChannelCodes.COLUMN_DELETED)
+        self.assertEqual(response_1['data']['column_id'], column_id)
+        self.assertListEqual(response_1['data']['ranges'], [{
+            'start': 0,
+            'column_ids': [
+                c['column_id'] for c in welcome_1['data']['columns'][1:]
+            ],
+        }])
+        serialized_board = await self._get_board(board.board_slug, user_1)
+        columns = serialized_board['columns']
+        self.assertNotIn(column_id, map(lambda c: c['column_id'], columns))
+        self.assertEqual(columns[0]['column_title'], 'In review')
+        self.assertEqual(columns[0]['column_index'], 0)
+        self.assertEqual(columns[1]['column_title'], 'Completed')
+        self.assertEqual(columns[1]['column_index'], 1)
+        self.assertEqual(columns[2]['column_title'], 'In production')
+        self.assertEqual(columns[2]['column_index'], 2)
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
@@ -657,6 +1410,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_fail_1['error']['message'], 'Cannot update own role')
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Cannot update own role', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Cannot update own role')
@@ -674,6 +1428,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_fail_2['error']['message'], 'Invalid content')
         log_2 = await self._get_status_log(latest=True)
         self.assertRegex(log_2['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 2)
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
@@ -689,20 +1444,95 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1['code'], ChannelCodes.MEMBER_UPDATED)
         self.assertEqual(response_1['user'], user_1.user_slug)
-        updated_member = next((
-            member for member in response_1['data']['members'] if (
-                member['user']['user_slug'] == user_2.user_slug
-            )
-        ), None)
-        self.assertIsInstance(updated_member, dict)
+        updated_member = response_1['data']
+        self.assertEqual(updated_member['user']['user_slug'], user_2.user_slug)
         self.assertEqual(updated_member['role'], BoardRoles.MODERATOR)
-        self.assertListEqual(response_1['data']['updated_slugs'], [user_2.user_slug])
         self.assertEqual(await self._get_status_log_count(), 2)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
 
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_cached_role_follows_member_role_events(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        communicator_1 = await self._auth_connect(user_1, board.board_slug)
+        communicator_2 = await self._auth_connect(user_2, board.board_slug)
+        await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        create_column = {
+            'command': BoardCommands.CREATE_COLUMN,
+            'column_title': 'New column',
+            'wip_limit_on': False,
+            'wip_limit': 1,
+        }
+
+        # Members may not create columns
+        await communicator_2.send_json_to(create_column)
+        res_fail_1 = await communicator_2.receive_json_from()
+        self.assertEqual(res_fail_1['error']['message'], 'Action not allowed')
+        await communicator_2.receive_json_from()
+
+        # Once promoted, the member's connection sees the new role
+        await communicator_1.send_json_to({
+            'command': BoardCommands.ROLE,
+            'user_slug': user_2.user_slug,
+            'role': BoardRoles.MODERATOR,
+        })
+        await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        await communicator_2.send_json_to(create_column)
+        response_1 = await communicator_2.receive_json_from()
+        self.assertEqual(response_1['code'], ChannelCodes.COLUMN_CREATED)
+        await communicator_1.receive_json_from()
+
+        # Once removed, the connection no longer holds a role
+        await communicator_1.send_json_to({
+            'command': BoardCommands.REMOVE,
+            'user_slug': user_2.user_slug,
+        })
+        await communicator_1.receive_json_from()
+        await communicator_2.receive_json_from()
+        await communicator_2.send_json_to(create_column)
+        res_fail_2 = await communicator_2.receive_json_from()
+        self.assertEqual(
+            res_fail_2['error']['message'], 'Could not get member role')
+        self.assertEqual(await self._get_status_log_count(), 2)
+        await communicator_1.disconnect()
+        await communicator_2.disconnect()
+
+    @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
+    async def test_role_changed_while_connecting_is_not_missed(self):
+        user_1 = await database_sync_to_async(create_user)()
+        user_2 = await database_sync_to_async(create_user)(test_user_2)
+        board = await database_sync_to_async(create_board)(user_1, user_2)
+        read_board = actions._read_board
+
+        # Promoted after the board is looked up, before the connection
+        # joins the board's group and can hear of it
+        def promoted_while_reading(board, user):
+            BoardMembership.objects.filter(board=board, user=user).update(
+                role=BoardRoles.MODERATOR,)
+            return read_board(board, user)
+
+        with mock.patch(
+            'boards.channels.actions._read_board', promoted_while_reading,
+        ):
+            communicator = await self._auth_connect(user_2, board.board_slug)
+            await communicator.receive_json_from()
+
+        await communicator.send_json_to({
+            'command': BoardCommands.CREATE_COLUMN,
+            'column_title': 'New column',
+            'wip_limit_on': False,
+            'wip_limit': 1,
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['code'], ChannelCodes.COLUMN_CREATED)
+        await communicator.disconnect()
+
     @override_settings(CHANNEL_LAYERS=TEST_CHANNEL_LAYERS)
     async def test_update_member_display_name(self):
         user_1 = await database_sync_to_async(create_user)()
@@ -722,14 +1552,10 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1['code'], ChannelCodes.MEMBER_UPDATED)
         self.assertEqual(response_1['user'], user_1.user_slug)
-        updated_member = next((
-            member for member in response_1['data'] if (
-                member['user']['user_slug'] == user_1.user_slug
-            )
-        ), None)
-        self.assertIsInstance(updated_member, dict)
+        updated_member = response_1['data']
+        self.assertEqual(updated_member['user']['user_slug'], user_1.user_slug)
         self.assertEqual(updated_member['display_name'], 'NewDisplayName')
         self.assertEqual(await self._get_status_log_count(), 0)
 
@@ -771,16 +1597,11 @@ class TestWebsockets(TransactionTestCase):
         update_3 = await communicator_3.receive_json_from()
         self.assertDictEqual(update_1, update_2)
         self.assertDictEqual(update_1, update_3)
-        self.assertEqual(update_1['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(update_1['code'], ChannelCodes.MEMBER_UPDATED)
         self.assertEqual(update_1['user'], user_1.user_slug)
-        updated_member = next((
-            member for member in update_1['data']['members'] if (
-                member['user']['user_slug'] == user_2.user_slug
-            )
-        ), None)
-        self.assertIsInstance(updated_member, dict)
+        updated_member = update_1['data']
+        self.assertEqual(updated_member['user']['user_slug'], user_2.user_slug)
         self.assertEqual(updated_member['role'], BoardRoles.MODERATOR)
-        self.assertListEqual(update_1['data']['updated_slugs'], [user_2.user_slug])
 
         # Test fail leave by admin
         await communicator_1.send_json_to({ 'command': BoardCommands.LEAVE })
@@ -790,6 +1611,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(response_1a['error']['command'], BoardCommands.LEAVE)
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Action not allowed', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Action not allowed')
@@ -803,16 +1625,16 @@ class TestWebsockets(TransactionTestCase):
         response_3b = await communicator_3.receive_json_from()
         self.assertDictEqual(response_1b, response_2b)
         self.assertDictEqual(response_1b, response_3b)
-        self.assertEqual(response_1b['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1b['code'], ChannelCodes.MEMBER_REMOVED)
         self.assertEqual(response_1b['user'], user_2.user_slug)
+        self.assertDictEqual(response_1b['data'], { 'user_slug': user_2.user_slug })
+        serialized_board = await self._get_board(board.board_slug, user_1)
         leaving_member = next((
-            member for member in response_1b['data'] if (
+            member for member in serialized_board['memberships'] if (
                 member['user']['user_slug'] == user_2.user_slug
             )
         ), None)
         self.assertIsNone(leaving_member)
-        serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['memberships'], response_1b['data'])
         self.assertEqual(await self._get_status_log_count(), 1)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
@@ -839,6 +1661,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_fail['error']['message'], 'Action not allowed')
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Action not allowed', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Action not allowed')
@@ -853,16 +1676,16 @@ class TestWebsockets(TransactionTestCase):
         response_1 = await communicator_1.receive_json_from()
         response_2 = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1, response_2)
-        self.assertEqual(response_1['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1['code'], ChannelCodes.MEMBER_REMOVED)
         self.assertEqual(response_1['user'], user_1.user_slug)
+        self.assertDictEqual(response_1['data'], { 'user_slug': user_2.user_slug })
+        serialized_board = await self._get_board(board.board_slug, user_1)
         removed_member = next((
-            member for member in response_1['data'] if (
+            member for member in serialized_board['memberships'] if (
                 member['user']['user_slug'] == user_2.user_slug
             )
         ), None)
         self.assertIsNone(removed_member)
-        serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['memberships'], response_1['data'])
         self.assertEqual(await self._get_status_log_count(), 1)
         await communicator_1.disconnect()
         await communicator_2.disconnect()
@@ -917,18 +1740,14 @@ class TestWebsockets(TransactionTestCase):
         response_2 = await communicator_2.receive_json_from()
         response_3 = await communicator_3.receive_json_from()
         self.assertDictEqual(response_2, response_3)
-        self.assertEqual(response_2['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_2['code'], ChannelCodes.MEMBER_UPDATED)
         self.assertEqual(response_2['user'], user_1.user_slug)
-        updated_member = next((
-            member for member in response_2['data'] if (
-                member['user']['user_slug'] == user_1.user_slug
-            )
-        ), None)
-        self.assertIsInstance(updated_member, dict)
+        updated_member = response_2['data']
+        self.assertEqual(updated_member['user']['user_slug'], user_1.user_slug)
         self.assertEqual(updated_member['user']['name'], 'Name update success')
         self.assertEqual(updated_member['user']['email'], 'success@update.com')
         serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['memberships'], response_2['data'])
+        self.assertIn(updated_member, serialized_board['memberships'])
         self.assertEqual(await self._get_status_log_count(), 0)
         await communicator_2.disconnect()
         await communicator_3.disconnect()
@@ -961,30 +1780,30 @@ class TestWebsockets(TransactionTestCase):
         response_3a = await communicator_3.receive_json_from()
         self.assertDictEqual(response_1a, response_2a)
         self.assertDictEqual(response_1a, response_3a)
-        self.assertEqual(response_1a['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1a['code'], ChannelCodes.MEMBER_REMOVED)
+        self.assertDictEqual(response_1a['data'], { 'user_slug': user_4.user_slug })
+        serialized_board = await self._get_board(board.board_slug, user_1)
         deactivated_member_4 = next((
-            member for member in response_1a['data'] if (
+            member for member in serialized_board['memberships'] if (
                 member['user']['user_slug'] == user_4.user_slug
             )
         ), None)
         self.assertIsNone(deactivated_member_4)
-        serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['memberships'], response_1a['data'])
 
         await communicator_3.disconnect()
         self.assertTrue(await self._deactivate_test_user(user_3))
         response_1b = await communicator_1.receive_json_from()
         response_2b = await communicator_2.receive_json_from()
         self.assertDictEqual(response_1b, response_2b)
-        self.assertEqual(response_1b['code'], ChannelCodes.MEMBERS_SAVED)
+        self.assertEqual(response_1b['code'], ChannelCodes.MEMBER_REMOVED)
+        self.assertDictEqual(response_1b['data'], { 'user_slug': user_3.user_slug })
+        serialized_board = await self._get_board(board.board_slug, user_1)
         deactivated_member_3 = next((
-            member for member in response_1b['data'] if (
+            member for member in serialized_board['memberships'] if (
                 member['user']['user_slug'] == user_3.user_slug
             )
         ), None)
         self.assertIsNone(deactivated_member_3)
-        serialized_board = await self._get_board(board.board_slug, user_1)
-        self.assertListEqual(serialized_board['memberships'], response_1b['data'])
 
         # Test board deleted when admin deactivates
         await communicator_1.disconnect()
@@ -1053,6 +1872,7 @@ class TestWebsockets(TransactionTestCase):
         self.assertEqual(res_blank['error']['command'], BoardCommands.INVITE)
         log_1 = await self._get_status_log(latest=True)
         self.assertRegex(log_1['msg'], log_msg_regex('Invalid content', LogLevels.ERROR))
+        send_log_digests()
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Invalid content')
         self.assertListEqual(mail.outbox[1].to, ['contact@simplekanban.app'])
@@ -14,9 +14,21 @@ class ChannelCodes(TextChoices):
     BOARD_LOADED = 'BOARD_LOADED'
     MEMBERS_SAVED = 'MEMBERS_SAVED'
     MSG_CREATED = 'MSG_CREATED'
+    MSGS_LOADED = 'MSGS_LOADED'
     BOARD_UPDATED = 'BOARD_UPDATED'
     TASKS_SAVED = 'TASKS_SAVED'
     COLUMNS_SAVED = 'COLUMNS_SAVED'
+    TASK_CREATED = 'TASK_CREATED'
+    TASK_UPDATED = 'TASK_UPDATED'
+    TASK_MOVED = 'TASK_MOVED'
+    TASK_DELETED = 'TASK_DELETED'
+    COLUMN_CREATED = 'COLUMN_CREATED'
+    COLUMN_UPDATED = 'COLUMN_UPDATED'
+    COLUMN_MOVED = 'COLUMN_MOVED'
+    COLUMN_DELETED = 'COLUMN_DELETED'
+    BATCH_APPLIED = 'BATCH_APPLIED'
+    MEMBER_UPDATED = 'MEMBER_UPDATED'
+    MEMBER_REMOVED = 'MEMBER_REMOVED'
     BOARD_DELETED = 'BOARD_DELETED'
     INVITE_SENT = 'INVITE_SENT'
     INVITE_NOT_SENT = 'INVITE_NOT_SENT'
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from functools import wraps
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from boards.channels import actions
+from boards.channels.executor import BoardExecutor
+from boards.models import Board
+from boards.utils import BoardRoles
+from columns.models import Column
+from tasks.models import Task
+from utils.ranks import spread_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of board commands run on the single '
+        'thread-sensitive thread and on the board executor, as the number of '
+        'boards with concurrent commands grows. Boards are created, then '
+        'deleted once done.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--boards', nargs='+', type=int, default=[1, 10, 50, 100, 200],
+            help='Number of boards sending commands at the same time.',)
+        parser.add_argument(
+            '--commands', type=int, default=20,
+            help='Commands sent one after another on each board.',)
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Threads of the board executor.',)
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help=(
+                'Milliseconds added to each query, to stand in for the round '
+                'trip to a database on another host.'),)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"boards":>8} {"single (cmd/s)":>15} {"executor (cmd/s)":>17} '
+            f'{"speedup":>8}')
+
+        executor = BoardExecutor(options['workers'])
+        user = get_user_model().objects.create_user(
+            name='Benchmark',
+            email='benchmark.executor@email.com',
+            password='pAssw0rd!',)
+        boards = []
+        try:
+            for i in range(max(options['boards'])):
+                boards.append(self.create_board(user, i))
+            for count in options['boards']:
+                single = self.throughput(
+                    boards[:count], user, options['commands'],
+                    lambda board, func: database_sync_to_async(
+                        self.delayed(func, options['latency']),),)
+                pooled = self.throughput(
+                    boards[:count], user, options['commands'],
+                    lambda board, func: database_sync_to_async(
+                        self.delayed(func, options['latency']),
+                        thread_sensitive=False,
+                        executor=executor.for_board(board.board_slug),),)
+                self.stdout.write(
+                    f'{count:>8} {single:>15.1f} {pooled:>17.1f} '
+                    f'{pooled / single:>7.1f}x')
+        finally:
+            executor.shutdown()
+            # Only the boards created here, not others of the same title
+            Board.objects.filter(
+                pk__in=[board.pk for board in boards]).delete()
+            user.delete()
+
+    def delayed(self, func, latency):
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency / 1000)
+            return execute(sql, params, many, context)
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            with connection.execute_wrapper(delay):
+                return func(*args, **kwargs)
+        return inner if latency else func
+
+    def throughput(self, boards, user, num_commands, wrap):
+        '''Commands per second over all boards, each sending in order.'''
+        async def send(board, tasks):
+            for i in range(num_commands):
+                if i % 2:
+                    await wrap(board, actions._read_tasks)(board, user)
+                else:
+                    task = tasks[i % len(tasks)]
+                    await wrap(board, actions._move_task)(
+                        board, user, task.task_id, task.column_id, 0,)
+
+        async def send_all(board_tasks):
+            await asyncio.gather(*[
+                send(board, tasks) for board, tasks in board_tasks
+            ])
+
+        board_tasks = [
+            (board, list(Task.objects.filter(board=board))) for board in boards
+        ]
+        start = time.perf_counter()
+        asyncio.run(send_all(board_tasks))
+        return len(boards) * num_commands / (time.perf_counter() - start)
+
+    def create_board(self, user, i):
+        board = Board.objects.create(board_title='Benchmark executor')
+        board.users.add(user, through_defaults={'role': BoardRoles.ADMIN})
+        columns = [
+            Column.objects.create(board=board, column_title=f'Column {j}')
+            for j in range(2)
+        ]
+        ranks = spread_ranks(10)
+        Task.objects.bulk_create([
+            Task(
+                board=board,
+                column=columns[j % 2],
+                task_rank=ranks[j],
+                text=f'Task {j}',)
+            for j in range(10)
+        ])
+        return board
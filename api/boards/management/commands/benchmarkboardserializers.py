@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from boards.fast_serializers import serialize_board
+from boards.models import Board, BoardMessage
+from boards.serializers import BoardSerializer
+from boards.utils import BoardRoles
+from columns.models import Column
+from tasks.models import Task
+from utils.ranks import spread_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the DRF and fast-path board serializers on synthetic '
+        'boards. Boards are created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[10, 100, 1000],
+            help='Number of tasks on each synthetic board.',)
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Serializations timed per board and serializer.',)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"tasks":>8} {"drf (ms)":>10} {"fast (ms)":>10} {"speedup":>8}')
+
+        with transaction.atomic():
+            for size in options['sizes']:
+                board = self.create_board(size)
+
+                drf = lambda: BoardSerializer(
+                    Board.objects.load(board.board_slug)).data
+                fast = lambda: serialize_board(board.board_slug)
+
+                if json.dumps(drf()) != json.dumps(fast()):
+                    raise CommandError(
+                        f'Payloads differ on a board of {size} tasks')
+
+                drf_ms = self.time(drf, options['repeat'])
+                fast_ms = self.time(fast, options['repeat'])
+                self.stdout.write(
+                    f'{size:>8} {drf_ms:>10.2f} {fast_ms:>10.2f} '
+                    f'{drf_ms / fast_ms:>7.1f}x')
+
+            transaction.set_rollback(True)
+
+    def time(self, serialize, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serialize()
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def create_board(self, num_tasks):
+        board = Board.objects.create(
+            board_title=f'Benchmark {num_tasks}',
+            messages_allowed=True,
+            new_members_allowed=True,)
+        columns = [
+            Column.objects.create(board=board, column_title=f'Column {i}')
+            for i in range(4)
+        ]
+        ranks = spread_ranks(num_tasks)
+        Task.objects.bulk_create([
+            Task(
+                board=board,
+                column=columns[i % 4],
+                task_rank=ranks[i],
+                text=f'Task {i}',)
+            for i in range(num_tasks)
+        ])
+
+        # Members and messages scale with the board, as on real boards
+        for i in range(max(num_tasks // 20, 1)):
+            user = get_user_model().objects.create_user(
+                name=f'Member {i}',
+                email=f'member{i}.{board.board_slug}@email.com',
+                password='pAssw0rd!',)
+            board.users.add(
+                user,
+                through_defaults={
+                    'role': BoardRoles.ADMIN if i == 0 else BoardRoles.MEMBER,
+                },)
+            BoardMessage.objects.bulk_create([
+                BoardMessage(board=board, sender=user, message=f'Message {j}')
+                for j in range(5)
+            ])
+        return board
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+
+from columns.models import Column
+from tasks.models import Task
+from utils.ranks import RANK_REBALANCE_LENGTH
+
+
+class Command(BaseCommand):
+    help = (
+        'Give fresh, evenly spread ranks to the columns of boards and the '
+        'tasks of columns whose ranks have grown too long. Meant to be run '
+        'periodically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--length', type=int, default=RANK_REBALANCE_LENGTH,
+            help='Rebalance lists with a rank longer than this.',)
+
+    def handle(self, *args, **options):
+        board_ids = Column.objects.annotate(
+            rank_length=Length('column_rank'),
+        ).filter(
+            rank_length__gt=options['length'],
+        ).order_by().values_list('board_id', flat=True).distinct()
+
+        for board_id in board_ids:
+            Column.objects.rebalance(board_id)
+
+        column_ids = Task.objects.annotate(
+            rank_length=Length('task_rank'),
+        ).filter(
+            rank_length__gt=options['length'],
+        ).order_by().values_list('column_id', flat=True).distinct()
+
+        for column_id in column_ids:
+            Task.objects.rebalance(column_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebalanced columns of {len(board_ids)} board(s) '
+            f'and tasks of {len(column_ids)} column(s)'))
@@ -0,0 +1,38 @@
+from django.db.models import Manager, Prefetch
+
+
+# Board, columns, tasks, activity logs, memberships w/ users and
+# messages w/ senders: one query each, whatever the board size
+BOARD_QUERY_BUDGET = 6
+
+
+class BoardManager(Manager):
+    def with_related(self):
+        '''
+        Boards with every relation read by BoardSerializer prefetched, so a
+        board serializes in BOARD_QUERY_BUDGET queries.
+        '''
+        from boards.models import BoardMembership, BoardMessage
+
+        return self.get_queryset().prefetch_related(
+            'columns',
+            'tasks',
+            'activity_logs',
+            Prefetch(
+                'memberships',
+                queryset=BoardMembership.objects.select_related(
+                    'user').order_by('created_at'),),
+            Prefetch(
+                'messages',
+                queryset=BoardMessage.objects.select_related('sender'),),
+        )
+
+    def load(self, board_slug):
+        '''Fetch a single board ready to be serialized.'''
+        from columns.models import Column
+        from tasks.models import Task
+
+        board = self.with_related().get(board_slug=board_slug)
+        Column.objects.number(board.columns.all())
+        Task.objects.number(board.tasks.all())
+        return board
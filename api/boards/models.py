@@ -8,6 +8,7 @@ from django.db.models import (
 from rest_framework.reverse import reverse
 
 from boards.exceptions import BoardIsFull, NewMembersNotAllowed
+from boards.managers import BoardManager
 from boards.utils import BoardRoles
 from utils.models import CustomBaseMixin, generate_slug
 
@@ -25,6 +26,8 @@ class Board(CustomBaseMixin):
         related_name='boards',
         through='BoardMembership',)
 
+    objects = BoardManager()
+
     class Meta:
         ordering = ['-updated_at']
 
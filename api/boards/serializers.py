@@ -187,18 +187,20 @@ class DemoSerializer(Serializer):
                 new_members_allowed=new_members_allowed,)
 
             with transaction.atomic():
-                for c in columns:
+                # Columns are appended, so they are created in order
+                for c in sorted(columns, key=lambda c: c['column_index']):
                     column = Column.objects.create(
                         board=board, column_title=c['column_title'],
-                        column_index=c['column_index'],
                         wip_limit=c['wip_limit'],
                         wip_limit_on=c['wip_limit_on'],)
 
-                    for t in tasks:
-                        if t['column'] == c['column_id']:
-                            Task.objects.create(
-                                board=board, column=column, text=t['text'],
-                                task_index=t['task_index'],)
+                    # Tasks are appended, so they are created in order
+                    column_tasks = sorted(
+                        (t for t in tasks if t['column'] == c['column_id']),
+                        key=lambda t: t['task_index'],)
+                    for t in column_tasks:
+                        Task.objects.create(
+                            board=board, column=column, text=t['text'],)
 
             return board
         
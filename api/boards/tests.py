@@ -1,20 +1,50 @@
+import copy
+import json
+import random
+import threading
+import time
+
+from io import StringIO
+
 from django.conf import settings
 from django.core import mail
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection, connections, transaction
 from django_redis import get_redis_connection
 
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
-from boards.models import Board
-from boards.serializers import BoardSerializer, ListBoardSerializer
-from boards.utils import BoardCommands
+from activity_logs.models import ActivityLog
+from boards import fast_serializers
+from boards.cache import BoardSnapshotCache
+from boards.channels import actions
+from boards.managers import BOARD_QUERY_BUDGET
+from boards.models import Board, BoardMessage
+from boards.serializers import (
+    ActivityLogSerializer, BoardSerializer, BoardMembershipSerializer,
+    BoardMessageSerializer, ColumnSerializer, ListBoardSerializer,
+    TaskSerializer,)
+from boards.utils import BoardCommands, BoardRoles
+from columns.models import Column
+from tasks.models import Task
+from users.serializers import ReadOnlyUserSerializer
 from custom_db_logger.models import StatusLog
 from custom_db_logger.utils import LogLevels
 from utils.testing import (
-    create_user, create_board, log_msg_regex, test_user_1, test_demo_board,)
+    create_user, create_board, log_digests, log_msg_regex, query_budget,
+    send_log_digests, synchronous_db_logs, test_user_1, test_user_2,
+    test_demo_board,)
+from utils.ranks import (
+    RANK_REBALANCE_LENGTH, rank_between, spread_ranks,)
 
 
+@log_digests()
+@synchronous_db_logs()
 class BoardTest(APITestCase):
     databases = '__all__'
 
@@ -64,6 +94,7 @@ class BoardTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('Error creating board.', LogLevels.ERROR))
         self.assertEqual(log.command, BoardCommands.CREATE_BOARD)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error creating board.')
@@ -83,6 +114,7 @@ class BoardTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('Error creating board.', LogLevels.ERROR))
         self.assertEqual(log.command, BoardCommands.CREATE_BOARD)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error creating board.')
@@ -125,6 +157,7 @@ class BoardTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('Error submitting demo.', LogLevels.ERROR))
         self.assertEqual(log.command, BoardCommands.SUBMIT_DEMO)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error submitting demo.')
@@ -145,6 +178,7 @@ class BoardTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('Error submitting demo.', LogLevels.ERROR))
         self.assertEqual(log.command, BoardCommands.SUBMIT_DEMO)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error submitting demo.')
@@ -181,3 +215,446 @@ class BoardTest(APITestCase):
             self.assertIn(task.column.column_id, column_ids)
 
         self.assertEqual(StatusLog.objects.using('logger').count(), 0)
+
+    def test_submit_demo_keeps_task_order(self):
+        demo = copy.deepcopy(test_demo_board)
+        demo['tasks'] = [
+            dict(demo['tasks'][0], task_id=i, task_index=index, text=text)
+            for i, (index, text) in enumerate([(2, 'C'), (0, 'A'), (1, 'B')])
+        ]
+        login = self.client.post(reverse('login'), data={
+            'email': test_user_1['email'],
+            'password': test_user_1['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.post(
+            reverse('submit_demo'), data=demo, format='json',)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        instance = Board.objects.get(board_slug=response.data['board']['board_slug'])
+        column = instance.columns.get(column_title='To do')
+        self.assertListEqual(
+            list(column.tasks.order_by('task_rank').values_list(
+                'text', flat=True)),
+            ['A', 'B', 'C'],)
+
+    def test_submit_demo_keeps_column_order(self):
+        demo = copy.deepcopy(test_demo_board)
+        demo['columns'].reverse()
+        login = self.client.post(reverse('login'), data={
+            'email': test_user_1['email'],
+            'password': test_user_1['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.post(
+            reverse('submit_demo'), data=demo, format='json',)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        instance = Board.objects.get(board_slug=response.data['board']['board_slug'])
+        self.assertListEqual(
+            list(instance.columns.order_by('column_rank').values_list(
+                'column_title', flat=True)),
+            ['To do', 'Doing', 'Done'],)
+
+    def test_retrieve_board_served_from_snapshot_until_mutated(self):
+        board = create_board(self.user_1)
+        login = self.client.post(reverse('login'), data={
+            'email': test_user_1['email'],
+            'password': test_user_1['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        url = f"/api/boards/{board.board_slug}/"
+        response_1 = self.client.get(url, format='json')
+        self.assertEqual(response_1.status_code, status.HTTP_200_OK)
+
+        # Writes that skip the actions are not seen until the version bumps
+        Board.objects.filter(board_slug=board.board_slug).update(
+            board_title='Changed behind the cache',)
+        response_2 = self.client.get(url, format='json')
+        self.assertDictEqual(response_2.data, response_1.data)
+
+        # Versions are bumped once the action's transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            actions._update_board_title(board, self.user_1, 'New board title')
+        response_3 = self.client.get(url, format='json')
+        self.assertEqual(response_3.data['board_title'], 'New board title')
+        self.assertDictEqual(
+            response_3.data, BoardSerializer(Board.objects.get(
+                board_slug=board.board_slug)).data,)
+        self.assertEqual(StatusLog.objects.using('logger').count(), 0)
+
+
+class BoardQueryBudgetTest(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user_1 = create_user()
+
+    def _create_board_with_members(self, num_members):
+        board = create_board(self.user_1)
+        for i in range(num_members):
+            member = get_user_model().objects.create_user(
+                name=f'Member {i}',
+                email=f'member{i}.{board.board_slug}@email.com',
+                password='pAssw0rd!',)
+            board.users.add(
+                member, through_defaults={ 'role': BoardRoles.MEMBER },)
+            BoardMessage.objects.create(
+                board=board, sender=member, message=f'Message {i}',)
+        return board
+
+    def _serialize(self, board):
+        context = dict(request=dict(board=board, user=self.user_1))
+        return BoardSerializer(board, context=context).data
+
+    def test_load_board_within_query_budget(self):
+        for num_members in [0, 5, 25]:
+            board = self._create_board_with_members(num_members)
+            with query_budget(BOARD_QUERY_BUDGET):
+                data = self._serialize(Board.objects.load(board.board_slug))
+            self.assertEqual(len(data['memberships']), num_members + 1)
+            self.assertEqual(len(data['messages']), num_members)
+            self.assertEqual(len(data['tasks']), 6)
+
+    def test_loaded_board_matches_unprefetched_board(self):
+        board = self._create_board_with_members(5)
+        data = self._serialize(Board.objects.load(board.board_slug))
+        unprefetched = self._serialize(Board.objects.get(pk=board.pk))
+        self.assertCountEqual(data.pop('memberships'), unprefetched.pop('memberships'))
+        self.assertDictEqual(data, unprefetched)
+
+        # Budget is exceeded without prefetching
+        with self.assertRaises(AssertionError):
+            with query_budget(BOARD_QUERY_BUDGET):
+                self._serialize(Board.objects.get(pk=board.pk))
+
+
+class FastBoardSerializerTest(TestCase):
+    databases = '__all__'
+
+    def test_payload_identical_to_board_serializer(self):
+        user_1 = create_user()
+        user_2 = create_user(test_user_2)
+        board = create_board(user_1, user_2)
+        task = board.tasks.first()
+        BoardMessage.objects.create(board=board, sender=user_1, message='Hi')
+        BoardMessage.objects.create(board=board, sender=user_2, message='Hey')
+        ActivityLog.objects.create(
+            board=board, task=task, command=BoardCommands.UPDATE_TASK,
+            msg='Task updated',)
+        ActivityLog.objects.create(board=board, msg='Board created')
+
+        with query_budget(BOARD_QUERY_BUDGET):
+            fast = fast_serializers.serialize_board(board.board_slug)
+        context = dict(request=dict(board=board, user=user_1))
+        drf = BoardSerializer(
+            Board.objects.load(board.board_slug), context=context,).data
+        self.assertEqual(json.dumps(fast), json.dumps(drf))
+
+    def test_field_lists_match_serializers(self):
+        for fields, serializer in [
+            (fast_serializers.COLUMN_FIELDS, ColumnSerializer),
+            (fast_serializers.TASK_FIELDS, TaskSerializer),
+            (fast_serializers.ACTIVITY_LOG_FIELDS, ActivityLogSerializer),
+            (fast_serializers.MEMBERSHIP_FIELDS, BoardMembershipSerializer),
+            (fast_serializers.MESSAGE_FIELDS, BoardMessageSerializer),
+            (fast_serializers.USER_FIELDS, ReadOnlyUserSerializer),
+        ]:
+            self.assertListEqual(fields, serializer.Meta.fields)
+
+
+class RankTest(SimpleTestCase):
+    def test_rank_between_random_inserts(self):
+        random.seed(0)
+        ranks = []
+        for _ in range(5000):
+            i = random.randint(0, len(ranks))
+            before = ranks[i - 1] if i > 0 else None
+            after = ranks[i] if i < len(ranks) else None
+            rank = rank_between(before, after)
+            self.assertTrue(before is None or before < rank)
+            self.assertTrue(after is None or rank < after)
+            self.assertFalse(rank.endswith('0'))
+            ranks.insert(i, rank)
+
+    def test_rank_between_fails_on_unordered_ranks(self):
+        with self.assertRaises(ValueError):
+            rank_between('b', 'a')
+
+    def test_spread_ranks(self):
+        for count in [0, 1, 61, 62, 1000]:
+            ranks = spread_ranks(count)
+            self.assertEqual(len(set(ranks)), count)
+            self.assertListEqual(ranks, sorted(ranks))
+
+
+class TaskRankTest(TestCase):
+    def setUp(self):
+        self.board = create_board(create_user())
+        self.column = self.board.columns.get(column_title='To do')
+
+    def _task_texts(self, column):
+        return list(column.tasks.values_list('text', flat=True))
+
+    def test_move_writes_one_row(self):
+        for i in range(20):
+            Task.objects.create(
+                board=self.board, column=self.column, text=f'Task {i}',)
+        task = self.column.tasks.last()
+
+        with CaptureQueriesContext(connection) as context:
+            Task.objects.move(task, self.column.column_id, 1)
+        updates = [
+            q for q in context.captured_queries
+            if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(task.task_index, 1)
+        self.assertEqual(self._task_texts(self.column)[1], 'Task 19')
+
+    def test_move_to_other_column_clamps_index(self):
+        task = self.column.tasks.first()
+        other = self.board.columns.get(column_title='Completed')
+        Task.objects.move(task, other.column_id, 99)
+        self.assertEqual(task.task_index, 1)
+        self.assertListEqual(
+            self._task_texts(other), ['Renew subscription', 'Build frontend'])
+        self.assertListEqual(self._task_texts(self.column), ['Contact client'])
+
+    def test_rebalance_keeps_order(self):
+        Task.objects.create(board=self.board, column=self.column, text='Test')
+
+        # Keep halving the gap after the first task
+        for _ in range(250):
+            task = self.column.tasks.last()
+            Task.objects.move(task, self.column.column_id, 1)
+        order = self._task_texts(self.column)
+        self.assertGreater(len(task.task_rank), RANK_REBALANCE_LENGTH)
+
+        out = StringIO()
+        call_command('rebalanceranks', stdout=out)
+        self.assertIn('and tasks of 1 column(s)', out.getvalue())
+        self.assertListEqual(self._task_texts(self.column), order)
+        self.assertTrue(all(
+            len(rank) <= RANK_REBALANCE_LENGTH
+            for rank in Task.objects.ranks(self.column.column_id)))
+
+    def test_duplicate_ranks_are_rejected(self):
+        task_1, task_2 = self.column.tasks.all()[:2]
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Task.objects.filter(task_id=task_2.task_id).update(
+                task_rank=task_1.task_rank,)
+
+
+class ColumnRankTest(TestCase):
+    def setUp(self):
+        self.board = create_board(create_user())
+
+    def _column_titles(self):
+        return list(self.board.columns.values_list('column_title', flat=True))
+
+    def test_move_writes_one_row(self):
+        column = self.board.columns.last()
+
+        with CaptureQueriesContext(connection) as context:
+            Column.objects.move(column, 0)
+        updates = [
+            q for q in context.captured_queries
+            if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(column.column_index, 0)
+        self.assertListEqual(self._column_titles(), [
+            'In production', 'To do', 'In review', 'Completed'])
+
+    def test_delete_leaves_no_gap(self):
+        Column.objects.delete(self.board.columns.get(column_title='In review'))
+        Column.objects.create(board=self.board, column_title='Archive')
+        self.assertListEqual(
+            [c.column_index for c in self.board.columns.all()], [0, 1, 2, 3])
+        self.assertListEqual(self._column_titles(), [
+            'To do', 'Completed', 'In production', 'Archive'])
+
+    def test_duplicate_ranks_are_rejected(self):
+        column_1, column_2 = self.board.columns.all()[:2]
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Column.objects.filter(column_id=column_2.column_id).update(
+                column_rank=column_1.column_rank,)
+
+
+class ColumnRankConcurrencyTest(TransactionTestCase):
+    def test_concurrent_creates_get_distinct_ranks(self):
+        board = create_board(create_user())
+        barrier = threading.Barrier(10)
+        errors = []
+
+        def create(i):
+            try:
+                barrier.wait()
+                Column.objects.create(board=board, column_title=f'Column {i}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=create, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(errors, [])
+        ranks = list(Column.objects.ranks(board.board_slug))
+        self.assertEqual(len(ranks), 14)
+        self.assertEqual(len(set(ranks)), 14)
+
+
+class ColumnDeleteConcurrencyTest(TransactionTestCase):
+    def test_column_delete_and_task_create_do_not_deadlock(self):
+        board = create_board(create_user())
+        column = board.columns.order_by('column_rank').first()
+        board_locked = threading.Event()
+        column_locked = threading.Event()
+        errors = []
+
+        # Locks the board, then the column, as a column delete does
+        def delete_column():
+            try:
+                with transaction.atomic():
+                    Column.objects.lock_board(board.board_slug)
+                    board_locked.set()
+                    column_locked.wait(5)
+                    Task.objects.lock_columns(column.column_id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        # Locks the column, then adds a task referencing the board
+        def create_task():
+            try:
+                board_locked.wait(5)
+                with transaction.atomic():
+                    Task.objects.lock_columns(column.column_id)
+                    column_locked.set()
+                    Task.objects.create(
+                        board=board, column=column, text='New task',)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=delete_column),
+            threading.Thread(target=create_task),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(errors, [])
+        self.assertTrue(column.tasks.filter(text='New task').exists())
+
+
+class TaskMoveConcurrencyTest(TransactionTestCase):
+    databases = '__all__'
+
+    def tearDown(self):
+        get_redis_connection('default').flushall()
+
+    def test_concurrent_moves_keep_positions_dense(self):
+        user = create_user()
+        board = create_board(user)
+        column_1, column_2 = board.columns.order_by('column_rank')[:2]
+        for i in range(16):
+            Task.objects.create(board=board, column=column_1, text=f'Task {i}')
+        task_ids = list(board.tasks.values_list('task_id', flat=True))
+        barrier = threading.Barrier(20)
+        errors = []
+        results = []
+
+        def move(seed):
+            rand = random.Random(seed)
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    column = column_1 if rand.random() < 0.8 else column_2
+                    results.append(actions._move_task(
+                        board, user, rand.choice(task_ids), column.column_id,
+                        rand.randrange(20),))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=move, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(errors, [])
+        self.assertEqual(len(results), 100)
+
+        # Each move's ranges were read under its locks, so they place the
+        # moved task at the index it reported
+        for result in results:
+            task = result['task']
+            task_range = next(
+                r for r in result['ranges'] if r['column'] == task['column'])
+            self.assertEqual(
+                task_range['task_ids'][task['task_index'] - task_range['start']],
+                task['task_id'],)
+
+        for column in (column_1, column_2):
+            ranks = list(Task.objects.ranks(column.column_id))
+            self.assertEqual(len(ranks), len(set(ranks)))
+            indexes = [
+                task.task_index for task in Task.objects.filter(column=column)]
+            self.assertListEqual(indexes, list(range(len(ranks))))
+        self.assertEqual(board.tasks.count(), len(task_ids))
+
+
+class BoardSnapshotCacheTest(SimpleTestCase):
+    def tearDown(self):
+        get_redis_connection('default').flushall()
+
+    def test_version_is_monotonic(self):
+        version_1 = BoardSnapshotCache.version('abcdefghij')
+        version_2 = BoardSnapshotCache.bump('abcdefghij')
+        get_redis_connection('default').flushall()
+        version_3 = BoardSnapshotCache.bump('abcdefghij')
+        self.assertLess(version_1, version_2)
+        self.assertLess(version_2, version_3)
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+        results = []
+        barrier = threading.Barrier(10)
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return { 'board_slug': 'abcdefghij' }
+
+        def read():
+            barrier.wait()
+            results.append(BoardSnapshotCache.get('abcdefghij', build))
+
+        threads = [threading.Thread(target=read) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len(results), 10)
+        for result in results:
+            self.assertDictEqual(result, { 'board_slug': 'abcdefghij' })
+
+        BoardSnapshotCache.bump('abcdefghij')
+        BoardSnapshotCache.get('abcdefghij', build)
+        self.assertEqual(len(builds), 2)
@@ -16,6 +16,7 @@ class BoardCommands(TextChoices):
     TITLE = 'update_board_title'
     CREATE_MSG = 'create_msg'
     UPDATE_MSG = 'update_msg'
+    READ_MSGS = 'read_msgs'
     CREATE_TASK = 'create_task'
     UPDATE_TASK = 'update_task'
     MOVE_TASK = 'move_task'
@@ -31,4 +32,5 @@ class BoardCommands(TextChoices):
     LEAVE = 'leave_board'
     INVITE = 'invite_member'
     NO_COMMAND = 'no_command'
+    BATCH = 'batch'
     SUBMIT_DEMO = 'submit_demo'
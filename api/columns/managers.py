@@ -1,62 +1,90 @@
 from django.db import transaction
-from django.db.models import F, Manager
-from django.utils.timezone import now
-from django.utils.translation import gettext_lazy as _
+from django.db.models import Case, Manager, Value, When
+
+from boards.models import Board
+from utils.ranks import RANK_HARD_LENGTH, rank_at, rank_between, spread_ranks
 
 
 class ColumnManager(Manager):
+    def ranks(self, board_id):
+        '''Ranks of a board's columns, in order.'''
+        return self.get_queryset().filter(
+            board_id=board_id,
+        ).order_by('column_rank').values_list('column_rank', flat=True)
+
+    def lock_board(self, board_id):
+        '''
+        Lock a board's row for the rest of the transaction, so that columns
+        are ranked on it one at a time. The lock leaves the row's key alone,
+        so tasks and columns can still be added to the board while it is
+        held: a caller that locked a column first and then adds a task does
+        not deadlock with one that locks the board and then the column.
+        '''
+        return Board.objects.select_for_update(no_key=True).only(
+            'board_slug').get(board_slug=board_id)
+
+    def next_rank(self, board_id):
+        '''Rank for a column appended to a board. Lock the board first.'''
+        return rank_between(self.ranks(board_id).last(), None)
+
+    def number(self, columns):
+        '''
+        Set the index of each column from a list ordered by rank within
+        each board, saving a count query per column.
+        '''
+        positions = {}
+        for column in columns:
+            column.column_index = positions.get(column.board_id, 0)
+            positions[column.board_id] = column.column_index + 1
+        return columns
+
     def delete(self, instance):
-        '''Delete a column and reposition other columns if necessary.'''
-        greater_columns = self.get_queryset().select_for_update().filter(
-            board=instance.board,
-            column_index__gt=instance.column_index,)
-        with transaction.atomic():
-            if greater_columns:
-                greater_columns.update(
-                    column_index=F('column_index') - 1,
-                    updated_at=now(),
-                )
-            with transaction.atomic():
-                return instance.delete()
+        '''
+        Delete a column. Ranks of the other columns need no change, so
+        this leaves no gap to close.
+        '''
+        return instance.delete()
 
     def move(self, instance, new_index):
         '''
-        Move a column to a new index on the board and
-        reposition other columns if necessary.
+        Move a column to a new index on the board. Only the column's row is
+        written.
         '''
         new_index = int(new_index)
-        columns = self.get_queryset().select_for_update().filter(
-            board=instance.board,)
 
         with transaction.atomic():
-            column_count = columns.count()
-            if new_index >= column_count:
-                new_index = column_count - 1
-            elif new_index < 0:
-                new_index = 0
-
-            with transaction.atomic():
-                if new_index < instance.column_index:
-                    columns.filter(
-                        column_index__lt=instance.column_index,
-                        column_index__gte=new_index,
-                    ).exclude(
-                        column_id=instance.column_id,
-                    ).update(
-                        column_index=F('column_index') + 1,
-                        updated_at=now(),
-                    )
-                elif new_index > instance.column_index:
-                    columns.filter(
-                        column_index__lte=new_index,
-                        column_index__gt=instance.column_index,
-                    ).exclude(
-                        column_id=instance.column_id,
-                    ).update(
-                        column_index=F('column_index') - 1,
-                        updated_at=now(),
-                    )
-
-            instance.column_index = new_index
-            instance.save(update_fields=['column_index', 'updated_at'])
+            self.lock_board(instance.board_id)
+
+            instance.column_rank = rank_at(
+                self.ranks(instance.board_id).exclude(
+                    column_id=instance.column_id),
+                new_index,)
+            instance.column_index = None
+            instance.save(update_fields=['column_rank', 'updated_at'])
+
+            if len(instance.column_rank) > RANK_HARD_LENGTH:
+                self.rebalance(instance.board_id)
+                instance.refresh_from_db(fields=['column_rank'])
             return instance
+
+    def rebalance(self, board_id):
+        '''
+        Give a board's columns fresh, evenly spread ranks in their current
+        order, in a single statement. Column positions are unchanged.
+        '''
+        with transaction.atomic():
+            self.lock_board(board_id)
+            column_ids = list(self.get_queryset().filter(
+                board_id=board_id,
+            ).order_by('column_rank', 'column_id').values_list(
+                'column_id', flat=True))
+
+            if column_ids:
+                self.get_queryset().filter(column_id__in=column_ids).update(
+                    column_rank=Case(*[
+                        When(column_id=column_id, then=Value(rank))
+                        for column_id, rank in zip(
+                            column_ids, spread_ranks(len(column_ids)))
+                    ]),
+                )
+            return len(column_ids)
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+
+from utils.ranks import spread_ranks
+
+
+def rank_columns(apps, schema_editor):
+    Column = apps.get_model('columns', 'Column')
+    board_ids = Column.objects.values_list('board_id', flat=True).distinct()
+
+    for board_id in board_ids:
+        columns = list(Column.objects.filter(
+            board_id=board_id).order_by('column_index', 'column_id'))
+        for column, rank in zip(columns, spread_ranks(len(columns))):
+            column.column_rank = rank
+        Column.objects.bulk_update(columns, ['column_rank'])
+
+
+def index_columns(apps, schema_editor):
+    Column = apps.get_model('columns', 'Column')
+    board_ids = Column.objects.values_list('board_id', flat=True).distinct()
+
+    for board_id in board_ids:
+        columns = list(Column.objects.filter(
+            board_id=board_id).order_by('column_rank', 'column_id'))
+        for index, column in enumerate(columns):
+            column.column_index = index
+        Column.objects.bulk_update(columns, ['column_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('columns', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='column',
+            name='column_rank',
+            field=models.CharField(db_collation='C', default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='column',
+            name='column_index',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(rank_columns, index_columns),
+        migrations.RemoveField(
+            model_name='column',
+            name='column_index',
+        ),
+        migrations.AlterModelOptions(
+            name='column',
+            options={'ordering': ['board', 'column_rank']},
+        ),
+        migrations.AddIndex(
+            model_name='column',
+            index=models.Index(fields=['board', 'column_rank'], name='columns_col_board_i_5c9cb0_idx'),
+        ),
+    ]
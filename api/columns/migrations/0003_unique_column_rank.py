@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+from utils.ranks import spread_ranks
+
+
+def rerank_duplicates(apps, schema_editor):
+    Column = apps.get_model('columns', 'Column')
+    board_ids = Column.objects.values('board_id', 'column_rank').annotate(
+        count=Count('column_id'),
+    ).filter(count__gt=1).values_list('board_id', flat=True).distinct()
+
+    for board_id in board_ids:
+        columns = list(Column.objects.filter(
+            board_id=board_id).order_by('column_rank', 'column_id'))
+        for column, rank in zip(columns, spread_ranks(len(columns))):
+            column.column_rank = rank
+        Column.objects.bulk_update(columns, ['column_rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('columns', '0002_column_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(rerank_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='column',
+            constraint=models.UniqueConstraint(deferrable=models.Deferrable['IMMEDIATE'], fields=('board', 'column_rank'), name='unique_column_rank'),
+        ),
+    ]
@@ -1,10 +1,12 @@
+from django.db import transaction
 from django.db.models import (
-    AutoField, BooleanField, CharField, ForeignKey,
-    PositiveSmallIntegerField, CASCADE,)
+    AutoField, BooleanField, CharField, Deferrable, ForeignKey,
+    PositiveSmallIntegerField, CASCADE, Index, UniqueConstraint,)
 
 from boards.models import Board
 from columns.managers import ColumnManager
 from utils.models import CustomBaseMixin
+from utils.ranks import RANK_COLLATION, RANK_MAX_LENGTH
 
 
 class Column(CustomBaseMixin):
@@ -14,20 +16,54 @@ class Column(CustomBaseMixin):
         related_name='columns',
         editable=False,)
     column_id = AutoField(primary_key=True, editable=False)
-    column_index = PositiveSmallIntegerField()
+    column_rank = CharField(
+        max_length=RANK_MAX_LENGTH,
+        db_collation=RANK_COLLATION,
+        editable=False,)
     column_title = CharField(max_length=255)
     wip_limit_on = BooleanField(default=True)
     wip_limit = PositiveSmallIntegerField(default=5)
 
     objects = ColumnManager()
 
+    # Position on the board, derived from rank order
+    _column_index = None
+
     class Meta:
-        ordering = ['board', 'column_index']
+        ordering = ['board', 'column_rank']
+        constraints = [
+            # No two columns at the same position on a board. Checked at the
+            # end of each statement, so a rebalance can swap ranks
+            UniqueConstraint(
+                fields=['board', 'column_rank'],
+                deferrable=Deferrable.IMMEDIATE,
+                name='unique_column_rank',),
+        ]
+        indexes = [Index(fields=['board', 'column_rank'])]
 
     def __str__(self):
         return f'<{self.board}>[{self.column_title}]'
 
+    @property
+    def column_index(self):
+        if self._column_index is None:
+            self._column_index = Column.objects.filter(
+                board_id=self.board_id,
+                column_rank__lt=self.column_rank,
+            ).count()
+        return self._column_index
+
+    @column_index.setter
+    def column_index(self, value):
+        self._column_index = value
+
     def save(self, *args, **kwargs):
         if not self.column_id:
-            self.column_index = self.board.columns.count()
-        super(Column, self).save(*args, **kwargs)
\ No newline at end of file
+            # New columns are appended to their board
+            with transaction.atomic():
+                Column.objects.lock_board(self.board_id)
+                self.column_rank = Column.objects.next_rank(self.board_id)
+                self.column_index = None
+                super(Column, self).save(*args, **kwargs)
+        else:
+            super(Column, self).save(*args, **kwargs)
\ No newline at end of file
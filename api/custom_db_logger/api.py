@@ -1,18 +1,125 @@
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from custom_db_logger.filters import StatusLogFilter
-from custom_db_logger.models import StatusLog
+from custom_db_logger.export import gzipped, ndjson_logs
+from custom_db_logger.filters import StatusLogFilter, StatusLogRollupFilter
+from custom_db_logger.models import StatusLog, StatusLogRollup
+from custom_db_logger.pagination import StatusLogPagination
+from custom_db_logger.rollups import DIMENSIONS
 from custom_db_logger.serializers import StatusLogSerializer
+from utils.metrics import command_latency
 
 
 class StatusLogAPI(ReadOnlyModelViewSet):
     permission_classes = (IsAdminUser,)
     queryset = StatusLog.objects.all()
     serializer_class = StatusLogSerializer
-    filter_backends = (DjangoFilterBackend, OrderingFilter,)
+    filter_backends = (DjangoFilterBackend,)
     filterset_class = StatusLogFilter
-    ordering_fields = ('created_at',)
-    ordering = '-created_at'
\ No newline at end of file
+    pagination_class = StatusLogPagination
+
+    @action(detail=False)
+    def groups(self, request, *args, **kwargs):
+        '''
+        Filtered logs grouped by fingerprint, most recently seen first, with
+        the total occurrences of each, when it was first and last seen, and
+        the id of its latest row.
+        '''
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        groups = queryset.values(
+            'fingerprint', 'level', 'logger_name', 'command', 'func_name',
+            'line_no',
+        ).annotate(
+            occurrences=Sum('occurrences'),
+            rows=Count('id'),
+            first_seen=Min('created_at'),
+            last_seen=Max(Coalesce('last_seen', 'created_at')),
+            latest_id=Max('id'),
+        ).order_by('-last_seen')
+        return Response(list(groups))
+
+    @action(detail=False)
+    def export(self, request, *args, **kwargs):
+        '''
+        Every filtered log, oldest first, streamed as an NDJSON download,
+        gzipped with `gzip=true`. Under ASGI, it is served by
+        custom_db_logger.consumers.StatusLogExportConsumer.
+        '''
+        queryset = self.filter_queryset(self.get_queryset())
+        content = ndjson_logs(queryset)
+        filename = f"logs-{timezone.now().strftime('%Y%m%dT%H%M%SZ')}.ndjson"
+        content_type = 'application/x-ndjson'
+        if request.query_params.get('gzip') in ('1', 'true'):
+            content = gzipped(content)
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class CommandLatencyAPI(APIView):
+    '''
+    Latency histograms of the websocket commands handled by this process,
+    by command and phase. DELETE starts them over.
+    '''
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(command_latency.snapshot())
+
+    def delete(self, request, *args, **kwargs):
+        command_latency.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StatusLogRollupAPI(GenericAPIView):
+    '''
+    Time series of log counts from the hourly rollups, filtered by `hour`
+    (the last day unless given), logger, command, level, board and client
+    IP. Counts are summed by `interval`, 'hour' or 'day', and split by the
+    comma-separated dimensions of `group_by`.
+    '''
+    permission_classes = (IsAdminUser,)
+    queryset = StatusLogRollup.objects.all()
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = StatusLogRollupFilter
+    intervals = { 'day': TruncDay, 'hour': TruncHour }
+
+    def get(self, request, *args, **kwargs):
+        interval = request.query_params.get('interval', 'hour')
+        if interval not in self.intervals:
+            raise ValidationError({ 'interval': 'Must be hour or day.' })
+        group_by = [
+            field for field in
+            request.query_params.get('group_by', '').split(',') if field
+        ]
+        if not set(group_by) <= set(DIMENSIONS):
+            raise ValidationError({
+                'group_by': f"Must be of {', '.join(DIMENSIONS)}.",
+            })
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if 'hour_after' not in request.query_params:
+            queryset = queryset.filter(
+                hour__gte=timezone.now() - timedelta(days=1))
+        series = queryset.order_by().annotate(
+            time=self.intervals[interval]('hour'),
+        ).values('time', *group_by).annotate(
+            count=Sum('count'),
+        ).order_by('time', '-count')
+        return Response(list(series))
@@ -0,0 +1,74 @@
+import io
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from channels.http import AsgiRequest
+from django.conf import settings
+from django.core import signals
+from django.core.handlers.base import BaseHandler
+
+
+_handler = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_export_handler():
+    '''
+    The handler running export requests through the middleware and view,
+    and the pool of threads it runs on.
+    '''
+    global _handler, _executor
+
+    if _handler is None:
+        with _lock:
+            if _handler is None:
+                handler = BaseHandler()
+                handler.load_middleware()
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.LOG_EXPORT_WORKERS,
+                    thread_name_prefix='log-export',)
+                _handler = handler
+    return _handler, _executor
+
+
+class StatusLogExportConsumer(AsyncHttpConsumer):
+    '''
+    Serves `StatusLogAPI.export` on a pool of LOG_EXPORT_WORKERS threads,
+    instead of the single thread Channels handles other HTTP requests on,
+    so a long download holds up no other request. The request goes through
+    the same middleware and view as it would there.
+    '''
+
+    async def handle(self, body):
+        handler, executor = get_export_handler()
+        await sync_to_async(
+            self.export, thread_sensitive=False, executor=executor,)(
+            handler, body)
+
+    def export(self, handler, body):
+        send_headers = async_to_sync(self.send_headers)
+        send_body = async_to_sync(self.send_body)
+
+        signals.request_started.send(sender=self.__class__, scope=self.scope)
+        response = handler.get_response(
+            AsgiRequest(self.scope, io.BytesIO(body)))
+        try:
+            headers = [
+                (name.encode('latin1'), value.encode('latin1'))
+                for name, value in response.items()
+            ]
+            for cookie in response.cookies.values():
+                headers.append((
+                    b'Set-Cookie',
+                    cookie.output(header='').encode('ascii').strip(),))
+            send_headers(status=response.status_code, headers=headers)
+            # The rows are read as the download is sent
+            for chunk in response:
+                send_body(chunk, more_body=True)
+            send_body(b'')
+        finally:
+            response.close()
@@ -1,12 +1,73 @@
+import hashlib
 import logging
+import os
+import queue
+import threading
+
+from datetime import datetime, timezone
 
 db_default_formatter = logging.Formatter()
 
+# Queued to stop the writer of a batched handler
+_CLOSE = object()
+
 
 class DatabaseLogHandler(logging.Handler):
-    def emit(self, record):        
-        from custom_db_logger.models import StatusLog
+    '''
+    Writes log records to the StatusLog table.
+
+    With `batched`, records are queued instead and a background thread
+    writes them in batches of up to `batch_size`, at least every
+    `flush_interval` seconds, so logging does not wait on the logger
+    database. Records that would grow the queue past `capacity` are dropped
+    and counted, and the count is written to the table as a warning with
+    the next batch. The queue is written out when the handler is closed,
+    as on interpreter shutdown. Batched records are stamped with the time
+    they are written.
+
+    Records are fingerprinted by their message, command, board, user,
+    client IP, logger, place in the code and trace. With `batched` and
+    `dedup_seconds`, repeats of a record within that many seconds of its
+    first occurrence are counted on its row, with the time of the last one,
+    instead of each being written to a row.
+
+    The batched writer also adds each batch to the hourly log counts, see
+    custom_db_logger.rollups. Without `batched`, records are written with a
+    single insert and the counts are left to the `rolluplogs` command.
+    '''
+
+    def __init__(
+        self, level=logging.NOTSET, batched=False, capacity=10000,
+        batch_size=500, flush_interval=1.0, dedup_seconds=0,
+    ):
+        super().__init__(level)
+        self.batched = batched
+        self.dedup_seconds = dedup_seconds
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.writer = None
+        self.writer_pid = None
+        self.writer_lock = threading.Lock()
+
+    def emit(self, record):
+        kwargs = self.log_kwargs(record)
 
+        if not self.batched:
+            self.write_logs([kwargs])
+            return
+
+        self.start_writer()
+        try:
+            self.queue.put_nowait(kwargs)
+        except queue.Full:
+            with self.writer_lock:
+                self.dropped += 1
+
+    def log_kwargs(self, record):
         trace = None
         if record.exc_info:
             trace = db_default_formatter.formatException(record.exc_info)
@@ -30,16 +91,29 @@ class DatabaseLogHandler(logging.Handler):
         metadata = None
         if hasattr(record, 'metadata'):
             metadata = record.metadata
+            # Captured lazily, see utils.RequestMetadata
+            if callable(getattr(metadata, 'resolve', None)):
+                metadata = metadata.resolve()
 
         msg = self.format(record)
 
-        kwargs = {
+        fingerprint = hashlib.sha1('\0'.join(
+            str(part) for part in (
+                record.levelno, record.name, command, board, user,
+                client_ip, record.pathname, record.funcName, record.lineno,
+                record.getMessage(), trace,
+            )
+        ).encode()).hexdigest()
+
+        return {
             'asc_time': record.asctime,
             'board': board,
             'client_ip': client_ip,
             'command': command,
             'filename': record.filename,
+            'fingerprint': fingerprint,
             'func_name': record.funcName,
+            'last_seen': datetime.fromtimestamp(record.created, timezone.utc),
             'level': record.levelno,
             'line_no': record.lineno,
             'logger_name': record.name,
@@ -55,8 +129,6 @@ class DatabaseLogHandler(logging.Handler):
             'user': user,
         }
 
-        StatusLog.objects.create(**kwargs)
-
     def format(self, record):
         if self.formatter:
             fmt = self.formatter
@@ -72,4 +144,158 @@ class DatabaseLogHandler(logging.Handler):
             # Ignore exception traceback and stack info
             return fmt.formatMessage(record)
         else:
-            return fmt.format(record)
\ No newline at end of file
+            return fmt.format(record)
+
+    def start_writer(self):
+        # A forked process gets a copy of the queue but not of the thread
+        if self.writer_pid == os.getpid():
+            return
+
+        with self.writer_lock:
+            if self.writer_pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.capacity)
+                self.writer = threading.Thread(
+                    target=self.write,
+                    name='db-log-writer',
+                    daemon=True,)
+                self.writer.start()
+                self.writer_pid = os.getpid()
+
+    def write(self):
+        from django.db import close_old_connections
+
+        stopping = False
+        while not stopping:
+            batch, flushed = [], []
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    # Written once everything queued before it is
+                    flushed.append(item)
+                elif item is _CLOSE:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            self.write_batch(batch)
+            close_old_connections()
+            for event in flushed:
+                event.set()
+
+    def write_batch(self, batch):
+        with self.writer_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.append(self.log_kwargs(logging.LogRecord(
+                'db_logger', logging.WARNING, __file__, 0,
+                'Dropped %d log record(s) while the queue was full.',
+                (dropped,), None, 'write_batch',)))
+            batch[-1]['metadata'] = { 'dropped': dropped }
+        if not batch:
+            return
+
+        from custom_db_logger.rollups import add_rollups
+
+        try:
+            add_rollups(self.write_logs(batch))
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            self.handleError(logging.makeLogRecord({
+                'msg': 'Failed to write %d log record(s).',
+                'args': (len(batch),),
+            }))
+
+    def write_logs(self, logs):
+        '''
+        Write logs, given as StatusLog fields, collapsing repeats of a
+        fingerprint seen within `dedup_seconds` onto the row of its first
+        occurrence. Repeats are only collapsed by the batched writer, as that
+        costs a cache read and an update besides the insert. Returns the
+        rollup counts of the logs, by the rows they were written to.
+        '''
+        from django.core.cache import cache
+        from django.db.models import F
+        from django.db.models.functions import Greatest
+
+        from custom_db_logger.models import StatusLog
+        from custom_db_logger.rollups import count_rows
+
+        if not (self.batched and self.dedup_seconds):
+            created = StatusLog.objects.bulk_create([
+                StatusLog(**log) for log in logs
+            ])
+            return count_rows(
+                (log, row.created_at, 1) for log, row in zip(logs, created))
+
+        groups = {}
+        for log in logs:
+            group = groups.get(log['fingerprint'])
+            if group is None:
+                groups[log['fingerprint']] = dict(log)
+            else:
+                group['occurrences'] = group.get('occurrences', 1) + 1
+                group['last_seen'] = max(group['last_seen'], log['last_seen'])
+
+        keys = {
+            f'log_fingerprint_{fingerprint}': fingerprint
+            for fingerprint in groups
+        }
+        rows = []
+        for key, (log_id, created_at) in cache.get_many(list(keys)).items():
+            group = groups[keys[key]]
+            # created_at picks the row's partition
+            if StatusLog.objects.filter(
+                id=log_id, created_at=created_at,
+            ).update(
+                occurrences=F('occurrences') + group.get('occurrences', 1),
+                last_seen=Greatest('last_seen', group['last_seen']),
+            ):
+                del groups[keys[key]]
+                rows.append(
+                    (group, created_at, group.get('occurrences', 1)))
+
+        created = StatusLog.objects.bulk_create([
+            StatusLog(**group) for group in groups.values()
+        ])
+        for group, log in zip(groups.values(), created):
+            cache.add(
+                f'log_fingerprint_{log.fingerprint}',
+                (log.id, log.created_at), self.dedup_seconds,)
+            rows.append((group, log.created_at, group.get('occurrences', 1)))
+        return count_rows(rows)
+
+    def flush(self, timeout=10):
+        '''
+        Wait for records queued so far to be written. Returns whether they
+        were within `timeout` seconds.
+        '''
+        if not self.batched or self.writer_pid != os.getpid():
+            return True
+
+        flushed = threading.Event()
+        try:
+            self.queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(timeout)
+
+    def close(self):
+        if self.batched and self.writer_pid == os.getpid():
+            try:
+                self.queue.put(_CLOSE, timeout=self.flush_interval * 5)
+            except queue.Full:
+                pass
+            self.writer.join(self.flush_interval * 5)
+            self.writer_pid = None
+        super().close()
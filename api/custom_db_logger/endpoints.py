@@ -1,11 +1,20 @@
 from django.urls import include, re_path
 from rest_framework import routers
 
-from custom_db_logger.api import StatusLogAPI
+from custom_db_logger.api import (
+    CommandLatencyAPI, StatusLogAPI, StatusLogRollupAPI,)
 
 router = routers.SimpleRouter()
 router.register('logs', StatusLogAPI, 'logs')
 
 urlpatterns = [
+    re_path(
+        r'^logs/latency/$',
+        CommandLatencyAPI.as_view(),
+        name='command_latency',),
+    re_path(
+        r'^logs/rollups/$',
+        StatusLogRollupAPI.as_view(),
+        name='log_rollups',),
     re_path('', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -0,0 +1,54 @@
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from custom_db_logger.models import StatusLog
+
+# Rows fetched from the server-side cursor at a time
+EXPORT_CHUNK_SIZE = 2000
+# Bytes of output gathered before they are passed on
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+
+def ndjson_logs(
+    queryset, chunk_size=EXPORT_CHUNK_SIZE, buffer_size=EXPORT_BUFFER_SIZE,
+):
+    '''
+    Logs of `queryset`, oldest first, as NDJSON: one object of the log's
+    fields per line. Rows are read through a server-side cursor
+    `chunk_size` at a time and the lines are yielded in blocks of about
+    `buffer_size` bytes, so memory use does not grow with the range.
+
+    The rows are read in a transaction, held until the logs are read or the
+    generator is closed, as in autocommit Postgres would copy every row of
+    the cursor before the first is read.
+    '''
+    fields = [field.name for field in StatusLog._meta.concrete_fields]
+    rows = queryset.order_by('created_at', 'id').values(*fields)
+
+    with transaction.atomic(using=rows.db):
+        lines, size = [], 0
+        for row in rows.iterator(chunk_size=chunk_size):
+            line = _encoder.encode(row).encode() + b'\n'
+            lines.append(line)
+            size += len(line)
+            if size >= buffer_size:
+                yield b''.join(lines)
+                lines, size = [], 0
+        if lines:
+            yield b''.join(lines)
+
+
+def gzipped(chunks, level=6):
+    '''
+    Compress a stream of bytes into the gzip format as it is read.
+    '''
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -2,7 +2,7 @@ from itertools import chain
 
 from django_filters import rest_framework as filters
 
-from custom_db_logger.models import StatusLog
+from custom_db_logger.models import StatusLog, StatusLogRollup
 from custom_db_logger.utils import LogLevels
 from utils import COMMANDS
 
@@ -16,4 +16,14 @@ class StatusLogFilter(filters.FilterSet):
         model = StatusLog
         fields = [
             'board', 'client_ip', 'command', 'created_at',
-            'level', 'logger_name', 'user',]
\ No newline at end of file
+            'level', 'logger_name', 'user',]
+
+
+class StatusLogRollupFilter(filters.FilterSet):
+    hour = filters.DateTimeFromToRangeFilter()
+    level = filters.MultipleChoiceFilter(choices=LogLevels.choices)
+
+    class Meta:
+        model = StatusLogRollup
+        fields = [
+            'board', 'client_ip', 'command', 'hour', 'level', 'logger_name',]
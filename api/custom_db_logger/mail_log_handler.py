@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+
+from collections import Counter
+from datetime import datetime, timezone
+
+
+class DigestAdminEmailHandler(logging.Handler):
+    '''
+    Emails the site admins a digest of the records logged each `interval`
+    seconds, in place of AdminEmailHandler's email per record.
+
+    Repeats of a record, by level, logger, place in the code and message,
+    are counted in the digest with the client IPs and commands they came
+    from, rather than listed. Only the first `capacity` distinct records of
+    a digest are kept, and any more are counted.
+
+    Digests are sent from a background thread, at most `max_per_hour` an
+    hour across processes (0 for no limit). Records logged while over the
+    limit wait for the next digest sent. With an `interval` of 0, records
+    are sent as they are logged, still within the limit.
+    '''
+
+    def __init__(
+        self, level=logging.NOTSET, interval=300, max_per_hour=12,
+        capacity=100,
+    ):
+        super().__init__(level)
+        self.interval = interval
+        self.max_per_hour = max_per_hour
+        self.capacity = capacity
+        self.entries = {}
+        self.dropped = 0
+        self.sent = 0
+        self.entries_lock = threading.Lock()
+        self.closing = threading.Event()
+        self.worker = None
+        self.worker_pid = None
+
+    def emit(self, record):
+        key = (
+            record.levelno, record.name, record.pathname, record.lineno,
+            record.getMessage(),
+        )
+        seen = datetime.fromtimestamp(record.created, timezone.utc)
+        client_ip = getattr(record, 'client_ip', None)
+        command = getattr(record, 'command', None)
+
+        with self.entries_lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.capacity:
+                    self.dropped += 1
+                    return
+                entry = self.entries[key] = {
+                    'subject': f'{record.levelname}: {record.getMessage()}',
+                    'text': self.format(record),
+                    'count': 0,
+                    'first_seen': seen,
+                    'client_ips': Counter(),
+                    'commands': Counter(),
+                }
+            entry['count'] += 1
+            entry['last_seen'] = seen
+            if client_ip:
+                entry['client_ips'][client_ip] += 1
+            if command:
+                entry['commands'][command] += 1
+
+        if self.interval:
+            self.start_worker()
+        else:
+            self.send()
+
+    def start_worker(self):
+        # A forked process gets a copy of the records but not of the thread
+        if self.worker_pid == os.getpid():
+            return
+
+        with self.entries_lock:
+            if self.worker_pid != os.getpid():
+                self.closing = threading.Event()
+                self.worker = threading.Thread(
+                    target=self.run,
+                    name='mail-digest-sender',
+                    daemon=True,)
+                self.worker.start()
+                self.worker_pid = os.getpid()
+
+    def run(self):
+        while not self.closing.wait(self.interval):
+            self.send()
+
+    def send(self):
+        '''
+        Email the records logged since the last digest, unless there are
+        none or the hourly limit is reached. Returns whether it was sent.
+        '''
+        from django.core.mail import mail_admins
+
+        if not self.entries and not self.dropped:
+            return False
+        if not self.allow_email():
+            return False
+
+        with self.entries_lock:
+            entries, self.entries = self.entries, {}
+            dropped, self.dropped = self.dropped, 0
+
+        try:
+            subject, message = self.format_digest(
+                list(entries.values()), dropped)
+            mail_admins(subject, message, fail_silently=True)
+            self.sent += 1
+        except Exception:
+            self.handleError(logging.makeLogRecord({
+                'msg': 'Failed to email a digest of %d log record(s).',
+                'args': (len(entries) + dropped,),
+            }))
+        return True
+
+    def allow_email(self):
+        if not self.max_per_hour:
+            return True
+
+        from django.core.cache import cache
+
+        key = f'log_digest_emails_{int(time.time() // 3600)}'
+        try:
+            cache.add(key, 0, 3600)
+            return cache.incr(key) <= self.max_per_hour
+        except Exception:
+            # At most one per interval and process without the cache
+            return True
+
+    def format_digest(self, entries, dropped):
+        entries.sort(key=lambda entry: entry['count'], reverse=True)
+        total = sum(entry['count'] for entry in entries) + dropped
+
+        subject = entries[0]['subject'] if entries else 'Log records'
+        if total > 1:
+            subject += f' ({total} records)'
+        # Like AdminEmailHandler, keep the subject to one line
+        subject = subject.replace('\n', '\\n').replace('\r', '\\r')[:989]
+
+        sections = []
+        for entry in entries:
+            lines = [
+                f"{entry['count']} x {entry['subject']}",
+                f"First at {entry['first_seen']:%Y-%m-%d %H:%M:%S} UTC, "
+                f"last at {entry['last_seen']:%Y-%m-%d %H:%M:%S} UTC",
+            ]
+            for name, counts in (
+                ('Client IPs', entry['client_ips']),
+                ('Commands', entry['commands']),
+            ):
+                if counts:
+                    lines.append(f'{name}: ' + ', '.join(
+                        f'{value} ({count})'
+                        for value, count in counts.most_common(10)))
+            lines.extend(['', entry['text']])
+            sections.append('\n'.join(lines))
+        if dropped:
+            sections.append(
+                f'{dropped} more record(s) were not kept, as the digest '
+                f'was full.')
+        return subject, '\n\n---\n\n'.join(sections)
+
+    def flush(self):
+        self.send()
+
+    def close(self):
+        if self.worker_pid == os.getpid():
+            self.closing.set()
+            self.worker.join(5)
+            self.worker_pid = None
+        self.send()
+        super().close()
@@ -0,0 +1,71 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from custom_db_logger.export import gzipped, ndjson_logs
+from custom_db_logger.filters import StatusLogFilter
+from custom_db_logger.models import StatusLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Export logs, oldest first, as NDJSON, filtered as by the log API. '
+        'Rows are streamed from a server-side cursor, so any range can be '
+        'exported in constant memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board')
+        parser.add_argument('--client-ip')
+        parser.add_argument('--command')
+        parser.add_argument(
+            '--level', nargs='+', default=[],
+            help='Numeric log levels, e.g. 40 for errors.',)
+        parser.add_argument('--logger-name')
+        parser.add_argument('--user')
+        parser.add_argument(
+            '--since', help='Date and time of the earliest log to export.',)
+        parser.add_argument(
+            '--until', help='Date and time of the latest log to export.',)
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='File to write to, "-" for stdout.',)
+        parser.add_argument(
+            '--gzip', action='store_true', help='Gzip the output.',)
+
+    def handle(self, *args, **options):
+        data = QueryDict(mutable=True)
+        for field in (
+            'board', 'client_ip', 'command', 'logger_name', 'user',
+        ):
+            if options[field] is not None:
+                data[field] = options[field]
+        data.setlist('level', options['level'])
+        if options['since']:
+            data['created_at_after'] = options['since']
+        if options['until']:
+            data['created_at_before'] = options['until']
+
+        filterset = StatusLogFilter(data, queryset=StatusLog.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        content = ndjson_logs(filterset.qs)
+        if options['gzip']:
+            content = gzipped(content)
+
+        if options['output'] == '-':
+            if options['gzip'] and sys.stdout.isatty():
+                raise CommandError('Not writing gzip to a terminal.')
+            self.write(content, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(content, output)
+
+    def write(self, content, output):
+        size = 0
+        for chunk in content:
+            output.write(chunk)
+            size += len(chunk)
+        output.flush()
+        self.stderr.write(f'Exported {size} byte(s) of logs')
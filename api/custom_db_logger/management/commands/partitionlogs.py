@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+from django.utils import timezone
+
+from custom_db_logger import partitions
+from custom_db_logger.models import StatusLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the monthly partitions of the log table for the coming '
+        'months, and drop those past the retention period. Meant to be run '
+        'periodically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Months after the current one to create partitions for.',)
+        parser.add_argument(
+            '--retention', type=int, default=settings.LOG_RETENTION_MONTHS,
+            help=(
+                'Months before the current one to keep logs of. Older '
+                'partitions are dropped, and older rows of the default one '
+                'deleted. 0 keeps every log.'),)
+
+    def handle(self, *args, **options):
+        table = StatusLog._meta.db_table
+        month = timezone.now().date().replace(day=1)
+        connection = connections[router.db_for_write(StatusLog)]
+
+        with connection.cursor() as cursor:
+            created = partitions.create_partitions(
+                cursor, table,
+                month, partitions.add_months(month, options['ahead']),)
+            dropped = deleted = 0
+            if options['retention'] > 0:
+                before = partitions.add_months(month, -options['retention'])
+                dropped = partitions.drop_partitions(cursor, table, before)
+                deleted = partitions.prune_default_partition(
+                    cursor, table, before,)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} and dropped {dropped} log partition(s), and '
+            f'deleted {deleted} expired row(s) of the default one'))
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from custom_db_logger import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the hourly log counts of past hours from the log table. '
+        'The batched log handler keeps the counts as logs are written. '
+        'Without batching, run this periodically to keep them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Date and time in the first hour to rebuild. Defaults to '
+            'a day before --until.',)
+        parser.add_argument(
+            '--until',
+            help='Date and time to rebuild up to. Defaults to the start of '
+            'the current hour, as hours still being logged would be counted '
+            'twice.',)
+
+    def handle(self, *args, **options):
+        until = self.parse(options['until']) or rollups.floor_hour(
+            timezone.now())
+        since = self.parse(options['since']) or until - timedelta(days=1)
+        if since >= until:
+            raise CommandError('--since must be before --until.')
+
+        count = rollups.rebuild_rollups(since, until)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} hourly log count(s)'))
+
+    def parse(self, value):
+        if value is None:
+            return None
+        time = parse_datetime(value)
+        if time is None:
+            raise CommandError(f'Invalid date and time: {value}')
+        if timezone.is_naive(time):
+            time = timezone.make_aware(time)
+        return time
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.9 on 2026-10-18 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_db_logger', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statuslog',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='statuslog',
+            name='last_seen',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslog',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,85 @@
+import django.contrib.postgres.indexes
+
+from django.db import migrations
+from django.utils import timezone
+
+from custom_db_logger import partitions
+
+
+def create_indexes(schema_editor, model):
+    for field in model._meta.local_fields:
+        if field.db_index and not field.unique:
+            for sql in schema_editor._field_indexes_sql(model, field):
+                schema_editor.execute(sql)
+
+
+def partition(apps, schema_editor):
+    '''
+    Rebuild the log table partitioned by month of created_at. Its primary
+    key has to include created_at, and its indexes are created again under
+    the same names.
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    StatusLog = apps.get_model('custom_db_logger', 'StatusLog')
+    table = StatusLog._meta.db_table
+    old = f'{table}_unpartitioned'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE {table} RENAME TO {old}')
+    execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)')
+    execute(
+        f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    with schema_editor.connection.cursor() as cursor:
+        partitions.create_default_partition(cursor, table)
+        cursor.execute(f'SELECT MIN(created_at) FROM {old}')
+        first = cursor.fetchone()[0] or timezone.now()
+        month = timezone.now().date().replace(day=1)
+        partitions.create_partitions(
+            cursor, table,
+            first.date().replace(day=1), partitions.add_months(month, 3),)
+
+    execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    execute(f'DROP TABLE {old}')
+    execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)')
+    create_indexes(schema_editor, StatusLog)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    StatusLog = apps.get_model('custom_db_logger', 'StatusLog')
+    table = StatusLog._meta.db_table
+    old = f'{table}_partitioned'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE {table} RENAME TO {old}')
+    execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS)')
+    execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    execute(f'DROP TABLE {old}')
+    execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    create_indexes(schema_editor, StatusLog)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_db_logger', '0002_statuslog_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=['created_at'], name='statuslog_created_at_brin'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.9 on 2026-10-18 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_db_logger', '0003_partition_statuslog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='statuslog',
+            name='board',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='statuslog',
+            name='command',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='statuslog',
+            name='level',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Notset'), (10, 'Debug'), (20, 'Info'), (30, 'Warning'), (40, 'Error'), (50, 'Critical')], default=40),
+        ),
+        migrations.AlterField(
+            model_name='statuslog',
+            name='user',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['-created_at', '-id'], name='statuslog_created_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['level', '-created_at', '-id'], name='statuslog_level_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['command', '-created_at', '-id'], name='statuslog_command_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['board', '-created_at', '-id'], name='statuslog_board_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='statuslog_user_created_at'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.9 on 2026-10-18 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_db_logger', '0004_statuslog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(blank=True, default='', max_length=255)),
+                ('client_ip', models.CharField(blank=True, default='', max_length=39)),
+                ('command', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('hour', models.DateTimeField()),
+                ('level', models.PositiveSmallIntegerField(choices=[(0, 'Notset'), (10, 'Debug'), (20, 'Info'), (30, 'Warning'), (40, 'Error'), (50, 'Critical')])),
+                ('logger_name', models.CharField(max_length=255)),
+            ],
+            options={
+                'ordering': ('hour',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='statuslogrollup',
+            index=models.Index(fields=['client_ip', 'hour'], name='rollup_client_ip_hour'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslogrollup',
+            index=models.Index(fields=['command', 'hour'], name='rollup_command_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='statuslogrollup',
+            constraint=models.UniqueConstraint(fields=('hour', 'logger_name', 'command', 'level', 'board', 'client_ip'), name='unique_statuslog_rollup'),
+        ),
+    ]
@@ -1,36 +1,90 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db.models import (
-    CharField, DateTimeField, GenericIPAddressField, JSONField, Model,
-    PositiveBigIntegerField, PositiveSmallIntegerField, TextField,)
+    CharField, DateTimeField, GenericIPAddressField, Index, JSONField, Model,
+    PositiveBigIntegerField, PositiveIntegerField, PositiveSmallIntegerField,
+    TextField, UniqueConstraint,)
 
 from custom_db_logger.utils import LogLevels
 
 
 class StatusLog(Model):
     asc_time = CharField(max_length=255)
-    board = CharField(max_length=255, null=True, db_index=True)
+    board = CharField(max_length=255, null=True)
     client_ip = GenericIPAddressField(null=True, db_index=True)
-    command = CharField(max_length=255, null=True, db_index=True)
+    command = CharField(max_length=255, null=True)
     created_at = DateTimeField(auto_now_add=True, editable=False)
     filename = CharField(max_length=255)
+    fingerprint = CharField(max_length=40, blank=True, db_index=True)
     func_name = CharField(max_length=255)
+    last_seen = DateTimeField(null=True)
     level = PositiveSmallIntegerField(
-        choices=LogLevels.choices, default=LogLevels.ERROR, db_index=True)
+        choices=LogLevels.choices, default=LogLevels.ERROR)
     line_no = PositiveSmallIntegerField()
     logger_name = CharField(max_length=255, db_index=True)
     metadata = JSONField(null=True)
     module = CharField(max_length=255)
     msg = TextField()
+    occurrences = PositiveIntegerField(default=1)
     pathname = CharField(max_length=500)
     process = PositiveSmallIntegerField()
     process_name = CharField(max_length=255)
     thread = PositiveBigIntegerField()
     thread_name = CharField(max_length=255)
     trace = TextField(blank=True, null=True)
-    user = CharField(max_length=255, null=True, db_index=True)
+    user = CharField(max_length=255, null=True)
 
     def __str__(self):
         return self.msg
 
     class Meta:
+        # Partitioned by month of created_at, see custom_db_logger.partitions.
+        # Lists are paged by (created_at, id), alone or after the filters
+        # most used.
+        indexes = [
+            BrinIndex(fields=['created_at'], name='statuslog_created_at_brin'),
+            Index(
+                fields=['-created_at', '-id'],
+                name='statuslog_created_at_id',),
+            Index(
+                fields=['level', '-created_at', '-id'],
+                name='statuslog_level_created_at',),
+            Index(
+                fields=['command', '-created_at', '-id'],
+                name='statuslog_command_created_at',),
+            Index(
+                fields=['board', '-created_at', '-id'],
+                name='statuslog_board_created_at',),
+            Index(
+                fields=['user', '-created_at', '-id'],
+                name='statuslog_user_created_at',),
+        ]
         ordering = ('-created_at',)
-        verbose_name_plural = verbose_name = 'Logging'
\ No newline at end of file
+        verbose_name_plural = verbose_name = 'Logging'
+
+class StatusLogRollup(Model):
+    '''
+    Count of the logs of each hour by logger, command, level, board and
+    client IP, see custom_db_logger.rollups. Missing values are stored as
+    ''.
+    '''
+    board = CharField(max_length=255, blank=True, default='')
+    client_ip = CharField(max_length=39, blank=True, default='')
+    command = CharField(max_length=255, blank=True, default='')
+    count = PositiveBigIntegerField(default=0)
+    hour = DateTimeField()
+    level = PositiveSmallIntegerField(choices=LogLevels.choices)
+    logger_name = CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=[
+                    'hour', 'logger_name', 'command', 'level', 'board',
+                    'client_ip',],
+                name='unique_statuslog_rollup',),
+        ]
+        indexes = [
+            Index(fields=['client_ip', 'hour'], name='rollup_client_ip_hour'),
+            Index(fields=['command', 'hour'], name='rollup_command_hour'),
+        ]
+        ordering = ('hour',)
@@ -0,0 +1,133 @@
+import json
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StatusLogPagination(BasePagination):
+    '''
+    Pages of logs, newest first, that pick up from the last row of the page
+    before by its (created_at, id) instead of by offset, so every page costs
+    the same however deep it is.
+
+    No total is counted unless asked for with `count`: 'approximate' gives
+    the query planner's estimate, and 'exact' counts the rows.
+    '''
+
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor[0] == 'p'
+
+        if cursor is not None:
+            created_at, log_id = cursor[1:]
+            if self.reverse:
+                position = (
+                    Q(created_at__gt=created_at) |
+                    Q(created_at=created_at, id__gt=log_id))
+                bound = Q(created_at__gte=created_at)
+            else:
+                position = (
+                    Q(created_at__lt=created_at) |
+                    Q(created_at=created_at, id__lt=log_id))
+                bound = Q(created_at__lte=created_at)
+            # The bound on created_at alone lets the index range be used
+            queryset = queryset.filter(bound).filter(position)
+
+        ordering = ('created_at', 'id') if self.reverse else (
+            '-created_at', '-id')
+        logs = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        more = len(logs) > self.page_size
+        logs = logs[:self.page_size]
+        if self.reverse:
+            logs.reverse()
+
+        self.logs = logs
+        if not logs:
+            self.has_next = self.has_previous = False
+        elif self.reverse:
+            # Came back from the page after this one
+            self.has_next, self.has_previous = True, more
+        else:
+            self.has_next, self.has_previous = more, cursor is not None
+        return logs
+
+    def get_paginated_response(self, data):
+        pages = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            pages.append(('count', self.count))
+        return Response(OrderedDict(pages + [('results', data)]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_count(self, queryset, request):
+        count = request.query_params.get(self.count_query_param)
+        if count == 'exact':
+            return queryset.count()
+        if count == 'approximate':
+            sql, params = queryset.order_by().query.sql_with_params()
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        return None
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor('n', self.logs[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor('p', self.logs[0])
+
+    def encode_cursor(self, direction, log):
+        position = f'{direction}|{log.created_at.isoformat()}|{log.id}'
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            urlsafe_b64encode(position.encode()).decode(),)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            direction, created_at, log_id = urlsafe_b64decode(
+                encoded.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            if direction not in ('n', 'p') or created_at is None:
+                raise ValueError(encoded)
+            return direction, created_at, int(log_id)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
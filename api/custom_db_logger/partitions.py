@@ -0,0 +1,124 @@
+'''
+Monthly range partitions of the StatusLog table on `created_at`.
+
+Each month's rows are kept in their own partition, so logs past their
+retention are removed by dropping the partition rather than by deleting
+rows. Rows of a month without a partition land in the default partition,
+so inserts never fail, but partitions should be created ahead of time with
+the `partitionlogs` command. Rows of the default partition past their
+retention are deleted.
+'''
+import re
+
+from datetime import date
+
+from django.db import transaction
+
+
+def add_months(month, months):
+    '''The first day of the month `months` after that of `month`.'''
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def list_partitions(cursor, table):
+    '''Names of the monthly partitions of `table`, by month.'''
+    cursor.execute('''
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s
+    ''', [table])
+
+    partitions = {}
+    for name, in cursor.fetchall():
+        match = re.fullmatch(rf'{re.escape(table)}_p(\d{{4}})_(\d{{2}})', name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_default_partition(cursor, table):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {default_partition_name(table)} '
+        f'PARTITION OF {table} DEFAULT')
+
+
+def create_partition(cursor, table, month):
+    '''
+    Create the partition of `month` unless it exists, moving the month's
+    rows out of the default partition.
+    '''
+    name = partition_name(table, month)
+    default = default_partition_name(table)
+    bounds = [month, add_months(month, 1)]
+
+    with transaction.atomic(using=cursor.db.alias):
+        if month in list_partitions(cursor, table):
+            return False
+
+        cursor.execute(f'''
+            SELECT EXISTS (
+                SELECT 1 FROM {default}
+                WHERE created_at >= %s AND created_at < %s
+            )
+        ''', bounds)
+        stray = cursor.fetchone()[0]
+
+        # A partition overlapping rows of the default one cannot be created
+        # while it is attached
+        if stray:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        cursor.execute(
+            f'CREATE TABLE {name} PARTITION OF {table} '
+            f'FOR VALUES FROM (%s) TO (%s)', bounds,)
+        if stray:
+            cursor.execute(f'''
+                WITH moved AS (
+                    DELETE FROM {default}
+                    WHERE created_at >= %s AND created_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            ''', bounds)
+            cursor.execute(
+                f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+    return True
+
+
+def create_partitions(cursor, table, first, last):
+    '''Create the partitions of months `first` to `last`, returning how many.'''
+    created, month = 0, first
+    while month <= last:
+        created += create_partition(cursor, table, month)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions(cursor, table, before):
+    '''Drop the partitions of months before `before`, returning how many.'''
+    dropped = 0
+    for month, name in sorted(list_partitions(cursor, table).items()):
+        if month < before:
+            cursor.execute(f'DROP TABLE {name}')
+            dropped += 1
+    return dropped
+
+
+def prune_default_partition(cursor, table, before):
+    '''
+    Delete the rows of the default partition created before `before`,
+    returning how many.
+    '''
+    cursor.execute(
+        f'DELETE FROM {default_partition_name(table)} WHERE created_at < %s',
+        [before],)
+    return cursor.rowcount
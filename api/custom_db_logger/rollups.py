@@ -0,0 +1,103 @@
+'''
+Hourly counts of logs by logger, command, level, board and client IP.
+
+Logs are counted in the hour their row was created, including repeats
+counted on the row. The batched database log handler adds each batch it
+writes to the counts, so dashboards read a few rollup rows instead of
+grouping the log table. Hours are in UTC. The `rolluplogs` command
+rebuilds the counts of past hours from the log table. It fills them in
+when the handler is not batched, or after the counts were lost.
+'''
+from collections import Counter
+from datetime import timedelta, timezone
+
+from django.db import connections, router, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncHour
+
+from custom_db_logger.models import StatusLog, StatusLogRollup
+
+DIMENSIONS = ('logger_name', 'command', 'level', 'board', 'client_ip')
+
+
+def floor_hour(time):
+    return time.astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(time):
+    hour = floor_hour(time)
+    return hour if hour == time else hour + timedelta(hours=1)
+
+
+def rollup_key(log, hour):
+    '''The hour and dimensions a log, given as StatusLog fields, counts to.'''
+    return (
+        hour,
+        log['logger_name'],
+        log['command'] or '',
+        log['level'],
+        log['board'] or '',
+        log['client_ip'] or '',
+    )
+
+
+def add_rollups(counts):
+    '''
+    Add `counts`, of rollup keys, to the counts of their hours.
+    '''
+    if not counts:
+        return
+
+    table = StatusLogRollup._meta.db_table
+    columns = ('hour',) + DIMENSIONS
+    # Rows are locked in the same order by every writer, so concurrent
+    # upserts cannot deadlock
+    keys = sorted(counts)
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(keys))
+    params = [
+        param for key in keys for param in key + (counts[key],)
+    ]
+
+    connection = connections[router.db_for_write(StatusLogRollup)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {table} ({', '.join(columns)}, count)
+            VALUES {values}
+            ON CONFLICT ({', '.join(columns)})
+            DO UPDATE SET count = {table}.count + EXCLUDED.count
+        ''', params)
+
+
+def count_rows(rows):
+    '''
+    Rollup counts of logs given as the StatusLog fields, the created_at and
+    the number of occurrences of the rows they were written to.
+    '''
+    counts = Counter()
+    for log, created_at, occurrences in rows:
+        counts[rollup_key(log, floor_hour(created_at))] += occurrences
+    return counts
+
+
+def rebuild_rollups(since, until):
+    '''
+    Replace the counts of the hours from that of `since` until `until` with
+    those of the log table. Returns the number of rollup rows written.
+    '''
+    since, until = floor_hour(since), ceil_hour(until)
+    logs = StatusLog.objects.filter(
+        created_at__gte=since, created_at__lt=until,
+    ).order_by().annotate(
+        hour=TruncHour('created_at', tzinfo=timezone.utc),
+    ).values('hour', *DIMENSIONS).annotate(count=Sum('occurrences'))
+
+    counts = Counter()
+    for log in logs:
+        counts[rollup_key(log, log['hour'])] += log['count']
+
+    with transaction.atomic(using=router.db_for_write(StatusLogRollup)):
+        StatusLogRollup.objects.filter(
+            hour__gte=since, hour__lt=until).delete()
+        add_rollups(counts)
+    return len(counts)
@@ -1,22 +1,48 @@
+import gzip
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
 
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.testing import HttpCommunicator
 from django.conf import settings
 from django.core import mail
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
 from django_redis import get_redis_connection
 
 from rest_framework import status
 from rest_framework.reverse import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
-from custom_db_logger.models import StatusLog
+from custom_db_logger import partitions
+from custom_db_logger.db_log_handler import DatabaseLogHandler
+from custom_db_logger.export import ndjson_logs
+from custom_db_logger.mail_log_handler import DigestAdminEmailHandler
+from custom_db_logger.models import StatusLog, StatusLogRollup
 from custom_db_logger.serializers import StatusLogSerializer
 from custom_db_logger.utils import LogLevels
+from simplekanban_api.websocket_router import application
 from users.utils import UserCommands
+from utils import parse_request_metadata
+from utils.metrics import command_latency, phase, timed_command
 from utils.testing import (
-    create_user, create_superuser, log_msg_regex,
+    create_user, create_superuser, log_digests, log_msg_regex,
+    send_log_digests, short_lived_db_connections, synchronous_db_logs,
     test_user_1, test_superuser,)
 
 
+@log_digests()
+@synchronous_db_logs()
 class DatabaseLoggerTest(APITestCase):
     databases = '__all__'
 
@@ -62,7 +88,7 @@ class DatabaseLoggerTest(APITestCase):
         self._fail_register_missing_info()
         self._fail_update_user()
         self.assertEqual(StatusLog.objects.using('logger').count(), 2)
-        logs = StatusLog.objects.using('logger').all()
+        logs = StatusLog.objects.using('logger').order_by('-created_at', '-id')
         serialized_logs = StatusLogSerializer(logs, many=True).data
         login = self.client.post(reverse('login'), data={
             'email': test_superuser['email'],
@@ -71,7 +97,124 @@ class DatabaseLoggerTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
         response = self.client.get('/api/logs/', format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertListEqual(response.data, serialized_logs)
+        self.assertListEqual(response.data['results'], serialized_logs)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        self.assertNotIn('count', response.data)
+
+    def test_logs_are_paged_by_cursor(self):
+        for i in range(5):
+            self.logger.error(f'Log {i}')
+        logs = StatusLog.objects.using('logger')
+        # Ties on created_at are broken by id
+        logs.update(created_at=timezone.now())
+        ids = list(logs.order_by('-id').values_list('id', flat=True))
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        pages, url = [], '/api/logs/?page_size=2&count=exact'
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], 5)
+            pages.append([log['id'] for log in response.data['results']])
+            url = response.data['next']
+        self.assertListEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+
+        response = self.client.get(response.data['previous'], format='json')
+        self.assertListEqual(
+            [log['id'] for log in response.data['results']], ids[2:4])
+        response = self.client.get(response.data['previous'], format='json')
+        self.assertListEqual(
+            [log['id'] for log in response.data['results']], ids[:2])
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(
+            '/api/logs/', { 'count': 'approximate' }, format='json')
+        self.assertIsInstance(response.data['count'], int)
+        response = self.client.get(
+            '/api/logs/', { 'cursor': 'nonsense' }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+    def test_logs_are_exported_as_ndjson(self):
+        for i in range(3):
+            self.logger.error(f'Log {i}', extra={ 'command': 'update_user' })
+        self.logger.warning('Other')
+        ids = list(StatusLog.objects.using('logger').filter(
+            command='update_user').order_by('id').values_list('id', flat=True))
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.get(
+            '/api/logs/export/', { 'command': 'update_user' })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        logs = [json.loads(line) for line in lines]
+        self.assertListEqual([log['id'] for log in logs], ids)
+        self.assertRegex(logs[0]['msg'], log_msg_regex('Log 0', LogLevels.ERROR))
+
+        response = self.client.get(
+            '/api/logs/export/', { 'command': 'update_user', 'gzip': 'true' })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertListEqual(content.splitlines(), lines)
+
+    def test_export_logs_command(self):
+        self.logger.error('Error')
+        self.logger.warning('Warning')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'logs.ndjson.gz')
+            call_command(
+                'exportlogs', level=[str(LogLevels.WARNING)], output=path,
+                gzip=True, stderr=StringIO(),)
+            with gzip.open(path) as output:
+                logs = [json.loads(line) for line in output]
+        self.assertEqual(len(logs), 1)
+        self.assertRegex(
+            logs[0]['msg'], log_msg_regex('Warning', LogLevels.WARNING))
+
+    def test_command_latency(self):
+        command_latency.reset()
+        with timed_command('move_task'):
+            with phase('db'):
+                with phase('serialization'):
+                    pass
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_user_1['email'],
+            'password': test_user_1['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.get(reverse('command_latency'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.get(reverse('command_latency'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSetEqual(
+            set(response.data['move_task']), {'db', 'serialization', 'total'})
+        total = response.data['move_task']['total']
+        self.assertEqual(total['count'], 1)
+        self.assertEqual(total['buckets']['+Inf'], 1)
+
+        response = self.client.delete(reverse('command_latency'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertDictEqual(command_latency.snapshot(), {})
 
     def test_get_status_log_fail_update_user(self):
         auth, path = self._fail_update_user()
@@ -94,13 +237,102 @@ class DatabaseLoggerTest(APITestCase):
         self.assertDictEqual(log['metadata']['request_data'], dict(name='New'))
         self.assertEqual(log['metadata']['REMOTE_ADDR'], '127.0.0.1')
         self.assertEqual(log['metadata']['REQUEST_METHOD'], 'PATCH')
-        self.assertEqual(log['metadata']['HTTP_AUTHORIZATION'], auth)
+        # Credentials are never kept
+        self.assertNotIn('HTTP_AUTHORIZATION', log['metadata'])
+        self.assertNotIn(auth.split()[-1], json.dumps(log['metadata']))
         self.assertEqual(log['metadata']['PATH_INFO'], path)
+        self.assertNotIn('wsgi.input', log['metadata'])
+        self.assertNotIn('SERVER_PROTOCOL', log['metadata'])
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error updating user.')
         self.assertListEqual(mail.outbox[0].to, ['contact@simplekanban.app'])
 
+    def test_repeated_logs_are_grouped(self):
+        for i in range(3):
+            self.logger.error('Repeated', extra={ 'command': 'update_user' })
+        self.logger.error('Once', extra={ 'command': 'update_user' })
+
+        # Written as logged, repeats are rows of their own, with one
+        # fingerprint
+        logs = StatusLog.objects.using('logger')
+        self.assertEqual(logs.count(), 4)
+        repeated = logs.filter(msg__contains='Repeated')
+        self.assertEqual(
+            len(set(repeated.values_list('fingerprint', flat=True))), 1)
+        repeated = repeated.first()
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.get(
+            '/api/logs/groups/', { 'command': 'update_user' }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['latest_id'], logs.get(
+            msg__contains='Once').id)
+        self.assertEqual(response.data[1]['fingerprint'], repeated.fingerprint)
+        self.assertEqual(response.data[1]['occurrences'], 3)
+        self.assertEqual(response.data[1]['rows'], 3)
+
+    def test_logs_are_counted_in_hourly_rollups(self):
+        extra = { 'command': 'update_user', 'client_ip': '10.0.0.1' }
+        for i in range(3):
+            self.logger.error('Repeated', extra=extra)
+        self.logger.warning('Warning', extra=extra)
+
+        # Only the batched writer keeps the counts as logs are written
+        rollups = StatusLogRollup.objects.using('logger')
+        self.assertEqual(rollups.count(), 0)
+
+        # Rebuilt from the log table, by the hour the logs were created
+        hour = timezone.now().replace(
+            minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        StatusLog.objects.using('logger').update(
+            created_at=hour + timedelta(minutes=30))
+        call_command('rolluplogs', stdout=StringIO())
+        self.assertEqual(rollups.count(), 2)
+        self.assertEqual(rollups.get(level=LogLevels.ERROR).count, 3)
+        self.assertEqual(rollups.get(level=LogLevels.WARNING).hour, hour)
+
+        login = self.client.post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {login.data['token']}")
+        response = self.client.get('/api/logs/rollups/', {
+            'client_ip': '10.0.0.1',
+            'group_by': 'command,level',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            [(row['command'], row['level'], row['count'])
+                for row in response.data],
+            [('update_user', LogLevels.ERROR, 3),
+                ('update_user', LogLevels.WARNING, 1)],)
+        self.assertEqual(response.data[0]['time'], hour)
+        response = self.client.get(
+            '/api/logs/rollups/', { 'group_by': 'msg' }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_request_metadata_is_captured_on_emit(self):
+        metadata = parse_request_metadata(
+            { 'path': '/ws/boards/', 'headers': [(b'host', b'localhost')] },
+            { 'invalid_command': 'unrecognized', 'user': self.user_1 },)
+        self.logger.debug('Not emitted', extra={ 'metadata': metadata })
+        self.assertIsNone(metadata.resolved)
+        self.assertEqual(StatusLog.objects.using('logger').count(), 0)
+
+        self.logger.error('Emitted', extra={ 'metadata': metadata })
+        log = StatusLog.objects.using('logger').get()
+        self.assertDictEqual(log.metadata, {
+            'invalid_command': 'unrecognized',
+            'path': '/ws/boards/',
+        })
+
     def _fail_register_missing_info(self):
         res_fail = self.client.post(reverse('register'), data={})
         self.assertEqual(res_fail.status_code, status.HTTP_400_BAD_REQUEST)
@@ -121,4 +353,299 @@ class DatabaseLoggerTest(APITestCase):
         patch = self.client.patch(url, data={ 'name': 'New' }, format='json')
         self.assertEqual(patch.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(patch.data['detail'], 'Error updating account.')
-        return (auth, url)
\ No newline at end of file
+        return (auth, url)
+
+
+class BatchedDatabaseLogHandlerTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.handler = DatabaseLogHandler(
+            batched=True, capacity=3, batch_size=2, flush_interval=0.05,)
+        self.handler.setFormatter(logging.Formatter(
+            settings.LOGGING['formatters']['default']['format']))
+        self.logger = logging.getLogger('db_logger.batched')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        get_redis_connection('default').flushall()
+
+    def test_records_are_written_in_batches(self):
+        for i in range(3):
+            self.logger.error(f'Batched {i}', extra={ 'command': 'batched' })
+        self.assertTrue(self.handler.flush())
+
+        logs = StatusLog.objects.using('logger').order_by('id')
+        self.assertEqual(logs.count(), 3)
+        for i, log in enumerate(logs):
+            self.assertRegex(
+                log.msg, log_msg_regex(f'Batched {i}', LogLevels.ERROR))
+            self.assertEqual(log.command, 'batched')
+        self.assertEqual(self.handler.written, 3)
+
+    def test_repeated_records_are_counted_on_one_row(self):
+        self.handler.capacity, self.handler.dedup_seconds = 100, 60
+
+        def log(*client_ips):
+            for ip in client_ips:
+                self.logger.error('Repeated', extra={ 'client_ip': ip })
+            self.assertTrue(self.handler.flush())
+
+        # Records from another client are not counted on the first one's row
+        log('10.0.0.1', '10.0.0.1', '10.0.0.1', '10.0.0.2')
+        logs = StatusLog.objects.using('logger')
+        self.assertEqual(logs.count(), 2)
+        first = logs.get(client_ip='10.0.0.1')
+        self.assertEqual(first.occurrences, 3)
+        self.assertEqual(logs.get(client_ip='10.0.0.2').occurrences, 1)
+
+        # Later batches find the row from the cache
+        log('10.0.0.1')
+        first.refresh_from_db()
+        self.assertEqual(logs.count(), 2)
+        self.assertEqual(first.occurrences, 4)
+        self.assertGreaterEqual(first.last_seen, first.created_at)
+
+    def test_batches_are_counted_as_rebuilt_from_the_log_table(self):
+        self.handler.capacity, self.handler.dedup_seconds = 100, 60
+
+        def log(*client_ips):
+            for ip in client_ips:
+                self.logger.error('Counted', extra={ 'client_ip': ip })
+            self.assertTrue(self.handler.flush())
+
+        log('10.0.0.1', '10.0.0.1', '10.0.0.2')
+        log('10.0.0.1')
+
+        rollups = StatusLogRollup.objects.using('logger').order_by(
+            'client_ip')
+        live = list(rollups.values_list('hour', 'client_ip', 'count'))
+        self.assertListEqual(
+            [(ip, count) for hour, ip, count in live],
+            [('10.0.0.1', 3), ('10.0.0.2', 1)],)
+
+        now = timezone.now()
+        call_command(
+            'rolluplogs', since=now.isoformat(),
+            until=(now + timedelta(hours=1)).isoformat(), stdout=StringIO(),)
+        self.assertListEqual(
+            list(rollups.values_list('hour', 'client_ip', 'count')), live)
+
+    def test_records_over_capacity_are_dropped_and_counted(self):
+        # Writes wait on the lock, so the queue fills up
+        with transaction.atomic(using='logger'):
+            with connections['logger'].cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {StatusLog._meta.db_table} IN EXCLUSIVE MODE')
+            for i in range(10):
+                self.logger.error(f'Batched {i}')
+        self.assertTrue(self.handler.flush())
+
+        # At most two records taken by the writer and three queued
+        logs = StatusLog.objects.using('logger')
+        written = logs.filter(level=LogLevels.ERROR).count()
+        warning = logs.get(level=LogLevels.WARNING)
+        self.assertLessEqual(written, 5)
+        self.assertEqual(written + warning.metadata['dropped'], 10)
+        self.assertIn('Dropped', warning.msg)
+
+
+@short_lived_db_connections()
+@synchronous_db_logs()
+class LogExportTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        create_superuser()
+        login = APIClient().post(reverse('login'), data={
+            'email': test_superuser['email'],
+            'password': test_superuser['password'],
+        })
+        self.token = login.data['token']
+
+    def tearDown(self):
+        get_redis_connection('default').flushall()
+
+    def test_logs_are_exported_from_their_own_threads(self):
+        logger = logging.getLogger('db_logger')
+        for i in range(3):
+            logger.error(f'Log {i}', extra={ 'command': 'update_user' })
+
+        # Rows are read in a transaction, on one of the export threads
+        streamed = []
+        def export(queryset):
+            for chunk in ndjson_logs(queryset, buffer_size=1):
+                streamed.append((
+                    threading.current_thread().name,
+                    connections['logger'].in_atomic_block,))
+                yield chunk
+
+        # HttpCommunicator.get_response expects a body in every message
+        async def get(path):
+            communicator = HttpCommunicator(
+                application, 'GET', path, headers=[
+                    (b'host', b'localhost'),
+                    (b'authorization', f'Token {self.token}'.encode()),
+                ],)
+            await communicator.send_input({ 'type': 'http.request' })
+            start = await communicator.receive_output(5)
+            body = b''
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    return start['status'], body
+
+        with mock.patch('custom_db_logger.api.ndjson_logs', export):
+            status_code, body = async_to_sync(get)(
+                '/api/logs/export/?command=update_user')
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(body.splitlines()), 3)
+        self.assertEqual(len(streamed), 3)
+        for thread_name, in_atomic_block in streamed:
+            self.assertTrue(thread_name.startswith('log-export'))
+            self.assertTrue(in_atomic_block)
+
+
+class DigestAdminEmailHandlerTest(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('db_logger.digest')
+        self.logger.propagate = False
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        get_redis_connection('default').flushall()
+
+    def _add_handler(self, **kwargs):
+        self.handler = DigestAdminEmailHandler(**kwargs)
+        self.handler.setFormatter(logging.Formatter(
+            settings.LOGGING['formatters']['default']['format']))
+        self.logger.addHandler(self.handler)
+
+    def test_records_are_deduplicated_into_one_digest(self):
+        self._add_handler(interval=60)
+        for i in range(3):
+            self.logger.error('Client was throttled.', extra={
+                'client_ip': '10.0.0.1',
+                'command': 'create_msg',
+            })
+        self.logger.error('Missing command')
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.handler.flush()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject,
+            f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Client was throttled. '
+            f'(4 records)')
+        self.assertListEqual(mail.outbox[0].to, ['contact@simplekanban.app'])
+        body = mail.outbox[0].body
+        self.assertIn('3 x ERROR: Client was throttled.', body)
+        self.assertIn('Client IPs: 10.0.0.1 (3)', body)
+        self.assertIn('Commands: create_msg (3)', body)
+        self.assertIn('1 x ERROR: Missing command', body)
+
+        # Nothing left to send
+        self.handler.flush()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_digests_are_sent_by_background_worker(self):
+        self._add_handler(interval=0.05)
+        self.logger.error('Missing command')
+        for i in range(40):
+            if mail.outbox:
+                break
+            time.sleep(0.05)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject,
+            f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Missing command')
+
+    def test_emails_are_limited_per_hour(self):
+        self._add_handler(interval=0, max_per_hour=1, capacity=1)
+        self.logger.error('First')
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Held for the next digest once over the limit, past capacity counted
+        self.logger.error('Second')
+        self.logger.error('Third')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(self.handler.dropped, 1)
+
+        get_redis_connection('default').flushall()
+        self.handler.flush()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[1].subject,
+            f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Second (2 records)')
+        self.assertIn('1 more record(s) were not kept', mail.outbox[1].body)
+
+
+@synchronous_db_logs()
+class StatusLogPartitionTest(TestCase):
+    databases = '__all__'
+
+    def tearDown(self):
+        get_redis_connection('default').flushall()
+
+    def test_partitions_are_created_and_dropped(self):
+        table = StatusLog._meta.db_table
+        month = timezone.now().date().replace(day=1)
+        cursor = connections['logger'].cursor()
+
+        call_command('partitionlogs', ahead=5, retention=12, stdout=StringIO())
+        self.assertListEqual(
+            sorted(partitions.list_partitions(cursor, table))[-6:],
+            [partitions.add_months(month, i) for i in range(6)],)
+
+        # A month without a partition goes to the default one, and moves to
+        # the month's partition once created
+        logging.getLogger('db_logger').error('Recent')
+        logging.getLogger('db_logger').error('Expired')
+        expired = partitions.add_months(month, -13)
+        StatusLog.objects.using('logger').filter(
+            msg__contains='Expired',
+        ).update(created_at=timezone.make_aware(
+            datetime(expired.year, expired.month, 2)))
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {partitions.default_partition_name(table)}')
+        self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.assertTrue(partitions.create_partition(cursor, table, expired))
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {partitions.default_partition_name(table)}')
+        self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(StatusLog.objects.using('logger').count(), 2)
+
+        # Dropped with its partition once past the retention period
+        out = StringIO()
+        call_command('partitionlogs', ahead=5, retention=12, stdout=out)
+        self.assertIn('Created 0 and dropped 1 log partition(s)', out.getvalue())
+        self.assertNotIn(expired, partitions.list_partitions(cursor, table))
+        logs = StatusLog.objects.using('logger')
+        self.assertEqual(logs.count(), 1)
+        self.assertRegex(logs.get().msg, log_msg_regex('Recent', LogLevels.ERROR))
+
+    def test_expired_rows_of_the_default_partition_are_deleted(self):
+        table = StatusLog._meta.db_table
+        month = timezone.now().date().replace(day=1)
+        cursor = connections['logger'].cursor()
+        logs = StatusLog.objects.using('logger')
+
+        # Months without partitions, one expired and one still kept
+        for msg, months in [('Expired', -13), ('Kept', -12)]:
+            logging.getLogger('db_logger').error(msg)
+            created = partitions.add_months(month, months)
+            logs.filter(msg__contains=msg).update(created_at=timezone.make_aware(
+                datetime(created.year, created.month, 2)))
+
+        out = StringIO()
+        call_command('partitionlogs', ahead=0, retention=12, stdout=out)
+        self.assertIn(
+            'deleted 1 expired row(s) of the default one', out.getvalue())
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {partitions.default_partition_name(table)}')
+        self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertRegex(logs.get().msg, log_msg_regex('Kept', LogLevels.ERROR))
+
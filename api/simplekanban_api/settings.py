@@ -101,6 +101,10 @@ TEMPLATES = [
 WSGI_APPLICATION = 'simplekanban_api.wsgi.application'
 ASGI_APPLICATION = 'simplekanban_api.websocket_router.application'
 
+# Threads running board commands' database work (0 runs it on the single
+# thread Channels uses for thread-sensitive calls)
+BOARD_DB_WORKERS = config('BOARD_DB_WORKERS', default=8, cast=int)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -109,6 +113,11 @@ DATABASES = {
         'PASSWORD': secrets.DB_DEFAULT_PASSWORD,
         'HOST': secrets.DB_DEFAULT_HOST,
         'PORT': secrets.DB_DEFAULT_PORT,
+        # Each board database thread keeps its own connection, closed before
+        # and after each command only once older than this, so by default
+        # it is kept rather than opened again for every command
+        'CONN_MAX_AGE': config(
+            'DB_CONN_MAX_AGE', default=60 if BOARD_DB_WORKERS else 0, cast=int,),
     },
     'logger': {
         'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -140,12 +149,27 @@ LOGGING = {
             'class': 'custom_db_logger.db_log_handler.DatabaseLogHandler',
             'formatter': 'default',
             'level': 'INFO',
+            # Write records from a background thread, in batches
+            'batched': config('DB_LOG_BATCHED', default=True, cast=bool),
+            # Count repeats of a record within this many seconds on one row
+            'dedup_seconds': config(
+                'DB_LOG_DEDUP_SECONDS', default=60, cast=int),
         },
         'mail_admins': {
             'class': 'django.utils.log.AdminEmailHandler',
             'formatter': 'default',
             'level': 'INFO',
         },
+        'mail_digest': {
+            'class': 'custom_db_logger.mail_log_handler.DigestAdminEmailHandler',
+            'formatter': 'default',
+            'level': 'INFO',
+            # Email the admins one digest of the records this often
+            'interval': config('LOG_DIGEST_SECONDS', default=300, cast=int),
+            # Across processes, 0 for no limit
+            'max_per_hour': config(
+                'LOG_DIGEST_MAX_PER_HOUR', default=12, cast=int),
+        },
     },
     'loggers': {
         '': {
@@ -158,7 +182,7 @@ LOGGING = {
             'propagate': True,
         },
         'boards': {
-            'handlers': ['database', 'mail_admins'],
+            'handlers': ['database', 'mail_digest'],
             'level': 'ERROR',
             'propagate': True,
         },
@@ -168,7 +192,7 @@ LOGGING = {
             'propagate': False,
         },
         'django.request': {
-            'handlers': ['database', 'mail_admins'],
+            'handlers': ['database', 'mail_digest'],
             'level': 'ERROR',
             'propagate': True,
         },
@@ -177,12 +201,12 @@ LOGGING = {
             'propagate': True,
         },
         'throttling': {
-            'handlers': ['database', 'mail_admins'],
+            'handlers': ['database', 'mail_digest'],
             'level': 'ERROR',
             'propagate': True,
         },
         'users': {
-            'handlers': ['database', 'mail_admins'],
+            'handlers': ['database', 'mail_digest'],
             'level': 'ERROR',
             'propagate': True,
         },
@@ -210,10 +234,21 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Apply each board's websocket commands through a per-process, per-board queue
+BOARD_ACTORS = config('BOARD_ACTORS', default=False, cast=bool)
+# Threads sending the emails of websocket commands, such as invitations
+MAIL_WORKERS = config('MAIL_WORKERS', default=4, cast=int)
+# Threads streaming log exports, kept off the single thread Channels handles
+# every other HTTP request on
+LOG_EXPORT_WORKERS = config('LOG_EXPORT_WORKERS', default=2, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': ('knox.auth.TokenAuthentication',),
     'DEFAULT_PARSER_CLASSES': ('rest_framework.parsers.JSONParser',),
     'DEFAULT_RENDERER_CLASSES': ('rest_framework.renderers.JSONRenderer',),
+    # Rates prefixed with 'gcra:', as in 'gcra:120/m', keep one timestamp
+    # per client instead of one per request, allowing the same bursts but
+    # spacing requests after one
     'DEFAULT_THROTTLE_RATES': {
         'create_board': ['50/m'],
         'create_msg': ['60/m'],
@@ -228,6 +263,18 @@ REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
 
+# Share of a throttle rate's limit each process may reserve from Redis at
+# once and allow locally for up to THROTTLE_LEASE_SECONDS (0 checks every
+# request in Redis). See utils.throttling.LocalLeases for the accuracy
+# bounds.
+THROTTLE_LEASE_FRACTION = config(
+    'THROTTLE_LEASE_FRACTION', default=0.1, cast=float)
+THROTTLE_LEASE_SECONDS = config(
+    'THROTTLE_LEASE_SECONDS', default=1.0, cast=float)
+
+# Months of logs kept by the partitionlogs command (0 keeps them all)
+LOG_RETENTION_MONTHS = config('LOG_RETENTION_MONTHS', default=12, cast=int)
+
 REST_KNOX = {
   'AUTO_REFRESH': True,
   'MIN_REFRESH_INTERVAL': 120,
@@ -1,11 +1,18 @@
+from channels.http import AsgiHandler
 from channels.routing import ProtocolTypeRouter, URLRouter
+from django.urls import re_path
 
 from boards.channels.auth import AuthMiddlewareStack
 from boards.channels.endpoints import websocket_urlpatterns
+from custom_db_logger.consumers import StatusLogExportConsumer
 
 
 application = ProtocolTypeRouter({
+    'http': URLRouter([
+        re_path(r'^api/logs/export/$', StatusLogExportConsumer.as_asgi()),
+        re_path(r'', AsgiHandler()),
+    ]),
     'websocket': AuthMiddlewareStack(
         URLRouter(websocket_urlpatterns),
     ),
-})
\ No newline at end of file
+})
@@ -1,112 +1,108 @@
 from django.db import transaction
-from django.db.models import F, Manager
-from django.utils.timezone import now
-from django.utils.translation import gettext_lazy as _
+from django.db.models import Case, Manager, Value, When
 
 from columns.models import Column
+from utils.ranks import RANK_HARD_LENGTH, rank_at, rank_between, spread_ranks
 
 
 class TaskManager(Manager):
-    def delete(self, instance):
-        '''Delete a task and reposition other tasks if necessary.'''
-        greater_tasks = self.get_queryset().select_for_update().filter(
-            board=instance.board,
-            column=instance.column,
-            task_index__gt=instance.task_index,)
-
-        with transaction.atomic():
-            if greater_tasks:
-                greater_tasks.update(
-                    task_index=F('task_index') - 1,
-                    updated_at=now(),)
+    def ranks(self, column_id):
+        '''Ranks of a column's tasks, in order.'''
+        return self.get_queryset().filter(
+            column_id=column_id,
+        ).order_by('task_rank').values_list('task_rank', flat=True)
+
+    def lock_columns(self, *column_ids, board=None):
+        '''
+        Lock columns' rows for the rest of the transaction, so that tasks
+        are ranked and positioned on each one at a time. Rows are locked in
+        id order so that concurrent callers cannot deadlock.
+        '''
+        column_ids = set(column_ids)
+        columns = Column.objects.select_for_update().filter(
+            column_id__in=column_ids,
+        ).order_by('column_id')
+        if board is not None:
+            columns = columns.filter(board=board)
+        if len(columns.values_list('column_id', flat=True)) != len(column_ids):
+            raise Column.DoesNotExist('Column matching query does not exist.')
+
+    def lock_task(self, task_id, *column_ids, board=None):
+        '''
+        Fetch a task with its column, and any other columns given, locked for
+        the rest of the transaction. A task moved away before the lock is
+        taken is fetched again, so the column locked is always its own.
+        '''
+        while True:
+            task = self.get_queryset().get(task_id=task_id)
+            self.lock_columns(task.column_id, *column_ids, board=board)
+            locked = self.get_queryset().get(task_id=task_id)
+            if locked.column_id == task.column_id:
+                return locked
+
+    def next_rank(self, column_id):
+        '''Rank for a task appended to a column. Lock the column first.'''
+        return rank_between(self.ranks(column_id).last(), None)
+
+    def number(self, tasks):
+        '''
+        Set the index of each task from a list ordered by rank within each
+        column, saving a count query per task.
+        '''
+        positions = {}
+        for task in tasks:
+            task.task_index = positions.get(task.column_id, 0)
+            positions[task.column_id] = task.task_index + 1
+        return tasks
 
-            with transaction.atomic():
-                return instance.delete()
+    def delete(self, instance):
+        '''
+        Delete a task. Ranks of the other tasks need no change, so this
+        only deletes the task's row.
+        '''
+        return instance.delete()
 
     def move(self, instance, new_column_id, new_index):
+        '''
+        Move a task to a new index on its column or on another column of the
+        board. Only the task's row is written.
+        '''
         new_column_id = int(new_column_id)
         new_index = int(new_index)
 
-        if new_column_id == instance.column:
-            '''
-            Move a task to a new index on the column and
-            reposition other tasks if necessary.
-            '''
-            tasks = self.get_queryset().select_for_update().filter(
-                board=instance.board,
-                column=instance.column,)
-
-            with transaction.atomic():
-                destination_task_count = tasks.count()
-                if new_index >= destination_task_count:
-                    new_index = destination_task_count - 1
-                elif new_index < 0:
-                    new_index = 0
-
-                with transaction.atomic():
-                    if new_index < instance.task_index:
-                        tasks.filter(
-                            task_index__lt=instance.task_index,
-                            task_index__gte=new_index,
-                        ).exclude(
-                            task_id=instance.task_id,
-                        ).update(
-                            task_index=F('task_index') + 1,
-                            updated_at=now(),
-                        )
-                    elif new_index > instance.task_index:
-                        tasks.filter(
-                            task_index__lte=new_index,
-                            task_index__gt=instance.task_index,
-                        ).exclude(
-                            task_id=instance.task_id,
-                        ).update(
-                            task_index=F('task_index') - 1,
-                            updated_at=now(),
-                        )
-
-                instance.task_index = new_index
-                instance.save(update_fields=['task_index', 'updated_at'])
-                return instance
-        else:
-            '''
-            Move a task to a new index on a new column and
-            reposition sister tasks on old column and new column.
-            '''
-            source_greater_tasks = self.get_queryset().select_for_update().filter(
-                board=instance.board,
-                column=instance.column,
-                task_index__gt=instance.task_index,
-            ).exclude(task_id=instance.task_id)
-
-            destination_tasks = self.get_queryset().select_for_update().filter(
-                board=instance.board,
-                column=new_column_id,)
-
-            destination_task_count = destination_tasks.count()
-
-            destination_greater_tasks = destination_tasks.filter(
-                task_index__gte=new_index,)
-
-            with transaction.atomic():
-                if source_greater_tasks:
-                    with transaction.atomic():
-                        source_greater_tasks.update(
-                            task_index=F('task_index') - 1,
-                            updated_at=now(),)
-
-                if destination_greater_tasks:
-                    with transaction.atomic():
-                        destination_greater_tasks.update(
-                            task_index=F('task_index') + 1,
-                            updated_at=now(),)
-
-                if new_index > destination_task_count:
-                    new_index = destination_task_count
-                elif new_index < 0:
-                    new_index = 0
-
-                instance.column = Column.objects.get(column_id=new_column_id)
-                instance.task_index = new_index
-                instance.save(update_fields=['column', 'task_index', 'updated_at'])
-                return instance
+        with transaction.atomic():
+            self.lock_columns(
+                instance.column_id, new_column_id, board=instance.board_id,)
+
+            instance.task_rank = rank_at(
+                self.ranks(new_column_id).exclude(task_id=instance.task_id),
+                new_index,)
+            instance.column_id = new_column_id
+            instance.task_index = None
+            instance.save(update_fields=['column', 'task_rank', 'updated_at'])
+
+            if len(instance.task_rank) > RANK_HARD_LENGTH:
+                self.rebalance(new_column_id)
+                instance.refresh_from_db(fields=['task_rank'])
+            return instance
+
+    def rebalance(self, column_id):
+        '''
+        Give a column's tasks fresh, evenly spread ranks in their current
+        order, in a single statement. Task positions are unchanged.
+        '''
+        with transaction.atomic():
+            self.lock_columns(column_id)
+            task_ids = list(self.get_queryset().filter(
+                column_id=column_id,
+            ).order_by('task_rank', 'task_id').values_list('task_id', flat=True))
+
+            if task_ids:
+                self.get_queryset().filter(task_id__in=task_ids).update(
+                    task_rank=Case(*[
+                        When(task_id=task_id, then=Value(rank))
+                        for task_id, rank in zip(
+                            task_ids, spread_ranks(len(task_ids)))
+                    ]),
+                )
+            return len(task_ids)
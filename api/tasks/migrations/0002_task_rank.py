@@ -0,0 +1,61 @@
+from django.db import migrations, models
+
+from utils.ranks import spread_ranks
+
+
+def rank_tasks(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    column_ids = Task.objects.values_list('column_id', flat=True).distinct()
+
+    for column_id in column_ids:
+        tasks = list(Task.objects.filter(
+            column_id=column_id).order_by('task_index', 'task_id'))
+        for task, rank in zip(tasks, spread_ranks(len(tasks))):
+            task.task_rank = rank
+        Task.objects.bulk_update(tasks, ['task_rank'])
+
+
+def index_tasks(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    column_ids = Task.objects.values_list('column_id', flat=True).distinct()
+
+    for column_id in column_ids:
+        tasks = list(Task.objects.filter(
+            column_id=column_id).order_by('task_rank', 'task_id'))
+        for index, task in enumerate(tasks):
+            task.task_index = index
+        Task.objects.bulk_update(tasks, ['task_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='task_rank',
+            field=models.CharField(db_collation='C', default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='task_index',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(rank_tasks, index_tasks),
+        migrations.RemoveField(
+            model_name='task',
+            name='task_index',
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['board', 'column', 'task_rank']},
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['column', 'task_rank'], name='tasks_task_column__55af9c_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+from utils.ranks import spread_ranks
+
+
+def rerank_duplicates(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    column_ids = Task.objects.values('column_id', 'task_rank').annotate(
+        count=Count('task_id'),
+    ).filter(count__gt=1).values_list('column_id', flat=True).distinct()
+
+    for column_id in column_ids:
+        tasks = list(Task.objects.filter(
+            column_id=column_id).order_by('task_rank', 'task_id'))
+        for task, rank in zip(tasks, spread_ranks(len(tasks))):
+            task.task_rank = rank
+        Task.objects.bulk_update(tasks, ['task_rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(rerank_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(deferrable=models.Deferrable['IMMEDIATE'], fields=('column', 'task_rank'), name='unique_task_rank'),
+        ),
+    ]
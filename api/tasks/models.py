@@ -1,11 +1,13 @@
+from django.db import transaction
 from django.db.models import (
-    AutoField, BooleanField, CharField, PositiveSmallIntegerField,
-    ForeignKey, CASCADE, Index, UniqueConstraint,)
+    AutoField, BooleanField, CharField, Deferrable, ForeignKey, CASCADE,
+    Index, UniqueConstraint,)
 
 from boards.models import Board
 from columns.models import Column
 from tasks.managers import TaskManager
 from utils.models import CustomBaseMixin
+from utils.ranks import RANK_COLLATION, RANK_MAX_LENGTH
 
 
 class Task(CustomBaseMixin):
@@ -17,13 +19,28 @@ class Task(CustomBaseMixin):
     column = ForeignKey(Column, on_delete=CASCADE, related_name='tasks')
     is_archived = BooleanField(default=False)
     task_id = AutoField(primary_key=True, editable=False)
-    task_index = PositiveSmallIntegerField()
+    task_rank = CharField(
+        max_length=RANK_MAX_LENGTH,
+        db_collation=RANK_COLLATION,
+        editable=False,)
     text = CharField(max_length=255)
 
     objects = TaskManager()
 
+    # Position in the column, derived from rank order
+    _task_index = None
+
     class Meta:
-        ordering = ['board', 'column', 'task_index']
+        ordering = ['board', 'column', 'task_rank']
+        constraints = [
+            # No two tasks at the same position in a column. Checked at the
+            # end of each statement, so a rebalance can swap ranks
+            UniqueConstraint(
+                fields=['column', 'task_rank'],
+                deferrable=Deferrable.IMMEDIATE,
+                name='unique_task_rank',),
+        ]
+        indexes = [Index(fields=['column', 'task_rank'])]
 
     def __str__(self):
         return (
@@ -31,7 +48,26 @@ class Task(CustomBaseMixin):
             f'"{self.text}"'
         )
 
+    @property
+    def task_index(self):
+        if self._task_index is None:
+            self._task_index = Task.objects.filter(
+                column_id=self.column_id,
+                task_rank__lt=self.task_rank,
+            ).count()
+        return self._task_index
+
+    @task_index.setter
+    def task_index(self, value):
+        self._task_index = value
+
     def save(self, *args, **kwargs):
         if not self.task_id:
-            self.task_index = self.column.tasks.count()
-        super(Task, self).save(*args, **kwargs)
\ No newline at end of file
+            # New tasks are appended to their column
+            with transaction.atomic():
+                Task.objects.lock_columns(self.column_id)
+                self.task_rank = Task.objects.next_rank(self.column_id)
+                self.task_index = None
+                super(Task, self).save(*args, **kwargs)
+        else:
+            super(Task, self).save(*args, **kwargs)
\ No newline at end of file
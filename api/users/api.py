@@ -10,8 +10,9 @@ from rest_framework.generics import RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from boards.cache import BoardSnapshotCache
 from boards.channels.utils import ChannelCodes
-from boards.serializers import BoardSerializer
+from boards.serializers import BoardMembershipSerializer
 from boards.utils import BoardRoles
 from users.serializers import UserSerializer, UserDeactivateSerializer
 from users.utils import UserCommands
@@ -144,6 +145,7 @@ class UserAPI(RetrieveUpdateDestroyAPIView):
         instance = serializer.save()
         data = self.request.data.keys()
         if 'email' in data or 'name' in data:
+            BoardSnapshotCache.bump_member_boards(instance)
             memberships = instance.memberships.all()
             for membership in memberships.iterator():
                 board = membership.board
@@ -155,6 +157,7 @@ class UserAPI(RetrieveUpdateDestroyAPIView):
         group_name = board.group_name
         num, obj = board.delete()
         if num >= 1 and obj.get('boards.Board', 0) == 1:
+            BoardSnapshotCache.bump(board.board_slug)
             channel_layer = get_channel_layer()
             async_to_sync(channel_layer.group_send)(group_name, {
                 'type': 'send.update',
@@ -165,35 +168,35 @@ class UserAPI(RetrieveUpdateDestroyAPIView):
 
     def _alert_group_member_deleted(self, membership):
         board = membership.board
+        user_slug = membership.user.user_slug
         deleted = membership.delete()
         if deleted == (1, { 'boards.BoardMembership': 1 }):
-            serialized_board = BoardSerializer(
-                board,
-                context=dict(request=self.request),
-            ).data
-            memberships = serialized_board['memberships']
-
+            BoardSnapshotCache.bump(board.board_slug)
             channel_layer = get_channel_layer()
             group_name = board.group_name
+            async_to_sync(channel_layer.group_send)(group_name, {
+                'type': 'member.role',
+                'user_slug': user_slug,
+                'role': None,
+            })
             async_to_sync(channel_layer.group_send)(group_name, {
                 'type': 'send.update',
-                'code': ChannelCodes.MEMBERS_SAVED,
-                'data': memberships,
+                'code': ChannelCodes.MEMBER_REMOVED,
+                'data': { 'user_slug': user_slug },
                 'user': self.request.user.user_slug,
             })
 
     def _alert_group_member_updated(self, membership):
-        serialized_board = BoardSerializer(
-            membership.board,
+        serialized_membership = BoardMembershipSerializer(
+            membership,
             context=dict(request=self.request),
         ).data
-        memberships = serialized_board['memberships']
 
         channel_layer = get_channel_layer()
         group_name = membership.board.group_name
         async_to_sync(channel_layer.group_send)(group_name, {
             'type': 'send.update',
-            'code': ChannelCodes.MEMBERS_SAVED,
-            'data': memberships,
+            'code': ChannelCodes.MEMBER_UPDATED,
+            'data': serialized_membership,
             'user': self.request.user.user_slug,
         })
\ No newline at end of file
@@ -10,9 +10,13 @@ from rest_framework.test import APITestCase
 from custom_db_logger.models import StatusLog
 from custom_db_logger.utils import LogLevels
 from users.utils import UserCommands
-from utils.testing import test_user_1, test_user_2, create_user, log_msg_regex
+from utils.testing import (
+    test_user_1, test_user_2, create_user, log_digests, log_msg_regex,
+    send_log_digests, synchronous_db_logs,)
 
 
+@log_digests()
+@synchronous_db_logs()
 class UserAccountTest(APITestCase):
     databases = '__all__'
 
@@ -37,6 +41,7 @@ class UserAccountTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('Error updating user.', LogLevels.ERROR))
         self.assertEqual(log.command, UserCommands.UPDATE)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error updating user.')
@@ -151,6 +156,7 @@ class UserAccountTest(APITestCase):
         log_1 = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log_1.msg, log_msg_regex('Short password.', LogLevels.ERROR))
         self.assertEqual(log_1.command, UserCommands.UPDATE)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Short password.')
@@ -172,6 +178,7 @@ class UserAccountTest(APITestCase):
         log_2 = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log_2.msg, log_msg_regex('Error changing user password.', LogLevels.ERROR))
         self.assertEqual(log_2.command, UserCommands.UPDATE)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 2)
         self.assertEqual(mail.outbox[1].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error changing user password.')
@@ -192,6 +199,7 @@ class UserAccountTest(APITestCase):
         log_3 = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log_3.msg, log_msg_regex('Error changing user password.', LogLevels.ERROR))
         self.assertEqual(log_3.command, UserCommands.UPDATE)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 3)
         self.assertEqual(mail.outbox[2].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: Error changing user password.')
@@ -273,6 +281,7 @@ class UserAccountTest(APITestCase):
         log = StatusLog.objects.using('logger').latest('created_at')
         self.assertRegex(log.msg, log_msg_regex('User denied access.', LogLevels.ERROR))
         self.assertEqual(log.command, UserCommands.UPDATE)
+        send_log_digests()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
             f'{settings.EMAIL_SUBJECT_PREFIX}ERROR: User denied access.')
@@ -1,5 +1,3 @@
-import json
-
 from itertools import chain
 
 from django.http import HttpRequest
@@ -18,38 +16,92 @@ COMMANDS = [
 COMMAND_VALUES = [value for value, label in COMMANDS]
 
 
+JSON_SCALARS = (str, int, float, bool, type(None))
+
+# Fields of a request's META, and of a websocket's scope, kept in logs
+META_FIELDS = (
+    'CLIENT_IP', 'CLIENT_IP_IS_ROUTABLE', 'CONTENT_LENGTH', 'CONTENT_TYPE',
+    'HTTP_HOST', 'HTTP_ORIGIN', 'HTTP_REFERER', 'HTTP_USER_AGENT',
+    'HTTP_X_FORWARDED_FOR', 'PATH_INFO', 'QUERY_STRING', 'REMOTE_ADDR',
+    'REQUEST_METHOD', 'SERVER_NAME', 'SERVER_PORT',
+)
+SCOPE_FIELDS = (
+    'client', 'client_ip', 'http_version', 'path', 'scheme', 'server',
+    'subprotocols', 'type', 'url_route',
+)
+# Request data never kept in logs
+SECRET_FIELDS = ('password', 'password_2', 'current_password')
+
+
 def is_jsonable(obj):
-    try:
-        json.dumps(obj)
+    '''Whether `json.dumps` would accept `obj`, checked by type.'''
+    if isinstance(obj, JSON_SCALARS):
         return True
-    except (TypeError, OverflowError):
-        return False
+    if isinstance(obj, (list, tuple)):
+        return all(is_jsonable(item) for item in obj)
+    if isinstance(obj, dict):
+        return all(
+            isinstance(key, JSON_SCALARS) and is_jsonable(value)
+            for key, value in obj.items()
+        )
+    return False
+
+
+class RequestMetadata(object):
+    '''
+    Metadata of a log record, captured from a request or websocket scope
+    only when a handler asks for it with `resolve`. Only whitelisted fields
+    are kept.
+    '''
+
+    __slots__ = ('request', 'metadata', 'resolved')
+
+    def __init__(self, request, metadata):
+        self.request = request
+        self.metadata = metadata
+        self.resolved = None
+
+    def resolve(self):
+        if self.resolved is None:
+            self.resolved = self.capture()
+            self.request = self.metadata = None
+        return self.resolved
+
+    def capture(self):
+        request = self.request
+        metadata = {}
+        if isinstance(self.metadata, dict):
+            metadata = {
+                key: value for key, value in self.metadata.items()
+                if is_jsonable(value)
+            }
 
+        if isinstance(request, (Request, HttpRequest)):
+            if hasattr(request, 'data') and isinstance(request.data, dict):
+                metadata['request_data'] = {
+                    key: value for key, value in request.data.items()
+                    if key not in SECRET_FIELDS and is_jsonable(value)
+                }
+            if hasattr(request, 'META') and isinstance(request.META, dict):
+                self.capture_fields(metadata, request.META, META_FIELDS)
+        elif isinstance(request, dict):
+            self.capture_fields(metadata, request, SCOPE_FIELDS)
+        return metadata
+
+    def capture_fields(self, metadata, source, fields):
+        for field in fields:
+            value = source.get(field)
+            if value is not None and is_jsonable(value):
+                metadata[field] = value
 
-def parse_request_metadata(request, metadata={}):
-    if metadata != {} and isinstance(metadata, dict):
-        metadata = {
-            key: value for key, value in metadata.items() if is_jsonable(value)
-        }
-    else:
-        metadata = {}
 
-    if isinstance(request, (Request, HttpRequest)):
-        if hasattr(request, 'data') and isinstance(request.data, dict):
-            metadata['request_data'] = {
-                key: value for key, value in request.data.items() \
-                if key not in ['password', 'password_2', 'current_password'] \
-                and is_jsonable(value)
-            }
-        if hasattr(request, 'META') and isinstance(request.META, dict):
-            for key, value in request.META.items():
-                if is_jsonable(value):
-                    metadata[key] = value
-    elif isinstance(request, dict):
-        for key, value in request.items():
-            if is_jsonable(value):
-                metadata[key] = value
-    return metadata
+def parse_request_metadata(request, metadata={}):
+    '''
+    Metadata of `request`, an HTTP request or websocket scope, merged with
+    `metadata`, for the `extra` of a log record. Nothing is captured until a
+    handler resolves it.
+    '''
+    return RequestMetadata(request, metadata)
 
 
 def client_ip_url_param_regex():
@@ -68,7 +120,7 @@ error_messages_name = dict(invalid=_('Please enter a valid name.'))
 
 __all__ = [
     'COMMANDS', 'COMMAND_VALUES',
-    'is_jsonable', 'parse_request_metadata',
+    'is_jsonable', 'parse_request_metadata', 'RequestMetadata',
     'email_regex', 'name_regex', 'client_ip_url_param_regex',
     'error_messages_email', 'error_messages_name',
 ]
\ No newline at end of file
@@ -0,0 +1,113 @@
+import threading
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+
+# Upper bounds of the histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_timings = ContextVar('command_timings', default=None)
+
+
+class LatencyHistogram(object):
+    '''
+    In-process latency histograms of each command, broken down by phase.
+    Each process keeps its own, and they start empty on restart.
+    '''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.commands = {}
+
+    def record(self, command, phase, seconds):
+        ms = seconds * 1000
+        with self.lock:
+            phases = self.commands.setdefault(command, {})
+            stats = phases.setdefault(phase, {
+                'count': 0,
+                'sum_ms': 0.0,
+                'max_ms': 0.0,
+                'counts': [0] * (len(self.buckets) + 1),
+            })
+            stats['count'] += 1
+            stats['sum_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['counts'][bisect_left(self.buckets, ms)] += 1
+
+    def snapshot(self):
+        '''
+        Every command's phases, each with its count, mean, max and
+        cumulative bucket counts keyed by upper bound ('+Inf' last).
+        '''
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+
+        with self.lock:
+            data = {}
+            for command, phases in self.commands.items():
+                data[command] = {}
+                for phase, stats in phases.items():
+                    cumulative, buckets = 0, {}
+                    for bound, count in zip(bounds, stats['counts']):
+                        cumulative += count
+                        buckets[bound] = cumulative
+                    data[command][phase] = {
+                        'count': stats['count'],
+                        'mean_ms': round(stats['sum_ms'] / stats['count'], 3),
+                        'max_ms': round(stats['max_ms'], 3),
+                        'buckets': buckets,
+                    }
+            return data
+
+
+command_latency = LatencyHistogram()
+
+
+@contextmanager
+def timed_command(command, histogram=command_latency):
+    '''
+    Time a command, recording its total and the time spent in each phase
+    entered with `phase` into `histogram` once the command is done.
+    '''
+    phases, stack = {}, []
+    token = _timings.set((phases, stack))
+    start = perf_counter()
+    try:
+        yield phases
+    finally:
+        _timings.reset(token)
+        phases['total'] = perf_counter() - start
+        for name, seconds in phases.items():
+            histogram.record(command, name, seconds)
+
+
+@contextmanager
+def phase(name):
+    '''
+    Count the enclosed block towards phase `name` of the command being
+    timed, if any. Phases nested in it are not counted twice. The timings
+    follow the context into `sync_to_async` threads.
+    '''
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    phases, stack = timings
+    stack.append(0.0)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        nested = stack.pop()
+        phases[name] = phases.get(name, 0.0) + elapsed - nested
+        if stack:
+            stack[-1] += elapsed
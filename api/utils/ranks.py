@@ -0,0 +1,111 @@
+'''
+Lexicographic order keys ("ranks") for tasks and columns.
+
+A rank is a base-62 string compared byte by byte, so rank fields use the "C"
+collation. A new rank can always be found between any two ranks, so placing
+an item only ever writes that item's row. Ranks never end with the lowest
+digit, which keeps room below every rank.
+
+Ranks grow longer as items are repeatedly placed in the same gap or appended,
+so columns whose ranks exceed RANK_REBALANCE_LENGTH are periodically given
+fresh, evenly spread ranks by the `rebalanceranks` management command.
+'''
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+RANK_COLLATION = 'C'
+RANK_MAX_LENGTH = 255
+
+# Rebalanced by `rebalanceranks` past this length, and immediately past the
+# hard limit so a rank always fits its field
+RANK_REBALANCE_LENGTH = 32
+RANK_HARD_LENGTH = RANK_MAX_LENGTH - 1
+
+
+def _midpoint(a, b):
+    '''
+    A rank strictly between `a` and `b`, where `a` is a rank or '' (before
+    everything) and `b` is a rank or None (after everything).
+    '''
+    if b is not None:
+        # Keep the common prefix, padding `a` with the lowest digit
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Consecutive first digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment(a):
+    '''The shortest rank greater than `a` that shares a prefix with it.'''
+    for i, digit in enumerate(a):
+        if digit != DIGITS[-1]:
+            return a[:i] + DIGITS[DIGITS.index(digit) + 1]
+    return a + DIGITS[1]
+
+
+def _decrement(b):
+    '''The shortest rank less than `b` that shares a prefix with it.'''
+    for i, digit in enumerate(b):
+        if DIGITS.index(digit) > 1:
+            return b[:i] + DIGITS[DIGITS.index(digit) - 1]
+    return _midpoint('', b)
+
+
+def rank_between(before=None, after=None):
+    '''
+    A rank sorting after `before` and before `after`, either of which may be
+    None for the start or end of the list.
+    '''
+    if before is not None and after is not None and not before < after:
+        raise ValueError(f'Rank "{before}" is not before "{after}"')
+    # Keep ranks short when appending or prepending, the common cases
+    if after is None:
+        return _increment(before) if before else DIGITS[BASE // 2]
+    if before is None:
+        return _decrement(after)
+    return _midpoint(before, after)
+
+
+def spread_ranks(count):
+    '''`count` ascending ranks of equal length spread evenly over the space.'''
+    length = 1
+    while BASE ** length <= (count + 1) * BASE:
+        length += 1
+    step = BASE ** length // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value, digits = step * i, []
+        for _ in range(length):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip(DIGITS[0]))
+    return ranks
+
+
+def rank_at(ranks, index):
+    '''
+    A rank placing an item at `index` of a queryset of ranks ordered
+    ascending, clamped to its bounds. Runs a single query in the usual case.
+    '''
+    index = max(index, 0)
+    if index == 0:
+        return rank_between(None, ranks.first())
+
+    neighbours = list(ranks[index - 1:index + 1])
+    if not neighbours:
+        return rank_between(ranks.last(), None)
+    return rank_between(
+        neighbours[0], neighbours[1] if len(neighbours) > 1 else None,)
@@ -1,11 +1,16 @@
+import logging
 import re
 
+from contextlib import contextmanager
 from django.contrib.auth import get_user_model
 from django.db import connections
+from django.test.utils import CaptureQueriesContext, TestContextDecorator
 
 from boards.models import Board
 from boards.utils import BoardRoles
 from columns.models import Column
+from custom_db_logger.db_log_handler import DatabaseLogHandler
+from custom_db_logger.mail_log_handler import DigestAdminEmailHandler
 from custom_db_logger.utils import LogLevels
 from tasks.models import Task
 
@@ -164,6 +169,20 @@ def create_board(admin, *users, **kwargs):
     return board
 
 
+@contextmanager
+def query_budget(budget, using='default'):
+    '''Fail if the enclosed block runs more than `budget` queries.'''
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    if len(context) > budget:
+        queries = '\n'.join(
+            f'{i}. {query["sql"]}'
+            for i, query in enumerate(context.captured_queries, start=1))
+        raise AssertionError(
+            f'{len(context)} queries executed, budget is {budget}:\n{queries}')
+
+
 def force_drop_test_databases():
     test_dbs = [
         {
@@ -198,4 +217,81 @@ def log_msg_regex(msg, log_level=None):
     return (
         r'^' + level_regex +
         r' [\d]{4}-[\d]{2}-[\d]{2} [\d]{2}:[\d]{2}:[\d]{2},[\d]{3} .* line [\d]{0,6} in [\w-]*: ' +
-        re.escape(msg) + r'$')
\ No newline at end of file
+        re.escape(msg) + r'$')
+
+
+def log_handlers(handler_class):
+    '''The handlers of `handler_class` configured on any logger.'''
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values()
+        if isinstance(logger, logging.Logger)
+    ]
+    return {
+        handler for logger in loggers for handler in logger.handlers
+        if isinstance(handler, handler_class)
+    }
+
+
+def send_log_digests():
+    '''
+    Email the records waiting in the digest mail handlers now, as their
+    threads would at the end of the interval.
+    '''
+    for handler in log_handlers(DigestAdminEmailHandler):
+        handler.flush()
+
+
+class log_digests(TestContextDecorator):
+    '''
+    Start with no records waiting in the digest mail handlers, so the
+    digests a test sends with send_log_digests only have its own records.
+    '''
+
+    def enable(self):
+        for handler in log_handlers(DigestAdminEmailHandler):
+            with handler.entries_lock:
+                handler.entries, handler.dropped = {}, 0
+
+    def disable(self):
+        pass
+
+
+class synchronous_db_logs(TestContextDecorator):
+    '''
+    Write database log records as they are logged, for tests that read them
+    right after, instead of from the batched handler's writer thread, which
+    would commit them outside the test's transaction. Records queued before
+    are written first.
+    '''
+
+    def enable(self):
+        self.handlers = [
+            handler for handler in log_handlers(DatabaseLogHandler)
+            if handler.batched
+        ]
+        for handler in self.handlers:
+            handler.flush()
+            handler.batched = False
+
+    def disable(self):
+        for handler in self.handlers:
+            handler.batched = True
+
+
+class short_lived_db_connections(TestContextDecorator):
+    '''
+    Close database connections after each use on every thread, for tests
+    running queries on threads other than their own. Connections those
+    threads kept open would stop the test databases from being dropped.
+    '''
+
+    def enable(self):
+        self.max_ages = {}
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            self.max_ages[alias] = settings_dict['CONN_MAX_AGE']
+            settings_dict['CONN_MAX_AGE'] = 0
+
+    def disable(self):
+        for alias, max_age in self.max_ages.items():
+            connections[alias].settings_dict['CONN_MAX_AGE'] = max_age
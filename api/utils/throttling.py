@@ -1,9 +1,19 @@
+import asyncio
 import logging
+import math
+import threading
+import time
+import weakref
 
 from datetime import datetime
 from re import search
+from uuid import uuid4
 
+from channels.db import database_sync_to_async
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django_redis import get_redis_connection
+from redis import asyncio as aioredis
 from rest_framework.exceptions import Throttled
 from rest_framework.settings import api_settings
 from rest_framework.throttling import SimpleRateThrottle
@@ -16,10 +26,205 @@ from utils import COMMAND_VALUES, parse_request_metadata
 
 logger = logging.getLogger('throttling')
 
-THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+# Outcomes of a request in one rate's window
+ALLOWED, THROTTLED, THROTTLED_FIRST = 0, 1, 2
+
+# Throttling algorithms. A rate is checked with GCRA when prefixed with
+# 'gcra:', as in 'gcra:120/m', and with a sliding window otherwise.
+WINDOW, GCRA = 'window', 'gcra'
+
+# For each rate, in one atomic call, either record the request or throttle
+# it. The first time the newest recorded request is followed by a throttled
+# one, the rate is marked as logged, so each is logged once until requests
+# are allowed again. A process may ask for more than one request at a time
+# to allow them locally (see `LocalLeases`), and is granted as many as fit.
+# Requests it reserved but did not use are handed back first.
+#
+# A sliding window is a sorted set of request ids scored by timestamp.
+# Requests that have left the window are dropped first, and the window
+# expires once its last request has left it.
+#
+# GCRA keeps only the theoretical arrival time (TAT) of the next request,
+# in microseconds. A request is allowed while the TAT is at most the
+# duration less one emission interval ahead, so up to `limit` requests can
+# come at once, then one per interval. Each allowed request pushes the TAT
+# back by an interval, and the key expires once the TAT has passed.
+#
+# KEYS: the key of each rate
+# ARGV: now, request id, now in microseconds, then per rate: algorithm,
+#     limit, window start or emission interval in microseconds, duration in
+#     milliseconds, requests asked for, requests handed back, and the ids
+#     of those requests in a window, separated by spaces
+# Returns per rate: outcome, requests in the window, the timestamp of the
+#     window's oldest request or the TAT, and requests granted
+THROTTLE_SCRIPT = '''
+local now_us = tonumber(ARGV[3])
+local results = {}
+for i, key in ipairs(KEYS) do
+    local arg = 7 * (i - 1) + 3
+    local algorithm = ARGV[arg + 1]
+    local limit = tonumber(ARGV[arg + 2])
+    local ttl = tonumber(ARGV[arg + 4])
+    local cost = tonumber(ARGV[arg + 5])
+    local released = tonumber(ARGV[arg + 6])
+    local outcome, count, at, marker, granted = 0, 0, '', '', 0
+
+    if algorithm == 'gcra' then
+        local interval = tonumber(ARGV[arg + 3])
+        local tolerance = ttl * 1000 - interval
+        local tat = math.max(
+            tonumber(redis.call('GET', key) or 0) - released * interval,
+            now_us)
+        if tat - now_us > tolerance then
+            outcome = 1
+        else
+            granted = math.min(
+                cost, math.floor((tolerance - (tat - now_us)) / interval) + 1)
+            tat = tat + granted * interval
+        end
+        if granted > 0 or released > 0 then
+            if tat > now_us then
+                redis.call(
+                    'SET', key, string.format('%d', tat),
+                    'PX', math.ceil((tat - now_us) / 1000))
+            else
+                redis.call('DEL', key)
+            end
+        end
+        at = string.format('%d', tat)
+        marker = at
+    else
+        for id in string.gmatch(ARGV[arg + 7], '%S+') do
+            redis.call('ZREM', key, id)
+        end
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[arg + 3])
+        count = redis.call('ZCARD', key)
+        if count < limit then
+            granted = math.min(cost, limit - count)
+            for j = 1, granted do
+                redis.call('ZADD', key, ARGV[1], ARGV[2] .. ':' .. j)
+            end
+            count = count + granted
+        else
+            outcome = 1
+            marker = redis.call('ZRANGE', key, -1, -1)[1] or ''
+        end
+        redis.call('PEXPIRE', key, ttl)
+        at = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')[2] or ''
+    end
+
+    if outcome == 1 and redis.call('GET', key .. ':logged') ~= marker then
+        redis.call('SET', key .. ':logged', marker, 'PX', ttl)
+        outcome = 2
+    end
+    results[i] = {outcome, count, at, granted}
+end
+return results
+'''
+
+_script = None
+
+
+def get_throttle_script():
+    '''The throttle script, on the default cache's Redis.'''
+    global _script
+
+    if _script is None:
+        _script = get_redis_connection('default').register_script(
+            THROTTLE_SCRIPT)
+    return _script
+
+
+class LocalLeases(object):
+    '''
+    Requests of each throttle key this process may allow without asking
+    Redis. When a rate has room, a process reserves up to
+    THROTTLE_LEASE_FRACTION of its limit in one call, and spends the rest
+    of the reservation locally for up to THROTTLE_LEASE_SECONDS. A
+    reservation is at most the requests the rate allows in that time, so
+    rates slower than that, such as daily ones, are checked in Redis each
+    time. Near the limit, fewer requests are granted at a time, down to one
+    per call, so those requests are checked in Redis each time.
+
+    Reserved requests are recorded in Redis when reserved, so across all
+    processes no more than a rate's limit is ever recorded in one window.
+    Requests left when a lease expires are handed back with the process's
+    next call for the key. The bounds are:
+    - Until they are handed back, unused requests still count, so with P
+      leases held at once as few as
+      `limit - P * limit * lease_seconds / duration` requests may be
+      allowed in a window. With GCRA, each keeps the client waiting for at
+      most `lease_seconds` longer.
+    - A reserved request is recorded at the time of the reservation but
+      may be allowed up to THROTTLE_LEASE_SECONDS later. A window ending
+      when it is allowed may then see up to `limit` requests plus those
+      reserved in the lease time before it started.
+    '''
+
+    # Expired leases are dropped once this many keys have one
+    max_keys = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Per key, a list of [request id, requests remaining, expiry time]
+        self.leases = {}
+
+    def take(self, key):
+        '''Whether a request of `key` is allowed by a lease.'''
+        now = time.monotonic()
+        with self.lock:
+            for lease in self.leases.get(key, ()):
+                if lease[1] > 0 and lease[2] > now:
+                    lease[1] -= 1
+                    return True
+            return False
+
+    def release(self, key):
+        '''
+        Drop the leases of `key` that are spent or expired. Returns the
+        number of requests left in them, and the ids those requests were
+        recorded with in a sliding window.
+        '''
+        now = time.monotonic()
+        released, ids = 0, []
+        with self.lock:
+            leases = self.leases.pop(key, [])
+            kept = [
+                lease for lease in leases if lease[1] > 0 and lease[2] > now
+            ]
+            if kept:
+                self.leases[key] = kept
+            for request_id, remaining, expires in leases:
+                if expires <= now:
+                    released += remaining
+                    ids += [f'{request_id}:{j + 1}' for j in range(remaining)]
+        return released, ids
+
+    def grant(self, key, request_id, requests, seconds):
+        if requests <= 0:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            if len(self.leases) >= self.max_keys:
+                self.leases = {
+                    k: leases for k, leases in self.leases.items()
+                    if any(lease[2] > now for lease in leases)
+                }
+            self.leases.setdefault(key, []).append(
+                [request_id, requests, now + seconds])
+
+    def clear(self):
+        with self.lock:
+            self.leases = {}
+
+
+local_leases = LocalLeases()
+
 
 class CustomRateThrottle(SimpleRateThrottle):
-    cache_format = 'throttle_%(scope)s_%(ident)s_%(rate)s'
+    cache_format = 'throttle_%(algorithm)s_%(scope)s_%(ident)s_%(rate)s'
 
     def __init__(self, command, rate, client_ip, context=None, **kwargs):
         if not isinstance(command, str):
@@ -49,66 +254,103 @@ class CustomRateThrottle(SimpleRateThrottle):
         On success calls `throttle_success`.
         On failure calls `throttle_failure`.
         '''
-        self.num_requests, self.duration = self.parse_rate(self.rate)
-        self.key = self.get_cache_key()
-        self.history = self.cache.get(self.key, [])
-        self.now = datetime.now().timestamp()
-
-        # print('self.rate:', self.rate)
-        # print('self.num_requests:', self.num_requests)
-        # print('self.duration:', self.duration)
-        # print('self.key:', self.key)
-        # print('self.history:', self.history)
-        # print('self.now:', self.now)
-
-        # Drop any requests from the history which have now passed the
-        # throttle duration
-        while (
-            self.history and
-            self.history[-1]['timestamp'] <= self.now - self.duration
-        ):
-            self.history.pop()
+        pending, keys, args = throttle_args([self])
+        outcome = ALLOWED
+        if pending:
+            result = get_throttle_script()(keys=keys, args=args)[0]
+            outcome = self.set_outcome(result)
 
         # Log the first throttled request
-        if len(self.history) >= self.num_requests:
-            # print('THROTTLING!')
-            if not self.history[0].get('was_logged'):
-                logger.error('Client was throttled.', extra={
-                    'board': self.board,
-                    'user': self.user,
-                    'client_ip': self.client_ip,
-                    'command': self.command,
-                    'metadata': parse_request_metadata(self.context, {
-                        'invalid_command': self.invalid_command,
-                    }),
-                })
-                self.history[0]['was_logged'] = True
-                self.cache.set(self.key, self.history)
-                # print('THROTTLE LOGGED')
-            return self.throttle_failure()
-        return self.throttle_success()
+        if outcome == THROTTLED_FIRST:
+            self.log_throttled()
+        if outcome == ALLOWED:
+            return self.throttle_success()
+        return self.throttle_failure()
+
+    def parse_rate(self, rate):
+        '''
+        Sets the algorithm of `rate`, and returns its number of requests and
+        duration in seconds.
+        '''
+        self.algorithm, rate = (
+            (GCRA, rate[len(GCRA) + 1:]) if rate.startswith(f'{GCRA}:')
+            else (WINDOW, rate)
+        )
+        return super().parse_rate(rate)
+
+    def prepare(self, now):
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.cache.make_key(self.get_cache_key())
+        self.now = now
+        self.count = 0
+        self.at = None
+
+        self.lease_seconds = max(min(
+            settings.THROTTLE_LEASE_SECONDS, self.duration,), 0)
+        self.cost = max(min(
+            int(self.num_requests * settings.THROTTLE_LEASE_FRACTION),
+            int(self.num_requests * self.lease_seconds / self.duration),
+        ), 1)
+
+    def script_args(self, released=0, released_ids=()):
+        if self.algorithm == GCRA:
+            start = self.duration * 1000000 // self.num_requests
+        else:
+            start = repr(self.now - self.duration)
+        return [
+            self.algorithm,
+            self.num_requests,
+            start,
+            math.ceil(self.duration * 1000),
+            self.cost,
+            released,
+            ' '.join(released_ids),
+        ]
+
+    def set_outcome(self, result):
+        outcome, self.count, at, granted = result
+        # This request takes one of the requests granted
+        local_leases.grant(
+            self.key, self.request_id, granted - 1, self.lease_seconds)
+        if at and self.algorithm == GCRA:
+            self.at = int(at) / 1000000
+        elif at:
+            self.at = float(at)
+        return outcome
+
+    def log_throttled(self):
+        logger.error('Client was throttled.', extra={
+            'board': self.board,
+            'user': self.user,
+            'client_ip': self.client_ip,
+            'command': self.command,
+            'metadata': parse_request_metadata(self.context, {
+                'invalid_command': self.invalid_command,
+            }),
+        })
 
     def throttle_success(self):
         """
-        Inserts the current request's timestamp along with the key
-        into the cache.
+        The request was recorded in its window by the script.
         """
-        # print('NOT THROTTLED')
-        self.history.insert(0, { 'timestamp': self.now })
-        self.cache.set(self.key, self.history)
         return True
 
     def wait(self):
         """
         Returns the recommended next request time in seconds.
         """
-        if self.history:
-            timestamp = self.history[-1]['timestamp']
-            remaining_duration = self.duration - (self.now - timestamp)
+        if self.algorithm == GCRA:
+            # The next request is allowed once the TAT is within the
+            # duration less one emission interval
+            interval = self.duration / self.num_requests
+            return max(self.at - (self.duration - interval) - self.now, 0)
+
+        if self.at is not None:
+            remaining_duration = self.duration - (self.now - self.at)
         else:
             remaining_duration = self.duration
 
-        available_requests = self.num_requests - len(self.history) + 1
+        available_requests = self.num_requests - self.count + 1
         if available_requests <= 0:
             return None
 
@@ -116,29 +358,143 @@ class CustomRateThrottle(SimpleRateThrottle):
 
     def get_cache_key(self):
         return self.cache_format % {
+            'algorithm': self.algorithm,
             'scope': self.command,
             'ident': self.client_ip,
-            'rate': self.rate.replace('/', '_'),
+            'rate': self.rate.split(':')[-1].replace('/', '_'),
         }
 
 
-def throttle_command(command, client_ip, context=None, **kwargs):
+def throttle_args(throttles):
+    '''
+    The throttles of a request that are not allowed by a local lease, and
+    the keys and arguments of the throttle script to check them.
+    '''
+    now = datetime.now().timestamp()
+    request_id = f'{now!r}:{uuid4().hex[:8]}'
+    pending, keys, args = [], [], [
+        repr(now), request_id, int(now * 1000000),
+    ]
+    for throttle in throttles:
+        throttle.prepare(now)
+        if not local_leases.take(throttle.key):
+            throttle.request_id = request_id
+            pending.append(throttle)
+            keys.append(throttle.key)
+            args += throttle.script_args(*local_leases.release(throttle.key))
+    return pending, keys, args
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    '''
+    Client of the default cache's Redis for the running event loop, and the
+    throttle script on it. Clients are kept per loop, as their
+    connections cannot be shared between loops.
+    '''
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        cache_settings = settings.CACHES['default']
+        redis = aioredis.Redis.from_url(
+            cache_settings['LOCATION'],
+            password=cache_settings.get('OPTIONS', {}).get('PASSWORD'),)
+        client = _async_clients[loop] = (
+            redis, redis.register_script(THROTTLE_SCRIPT))
+    return client
+
+
+class AsyncRateThrottle(CustomRateThrottle):
+    '''
+    `CustomRateThrottle` for code running in the event loop, sharing its
+    keys. Only logging a throttled client, once per window, runs in a
+    thread.
+    '''
+
+    async def allow_request(self):
+        pending, keys, args = throttle_args([self])
+        outcome = ALLOWED
+        if pending:
+            redis, script = get_async_redis()
+            result = (await script(keys=keys, args=args))[0]
+            outcome = self.set_outcome(result)
+
+        if outcome == THROTTLED_FIRST:
+            await database_sync_to_async(self.log_throttled)()
+        if outcome == ALLOWED:
+            return self.throttle_success()
+        return self.throttle_failure()
+
+
+def get_throttle_rates(command, kwargs):
+    '''
+    The command to throttle `command` as, and its rates. Unknown commands
+    are throttled together, with the name sent kept in `kwargs`.
+    '''
     if command not in COMMAND_VALUES:
         kwargs['invalid_command'] = command
         command = 'invalid_command'
 
+    # Read on each call so that tests can override the rates
+    rates = api_settings.DEFAULT_THROTTLE_RATES
     try:
-        throttle_rates = THROTTLE_RATES[command]
+        throttle_rates = rates[command]
     except KeyError:
         try:
-            throttle_rates = THROTTLE_RATES['default']
+            throttle_rates = rates['default']
         except KeyError:
             throttle_rates = ['120/m']
+    return command, throttle_rates
+
+
+def throttle_command(command, client_ip, context=None, **kwargs):
+    '''
+    Whether a request goes over any of its command's rates. Rates not
+    allowed by a local lease are checked in a single call to Redis, and the
+    request is counted in each window it fits in.
+    '''
+    command, throttle_rates = get_throttle_rates(command, kwargs)
+    throttles = [
+        CustomRateThrottle(command, rate, client_ip, context, **kwargs)
+        for rate in throttle_rates
+    ]
+    pending, keys, args = throttle_args(throttles)
+    if not pending:
+        return False
+
+    throttled = False
+    for throttle, result in zip(
+        pending, get_throttle_script()(keys=keys, args=args),
+    ):
+        outcome = throttle.set_outcome(result)
+        if outcome == THROTTLED_FIRST:
+            throttle.log_throttled()
+        if outcome != ALLOWED:
+            throttled = True
+    return throttled
+
+
+async def athrottle_command(command, client_ip, context=None, **kwargs):
+    '''`throttle_command` for code running in the event loop.'''
+    command, throttle_rates = get_throttle_rates(command, kwargs)
+    throttles = [
+        AsyncRateThrottle(command, rate, client_ip, context, **kwargs)
+        for rate in throttle_rates
+    ]
+    pending, keys, args = throttle_args(throttles)
+    if not pending:
+        return False
+    redis, script = get_async_redis()
 
     throttled = False
-    for rate in throttle_rates:
-        throttle = CustomRateThrottle(
-            command, rate, client_ip, context, **kwargs,)
-        if not throttle.allow_request():
+    for throttle, result in zip(
+        pending, await script(keys=keys, args=args),
+    ):
+        outcome = throttle.set_outcome(result)
+        if outcome == THROTTLED_FIRST:
+            await database_sync_to_async(throttle.log_throttled)()
+        if outcome != ALLOWED:
             throttled = True
-    return throttled
\ No newline at end of file
+    return throttled
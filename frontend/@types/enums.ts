@@ -16,6 +16,7 @@ export enum BoardCommands {
   TITLE = 'update_board_title',
   CREATE_MSG = 'create_msg',
   UPDATE_MSG = 'update_msg',
+  READ_MSGS = 'read_msgs',
   CREATE_TASK = 'create_task',
   UPDATE_TASK = 'update_task',
   MOVE_TASK = 'move_task',
@@ -31,6 +32,7 @@ export enum BoardCommands {
   LEAVE = 'leave_board',
   INVITE = 'invite_member',
   NO_COMMAND = 'no_command',
+  BATCH = 'batch',
   SUBMIT_DEMO = 'submit_demo',
 }
 
@@ -58,7 +60,19 @@ export enum ChannelCodes {
   COLUMNS_SAVED = 'COLUMNS_SAVED',
   MEMBERS_SAVED = 'MEMBERS_SAVED',
   MSG_CREATED = 'MSG_CREATED',
+  MSGS_LOADED = 'MSGS_LOADED',
   TASKS_SAVED = 'TASKS_SAVED',
+  TASK_CREATED = 'TASK_CREATED',
+  TASK_UPDATED = 'TASK_UPDATED',
+  TASK_MOVED = 'TASK_MOVED',
+  TASK_DELETED = 'TASK_DELETED',
+  COLUMN_CREATED = 'COLUMN_CREATED',
+  COLUMN_UPDATED = 'COLUMN_UPDATED',
+  COLUMN_MOVED = 'COLUMN_MOVED',
+  COLUMN_DELETED = 'COLUMN_DELETED',
+  BATCH_APPLIED = 'BATCH_APPLIED',
+  MEMBER_UPDATED = 'MEMBER_UPDATED',
+  MEMBER_REMOVED = 'MEMBER_REMOVED',
   BOARD_DELETED = 'BOARD_DELETED',
   INVITE_SENT = 'INVITE_SENT',
   INVITE_NOT_SENT = 'INVITE_NOT_SENT',
@@ -36,6 +36,7 @@ import {
   IModal,
   ITask,
 } from '@/types';
+import { reindexColumns, reindexTasks, saveColumn, saveTask } from '@/utils';
 
 
 class Board extends Component<Props> {
@@ -121,6 +122,37 @@ class Board extends Component<Props> {
     }
   }
 
+  columnSaved(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board) {
+      const columns = saveColumn(checkColumn(data), board.columns);
+      this.columnsSaved(columns, closeForm);
+    }
+  }
+
+  columnMoved(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board && !!data) {
+      const columns = saveColumn(checkColumn(data.column), board.columns);
+      this.columnsSaved(reindexColumns(data.ranges, columns), closeForm);
+    } else throw new Error("Failed 'columnMoved'");
+  }
+
+  columnDeleted(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board && typeof data?.column_id === 'number') {
+      const { column_id, ranges } = data;
+      const columns = board.columns.filter(c => c.column_id !== column_id);
+      this.columnsSaved(reindexColumns(ranges, columns), closeForm);
+      this.props.successSaveTasks(
+        board.tasks.filter(t => t.column !== column_id),
+      );
+    } else throw new Error("Failed 'columnDeleted'");
+  }
+
   membersSaved(data: any, closeForm: boolean = false) {
     if (Array.isArray(data)) {
       const members = data.map(checkMembership);
@@ -152,6 +184,56 @@ class Board extends Component<Props> {
     }
   }
 
+  memberUpdated(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board) {
+      const membership = checkMembership(data);
+      const { user_slug } = membership.user;
+      const members = board.memberships.map(m => (
+        m.user.user_slug === user_slug ? membership : m
+      ));
+      this.membersSaved({ updated_slugs: [user_slug], members }, closeForm);
+    }
+  }
+
+  memberRemoved(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board && typeof data?.user_slug === 'string') {
+      const members =
+        board.memberships.filter(m => m.user.user_slug !== data.user_slug);
+      this.membersSaved(members, closeForm);
+    } else throw new Error("Failed 'memberRemoved'");
+  }
+
+  taskSaved(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board) {
+      this.tasksSaved(saveTask(checkTask(data), board.tasks), closeForm);
+    }
+  }
+
+  taskMoved(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board && !!data) {
+      const tasks = saveTask(checkTask(data.task), board.tasks);
+      this.tasksSaved(reindexTasks(data.ranges, tasks), closeForm);
+    } else throw new Error("Failed 'taskMoved'");
+  }
+
+  taskDeleted(data: any, closeForm: boolean = false) {
+    const { board } = this.props;
+
+    if (board && typeof data?.task_id === 'number') {
+      const { task_id, ranges } = data;
+      const tasks = board.tasks.filter(t => t.task_id !== task_id);
+      this.tasksSaved(reindexTasks(ranges, tasks), closeForm);
+    } else throw new Error("Failed 'taskDeleted'");
+  }
+
   tasksSaved(data: any, closeForm: boolean = false) {
     if (Array.isArray(data)) {
       this.props.successSaveTasks(data.map(checkTask));
@@ -165,6 +247,35 @@ class Board extends Component<Props> {
     }
   }
 
+  batchApplied(data: any, closeForm: boolean = false) {
+    if (Array.isArray(data?.results)) {
+      // Results are applied in the order their commands ran
+      data.results.forEach((result: any) => {
+        const { code, data } = result;
+
+        if (
+          code === ChannelCodes.TASK_CREATED ||
+          code === ChannelCodes.TASK_UPDATED
+        ) {
+          this.taskSaved(data, closeForm);
+        } else if (code === ChannelCodes.TASK_MOVED) {
+          this.taskMoved(data, closeForm);
+        } else if (code === ChannelCodes.TASK_DELETED) {
+          this.taskDeleted(data, closeForm);
+        } else if (
+          code === ChannelCodes.COLUMN_CREATED ||
+          code === ChannelCodes.COLUMN_UPDATED
+        ) {
+          this.columnSaved(data, closeForm);
+        } else if (code === ChannelCodes.COLUMN_MOVED) {
+          this.columnMoved(data, closeForm);
+        } else if (code === ChannelCodes.COLUMN_DELETED) {
+          this.columnDeleted(data, closeForm);
+        }
+      });
+    } else throw new Error("Failed 'batchApplied'");
+  }
+
   inviteSent(message: any) {
     if (message && typeof message === 'string') {
       this.props.inviteFormClose();
@@ -246,6 +357,30 @@ class Board extends Component<Props> {
         this.tasksSaved(data, thisClientSentMessage);
       } else if (code === ChannelCodes.MEMBERS_SAVED) {
         this.membersSaved(data, thisClientSentMessage);
+      } else if (
+        code === ChannelCodes.TASK_CREATED ||
+        code === ChannelCodes.TASK_UPDATED
+      ) {
+        this.taskSaved(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.TASK_MOVED) {
+        this.taskMoved(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.TASK_DELETED) {
+        this.taskDeleted(data, thisClientSentMessage);
+      } else if (
+        code === ChannelCodes.COLUMN_CREATED ||
+        code === ChannelCodes.COLUMN_UPDATED
+      ) {
+        this.columnSaved(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.COLUMN_MOVED) {
+        this.columnMoved(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.COLUMN_DELETED) {
+        this.columnDeleted(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.BATCH_APPLIED) {
+        this.batchApplied(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.MEMBER_UPDATED) {
+        this.memberUpdated(data, thisClientSentMessage);
+      } else if (code === ChannelCodes.MEMBER_REMOVED) {
+        this.memberRemoved(data, thisClientSentMessage);
       } else if (code === ChannelCodes.INVITE_SENT) {
         this.inviteSent(message);
       } else if (code === ChannelCodes.INVITE_NOT_SENT) {
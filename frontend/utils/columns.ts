@@ -87,3 +87,35 @@ export const moveColumn = (
 
   return columns
 };
+
+
+export const saveColumn = (column: IColumn, columns: IColumn[]): IColumn[] => {
+  if (columns.find(c => c.column_id === column.column_id)) {
+    return columns.map(c => c.column_id === column.column_id ? column : c);
+  }
+
+  return [...columns, column];
+};
+
+
+export const reindexColumns = (ranges: any, columns: IColumn[]): IColumn[] => {
+  if (!Array.isArray(ranges)) {
+    throw new Error("Failed 'reindexColumns'");
+  }
+
+  // Each range lists, in order, the columns now occupying
+  // the board's indexes from `start`, so reapplying a range is harmless.
+  for (const { start, column_ids } of ranges) {
+    if (typeof start !== 'number' || !Array.isArray(column_ids)) {
+      throw new Error("Failed 'reindexColumns'");
+    }
+
+    columns = columns.map(c => {
+      const offset = column_ids.indexOf(c.column_id);
+      if (offset === -1) return c;
+      return { ...c, column_index: start + offset };
+    });
+  }
+
+  return columns;
+};
@@ -81,3 +81,37 @@ export const moveTasks = (
 
   return tasks;
 };
+
+
+export const saveTask = (task: ITask, tasks: ITask[]): ITask[] => {
+  if (tasks.find(t => t.task_id === task.task_id)) {
+    return tasks.map(t => t.task_id === task.task_id ? task : t);
+  }
+
+  return [...tasks, task];
+};
+
+
+export const reindexTasks = (ranges: any, tasks: ITask[]): ITask[] => {
+  if (!Array.isArray(ranges)) {
+    throw new Error("Failed 'reindexTasks'");
+  }
+
+  // Each range lists, in order, the tasks now occupying a column's indexes
+  // from `start`, so reapplying a range is harmless.
+  for (const { column, start, task_ids } of ranges) {
+    if (
+      typeof column !== 'number' ||
+      typeof start !== 'number' ||
+      !Array.isArray(task_ids)
+    ) throw new Error("Failed 'reindexTasks'");
+
+    tasks = tasks.map(t => {
+      const offset = task_ids.indexOf(t.task_id);
+      if (offset === -1) return t;
+      return { ...t, column, task_index: start + offset };
+    });
+  }
+
+  return tasks;
+};